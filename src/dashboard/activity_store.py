@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+import json
+import os
+
+
+def store_version(folder: str) -> float:
+    """Returns a version of a store, changing every time the pipeline swaps it.
+
+    The stores are cached by the dashboard, this version is passed along the
+    folder so that a cache entry is never reused once the store was rewritten.
+
+    Args:
+        folder (str): The directory the store was written to.
+
+    Returns:
+        float: The modification time of the offset index of the store.
+    """
+    return os.path.getmtime(os.path.join(folder, "index.pkl"))
+
+
+class ActivityStore:
+    """Reads a table written by write_activity_store (src/data/activity_store.py).
+
+    Columns are memory-mapped and the offset index gives the row block of each
+    activity, so loading one activity costs O(activity size) whatever the number
+    of activities in the store. The maps are only held while a block is copied
+    out: Windows can't rename a folder with mapped files, which would keep the
+    pipeline from swapping a new store in.
+    """
+
+    def __init__(self, folder: str):
+        """Opens the store without reading any row.
+
+        Args:
+            folder (str): The directory the store was written to.
+        """
+        self.folder = folder
+        self.index = pd.read_pickle(os.path.join(folder, "index.pkl"))
+        with open(os.path.join(folder, "columns.json")) as f:
+            meta = json.load(f)
+        self.key = meta["key"]
+        self.columns = meta["columns"]
+        # Text columns with a mask of missing values (stores written before have none)
+        self.masked = meta.get("masked", [])
+
+    def _read(self, name: str, start: int, stop: int) -> np.ndarray:
+        """Returns the rows [start, stop) of an array, copied out of its memory map."""
+        array = np.load(os.path.join(self.folder, f"{name}.npy"), mmap_mode="r")
+        # np.array copies the block, the map is released with `array`
+        return np.array(array[start:stop])
+
+    @property
+    def activity_ids(self) -> pd.Index:
+        """The activities stored, in block order."""
+        return self.index.index
+
+    def load(self, activity_id, columns: list = None) -> pd.DataFrame:
+        """Returns the rows of a single activity.
+
+        Args:
+            activity_id: The activity to load.
+            columns (list): The columns to load. Default is all columns.
+
+        Returns:
+            pd.DataFrame: The rows of the activity (empty if the activity isn't stored).
+        """
+        columns = self.columns if columns is None else columns
+        if activity_id not in self.index.index:
+            return pd.DataFrame(columns=columns)
+
+        start, stop = self.index.loc[activity_id, ["start", "stop"]]
+        df = pd.DataFrame(
+            {column: self._read(column, start, stop) for column in columns}
+        )
+        for column in set(columns) & set(self.masked):
+            missing = self._read(f"{column}.missing", start, stop)
+            df[column] = df[column].astype(object).where(~missing, None)
+        return df
@@ -0,0 +1,171 @@
+# -----------------------------------------------------------------------------
+# MODULE: chart_data.py
+# DESCRIPTION:
+#   Reduces the dataframes handed to Altair/Plotly charts before they are built.
+#   Charts embed their whole dataframe in the Vega spec sent to the browser on
+#   every rerun, so each chart only receives the columns it encodes and, past a
+#   point budget, a shape-preserving subset of its rows.
+# -----------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+import os
+import warnings
+
+# Maximum number of rows embedded in a single chart (override with the
+# HEALTH_TRACKER_MAX_CHART_POINTS environment variable)
+MAX_CHART_POINTS = int(os.environ.get("HEALTH_TRACKER_MAX_CHART_POINTS", 500))
+
+
+def field_name(shorthand: str) -> str:
+    """Returns the column name of an Altair shorthand such as "date:T".
+
+    Args:
+        shorthand (str): An Altair field shorthand, with or without a type suffix.
+
+    Returns:
+        str: The column name without the type suffix.
+    """
+    return shorthand.split(":")[0]
+
+
+def project_columns(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Returns the dataframe restricted to the columns encoded by a chart.
+
+    Args:
+        df (pd.DataFrame): The dataframe to project.
+        columns (list): Column names or Altair shorthands, duplicates and None are ignored.
+
+    Returns:
+        pd.DataFrame: A dataframe containing only the requested columns, in the given order.
+    """
+    names = [field_name(column) for column in columns if column is not None]
+    return df[list(dict.fromkeys(names))]
+
+
+def _numeric_x(x: pd.Series) -> np.ndarray:
+    """Returns the x values as floats (datetimes as nanoseconds, categories as positions)."""
+    if pd.api.types.is_datetime64_any_dtype(x):
+        return x.values.astype("datetime64[ns]").astype("int64").astype("float64")
+    if pd.api.types.is_numeric_dtype(x):
+        return x.to_numpy(dtype="float64")
+    return np.arange(len(x), dtype="float64")
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Returns the positions of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. Every other bucket keeps the point
+    forming the largest triangle with the previously kept point and the average of
+    the next bucket, which preserves peaks and troughs of the series.
+
+    Args:
+        x (np.ndarray): The x values, sorted in ascending order.
+        y (np.ndarray): The y values, NaN values are never preferred.
+        n_out (int): The number of points to keep.
+
+    Returns:
+        np.ndarray: The sorted positions of the kept points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    selected = np.empty(n_out, dtype="int64")
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        # Current bucket
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # Next bucket (the last bucket is followed by the last point)
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        # All-NaN buckets only produce NaN areas, which are never preferred
+        with warnings.catch_warnings(), np.errstate(invalid="ignore"):
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            avg_x = np.nanmean(x[next_start:next_end])
+            avg_y = np.nanmean(y[next_start:next_end])
+            area = np.abs(
+                (x[a] - avg_x) * (y[start:end] - y[a])
+                - (x[a] - x[start:end]) * (avg_y - y[a])
+            )
+        area = np.nan_to_num(area, nan=-1.0)
+
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Returns the positions of the minimum and maximum of each bucket of rows.
+
+    Args:
+        y (np.ndarray): A 2-D array with one column per plotted series.
+        n_buckets (int): The number of equally sized buckets.
+
+    Returns:
+        np.ndarray: The sorted positions of the kept points, including the first and last one.
+    """
+    n = len(y)
+    kept = [0, n - 1]
+    for bucket in np.array_split(np.arange(n), max(1, n_buckets)):
+        block = y[bucket]
+        for column in range(block.shape[1]):
+            values = block[:, column]
+            if np.isnan(values).all():
+                continue
+            kept.append(bucket[np.nanargmin(values)])
+            kept.append(bucket[np.nanargmax(values)])
+    return np.unique(kept)
+
+
+def reduce_chart_data(
+    df: pd.DataFrame,
+    x: str,
+    y,
+    keep: list = None,
+    max_points: int = None,
+    method: str = "lttb",
+) -> pd.DataFrame:
+    """Returns the data a chart needs: encoded columns only, downsampled to a point budget.
+
+    Args:
+        df (pd.DataFrame): The dataframe to plot, sorted by the x column.
+        x (str): The x column (or Altair shorthand).
+        y (str or list): The y column(s) (or Altair shorthands).
+        keep (list): Other encoded columns to keep (color, tooltip...). Default is None.
+        max_points (int): The maximum number of rows to return. Default is MAX_CHART_POINTS.
+        method (str): "lttb" or "minmax". LTTB only applies to a single y column,
+            several y columns always use min/max bucketing. Default is "lttb".
+
+    Returns:
+        pd.DataFrame: The projected and, if needed, downsampled dataframe.
+    """
+    if max_points is None:
+        max_points = MAX_CHART_POINTS
+    if method not in ("lttb", "minmax"):
+        raise ValueError("Invalid method")
+
+    y_columns = [field_name(col) for col in ([y] if isinstance(y, str) else y)]
+    data = project_columns(df, [x] + y_columns + list(keep or []))
+
+    if len(data) <= max_points:
+        return data
+
+    values = data[y_columns].to_numpy(dtype="float64")
+    if method == "lttb" and len(y_columns) == 1:
+        indices = lttb_indices(
+            _numeric_x(data[field_name(x)]), values[:, 0], max_points
+        )
+    else:
+        # Each bucket keeps up to two points per series
+        n_buckets = (max_points - 2) // (2 * len(y_columns))
+        indices = minmax_indices(values, n_buckets)
+
+    return data.iloc[indices]
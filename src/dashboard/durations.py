@@ -0,0 +1,18 @@
+import pandas as pd
+
+
+def to_seconds(series: pd.Series) -> pd.Series:
+    """Returns a duration column in seconds.
+
+    Durations are stored as numeric seconds by the pipeline, tables processed before
+    that still hold timedeltas, which are converted here.
+
+    Args:
+        series (pd.Series): The duration column.
+
+    Returns:
+        pd.Series: The durations in seconds (float).
+    """
+    if pd.api.types.is_timedelta64_dtype(series):
+        return series.dt.total_seconds()
+    return series.astype("float64")
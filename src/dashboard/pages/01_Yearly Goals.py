@@ -5,6 +5,9 @@ import altair as alt
 import datetime
 import time
 
+from chart_data import project_columns, reduce_chart_data
+from durations import to_seconds
+
 # -----------------------------------------------------------------------------
 # Importing Data
 # -----------------------------------------------------------------------------
@@ -17,7 +20,7 @@ df_months = pd.read_pickle("data/garmin_months.pkl")
 # Transforming dataframes for the ease of streamlit components
 # -----------------------------------------------------------------------------
 
-# Convert duration columns to float because streamlit doesn't handle durations
+# Convert duration columns (in seconds) to minutes and hours
 cols = [
     "moderate_activity_time",
     "vigorous_activity_time",
@@ -25,9 +28,9 @@ cols = [
     "start_sleep_time",
 ]
 for col in cols:
-    df_days[col] = df_days[col].apply(lambda x: x.total_seconds() / 60)
-    df_weeks[col] = df_weeks[col].apply(lambda x: x.total_seconds() / 60)
-    df_months[col] = df_months[col].apply(lambda x: x.total_seconds() / 60)
+    df_days[col] = to_seconds(df_days[col]) / 60
+    df_weeks[col] = to_seconds(df_weeks[col]) / 60
+    df_months[col] = to_seconds(df_months[col]) / 60
 
 cols = [
     "total_sleep",
@@ -37,9 +40,9 @@ cols = [
     "awake",
 ]
 for col in cols:
-    df_days[col] = df_days[col].apply(lambda x: x.total_seconds() / 3600)
-    df_weeks[col] = df_weeks[col].apply(lambda x: x.total_seconds() / 3600)
-    df_months[col] = df_months[col].apply(lambda x: x.total_seconds() / 3600)
+    df_days[col] = to_seconds(df_days[col]) / 3600
+    df_weeks[col] = to_seconds(df_weeks[col]) / 3600
+    df_months[col] = to_seconds(df_months[col]) / 3600
 
 df_days = df_days.reset_index()
 df_days = df_days.rename(columns={"day": "date"})
@@ -68,6 +71,8 @@ def create_bar_chart_with_goal(
     goal_above=True,
 ):
     max_value = df[y].max()
+    # Only ship the encoded columns to the browser (downsampling would drop bars)
+    df = project_columns(df, ["date", y])
     # base = alt.Chart(df).encode(alt.X("date:T", axis=alt.Axis(title=None)))
     base = alt.Chart(df)
     bar_chart = base.mark_bar(
@@ -124,6 +129,8 @@ def create_line_chart_with_goal(
     df, bar_color, lines_color, y, mean_value, goal_value, min_y=0
 ):
     max_y = df[y].max() * 1.10
+    # Only ship the encoded columns (and at most MAX_CHART_POINTS rows) to the browser
+    df = reduce_chart_data(df, x="date", y=y)
     # base = alt.Chart(df).encode(alt.X("date:T", axis=alt.Axis(title=None)))
     base = alt.Chart(df)
     bar_chart = base.mark_line(
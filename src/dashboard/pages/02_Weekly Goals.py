@@ -15,6 +15,9 @@ import plotly.graph_objects as go
 from datetime import date, timedelta
 import time
 
+from chart_data import project_columns
+from durations import to_seconds
+
 # -----------------------------------------------------------------------------
 # Importing Data
 # -----------------------------------------------------------------------------
@@ -31,10 +34,10 @@ day_of_week = {0: "Mon", 1: "Tue", 2: "Wed", 3: "Thu", 4: "Fri", 5: "Sat", 6: "S
 # Extract day of the week from index and map it to string
 df_days["day_of_week"] = df_days.index.dayofweek.map(day_of_week)
 
-# Convert duration columns to float because streamlit doesn't handle durations
+# Duration columns in seconds (timedeltas in older tables)
 cols = ["moderate_activity_time", "vigorous_activity_time", "intensity_time"]
 for col in cols:
-    df_days[col] = df_days[col].apply(lambda x: x.total_seconds())
+    df_days[col] = to_seconds(df_days[col])
 
 # Select a subset dataframe to work with for the Activity Metrics
 df_days_active = df_days[
@@ -111,8 +114,8 @@ def bar_plot_weekly_df(
     if week_start_date.weekday() != 0:
         st.warning("Monday is the only valid choice. Please select a Monday.")
     else:
-        # Create the chart
-        chart = alt.Chart(df)
+        # Create the chart (only the encoded columns are embedded in the spec)
+        chart = alt.Chart(project_columns(df, [x_col_name, y_col_name]))
         if show_h_line and h_line_value is not None:
             line = (
                 alt.Chart(pd.DataFrame({"y": [h_line_value]}))
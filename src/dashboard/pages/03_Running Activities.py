@@ -0,0 +1,292 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+
+import os
+
+from activity_store import ActivityStore, store_version
+from chart_data import reduce_chart_data
+from durations import to_seconds
+from tracks import TrackStore
+
+# -----------------------------------------------------------------------------
+# Setting up page Config
+# -----------------------------------------------------------------------------
+
+st.set_page_config(
+    page_title="Running Activities",
+    page_icon=":runner:",
+    layout="wide",
+    menu_items={
+        "Get help": "https://www.linkedin.com/in/christophe-level",
+        "About": "# This is a personal project. Visit my website for other projects: https://crish1eev1.github.io/",
+    },
+)
+
+# -----------------------------------------------------------------------------
+# Checking the pipeline outputs
+# -----------------------------------------------------------------------------
+
+# The run tables and stores are written by transform_data.py (not shipped with the
+# repository)
+missing = [
+    path
+    for path in [
+        "data/garmin_running.pkl",
+        "data/garmin_running_splits.pkl",
+        "data/garmin_personal_records.pkl",
+        "data/garmin_running_records",
+        "data/garmin_running_laps",
+        "data/garmin_running_tracks",
+    ]
+    if not os.path.exists(path)
+]
+if missing:
+    st.warning(f"Run the pipeline first (missing: {', '.join(missing)}).")
+    st.stop()
+
+# -----------------------------------------------------------------------------
+# Importing Data
+# -----------------------------------------------------------------------------
+
+# One row per run (small), records and laps are only loaded for the selected run
+df_running = pd.read_pickle("data/garmin_running.pkl")
+# Km splits computed by transform_data.py (activity_metrics.py)
+df_splits = pd.read_pickle("data/garmin_running_splits.pkl")
+df_personal_records = pd.read_pickle("data/garmin_personal_records.pkl")
+
+
+# The version reopens a store once the pipeline has swapped a new one in
+@st.experimental_singleton
+def open_store(folder, version):
+    return ActivityStore(folder)
+
+
+store_records = open_store(
+    "data/garmin_running_records", store_version("data/garmin_running_records")
+)
+store_laps = open_store(
+    "data/garmin_running_laps", store_version("data/garmin_running_laps")
+)
+
+
+@st.experimental_singleton
+def open_tracks(folder, version):
+    return TrackStore(folder)
+
+
+store_tracks = open_tracks(
+    "data/garmin_running_tracks", store_version("data/garmin_running_tracks")
+)
+
+# Tolerance (in meters) of the polylines drawn on the maps
+TRACK_TOLERANCE = 5
+
+# -----------------------------------------------------------------------------
+# Transforming dataframes for the ease of streamlit components
+# -----------------------------------------------------------------------------
+
+# Most recent runs first
+df_running = df_running.sort_values("start_time", ascending=False)
+
+
+# Duration columns, stored in seconds
+duration_columns = [
+    "elapsed_time",
+    "moving_time",
+    "hrz_1_time",
+    "hrz_2_time",
+    "hrz_3_time",
+    "hrz_4_time",
+    "hrz_5_time",
+]
+
+
+def durations_to_minutes(df):
+    # Convert duration columns to minutes
+    for col in duration_columns:
+        if col in df.columns:
+            df[col] = to_seconds(df[col]) / 60
+    return df
+
+
+df_running = durations_to_minutes(df_running)
+
+
+# -----------------------------------------------------------------------------
+# Header elements (page title)
+# -----------------------------------------------------------------------------
+
+st.markdown("# Running Activities :runner:")
+
+# -----------------------------------------------------------------------------
+# Personal records
+# -----------------------------------------------------------------------------
+
+st.markdown("### Personal records")
+
+df_pr = df_personal_records.reset_index()
+df_pr["time"] = pd.to_timedelta(df_pr["time"].round(), unit="s").astype(str)
+df_pr["pace (min/km)"] = (df_pr["pace"] / 60).round(2)
+df_pr["date"] = df_pr["start_time"].dt.date
+st.dataframe(
+    df_pr[["effort", "time", "pace (min/km)", "date", "runs"]].set_index("effort"),
+    use_container_width=True,
+)
+
+# -----------------------------------------------------------------------------
+# Run selection
+# -----------------------------------------------------------------------------
+
+runs = df_running.set_index("activity_id")
+
+activity_id = st.selectbox(
+    label="Run",
+    options=runs.index,
+    format_func=lambda x: f"{runs.loc[x, 'start_time']:%Y-%m-%d %H:%M} - {runs.loc[x, 'distance']:.2f} km",
+)
+run = runs.loc[activity_id]
+
+# Loading the selected run only
+df_records = store_records.load(activity_id)
+df_laps = durations_to_minutes(store_laps.load(activity_id))
+# Simplified polyline of the run, drawn on both maps
+df_track = store_tracks.load(activity_id, tolerance=TRACK_TOLERANCE)
+
+# -----------------------------------------------------------------------------
+# Run overview
+# -----------------------------------------------------------------------------
+
+st.markdown("### Overview")
+
+col1, col2, col3, col4 = st.columns(4, gap="large")
+
+with col1:
+    st.metric(label="Distance (km)", value=round(run["distance"], 2))
+
+with col2:
+    st.metric(
+        label="Elapsed time (min)",
+        value=round(run["elapsed_time"], 1),
+    )
+
+with col3:
+    if "avg_hr" in run:
+        st.metric(label="Average heart rate", value=run["avg_hr"])
+
+with col4:
+    if "calories" in run:
+        st.metric(label="Calories", value=run["calories"])
+
+# -----------------------------------------------------------------------------
+# Records graphs
+# -----------------------------------------------------------------------------
+
+st.markdown("### Records")
+
+if df_records.empty:
+    st.warning("No records available for this run.")
+else:
+    df_records["elapsed_minutes"] = (
+        df_records["timestamp"] - df_records["timestamp"].iloc[0]
+    ).dt.total_seconds() / 60
+
+    col1, col2 = st.columns(2, gap="large")
+
+    for col, y, title, color in [
+        (col1, "hr", "Heart rate", "#FF5151"),
+        (col2, "speed", "Speed", "#6495ED"),
+    ]:
+        if y not in df_records:
+            continue
+        with col:
+            st.write(title)
+            chart = (
+                alt.Chart(reduce_chart_data(df_records, x="elapsed_minutes", y=y))
+                .mark_line(color=color, interpolate="monotone")
+                .encode(
+                    alt.X("elapsed_minutes", axis=alt.Axis(title="minutes")),
+                    alt.Y(y, axis=alt.Axis(title=None), scale=alt.Scale(zero=False)),
+                )
+            )
+            st.altair_chart(chart, use_container_width=True)
+
+    if not df_track.empty:
+        st.map(df_track)
+
+# -----------------------------------------------------------------------------
+# Splits and derived metrics
+# -----------------------------------------------------------------------------
+
+st.markdown("### Splits")
+
+df_run_splits = df_splits[df_splits["activity_id"] == activity_id].copy()
+
+col1, col2, col3 = st.columns(3, gap="large")
+
+with col1:
+    st.metric(label="Pace variability (CV)", value=run.get("split_pace_cv"))
+
+with col2:
+    st.metric(label="Heart rate drift (%)", value=run.get("hr_drift"))
+
+with col3:
+    st.metric(label="Cadence (steps/min)", value=run.get("cadence_avg"))
+
+if df_run_splits.empty:
+    st.warning("No full kilometer in this run.")
+else:
+    df_run_splits["pace"] = df_run_splits["split_time"] / 60
+    chart = (
+        alt.Chart(df_run_splits)
+        .mark_bar(color="#6495ED")
+        .encode(
+            alt.X("km:O", axis=alt.Axis(title="km")),
+            alt.Y("pace", axis=alt.Axis(title="min/km"), scale=alt.Scale(zero=False)),
+            tooltip=["km", alt.Tooltip("pace", format=".2f"), "avg_hr"],
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+zone_columns = [f"zone_{zone}_time" for zone in range(1, 6)]
+if set(zone_columns).issubset(runs.columns):
+    st.write("Time in heart rate zones (min)")
+    st.bar_chart(
+        pd.DataFrame(
+            {"minutes": run[zone_columns].to_numpy(dtype="float64") / 60},
+            index=[f"Zone {zone}" for zone in range(1, 6)],
+        )
+    )
+
+# -----------------------------------------------------------------------------
+# Runs in the same area
+# -----------------------------------------------------------------------------
+
+st.markdown("### Runs in the same area")
+
+if df_track.empty:
+    st.warning("No GPS track for this run.")
+else:
+    # Area around the start of the selected run
+    radius = st.slider("Distance from the start (km)", 0.1, 5.0, 0.5, step=0.1)
+    lat, lon = df_track.iloc[0]
+    lat_margin = radius / 111.32
+    lon_margin = lat_margin / np.cos(np.radians(lat))
+    area_ids = store_tracks.activities_in_area(
+        lat - lat_margin, lat + lat_margin, lon - lon_margin, lon + lon_margin
+    )
+    st.write(f"{len(area_ids)} runs passed through this area.")
+    st.map(store_tracks.load_all(TRACK_TOLERANCE, area_ids)[["lat", "lon"]])
+    st.dataframe(
+        runs.loc[runs.index.isin(area_ids), ["start_time", "distance", "elapsed_time"]],
+        use_container_width=True,
+    )
+
+# -----------------------------------------------------------------------------
+# Laps
+# -----------------------------------------------------------------------------
+
+st.markdown("### Laps")
+
+st.dataframe(df_laps.drop(columns=["activity_id"]), use_container_width=True)
@@ -0,0 +1,177 @@
+import streamlit as st
+import pandas as pd
+import altair as alt
+
+import os
+
+from chart_data import reduce_chart_data
+from durations import to_seconds
+
+# -----------------------------------------------------------------------------
+# Setting up page Config
+# -----------------------------------------------------------------------------
+
+st.set_page_config(
+    page_title="Sleep",
+    page_icon=":sleeping:",
+    layout="wide",
+    menu_items={
+        "Get help": "https://www.linkedin.com/in/christophe-level",
+        "About": "# This is a personal project. Visit my website for other projects: https://crish1eev1.github.io/",
+    },
+)
+
+# -----------------------------------------------------------------------------
+# Checking the pipeline outputs
+# -----------------------------------------------------------------------------
+
+# The nights are written by transform_data.py (not shipped with the repository)
+if not os.path.exists("data/garmin_nights.pkl"):
+    st.warning("Run the pipeline first (missing: data/garmin_nights.pkl).")
+    st.stop()
+
+# -----------------------------------------------------------------------------
+# Importing Data
+# -----------------------------------------------------------------------------
+
+# One row per night, precomputed from the monitoring data by transform_data.py
+df_nights = pd.read_pickle("data/garmin_nights.pkl")
+
+# -----------------------------------------------------------------------------
+# Transforming dataframes for the ease of streamlit components
+# -----------------------------------------------------------------------------
+
+# Duration columns in hours
+cols = [
+    "total_sleep",
+    "deep_sleep",
+    "light_sleep",
+    "rem_sleep",
+    "awake",
+]
+for col in cols:
+    df_nights[col] = to_seconds(df_nights[col]) / 3600
+
+df_nights = df_nights.reset_index()
+df_nights = df_nights.rename(columns={"day": "date"})
+
+# -----------------------------------------------------------------------------
+# Defining plotting functions
+# -----------------------------------------------------------------------------
+
+
+def create_line_chart(df, y, color, title=None):
+    chart = (
+        alt.Chart(reduce_chart_data(df, x="date", y=y))
+        .mark_line(color=color, interpolate="monotone", opacity=0.7)
+        .encode(
+            alt.X("date:T", axis=alt.Axis(title=None)),
+            alt.Y(y, axis=alt.Axis(title=title), scale=alt.Scale(zero=False)),
+        )
+    )
+    st.altair_chart(chart, use_container_width=True)
+
+
+# -----------------------------------------------------------------------------
+# Header elements (page title & period filter)
+# -----------------------------------------------------------------------------
+
+st.markdown("# Sleep :sleeping:")
+
+start_date, end_date = st.slider(
+    "Period",
+    min_value=df_nights["date"].min().date(),
+    max_value=df_nights["date"].max().date(),
+    value=(
+        (df_nights["date"].max() - pd.DateOffset(months=3)).date(),
+        df_nights["date"].max().date(),
+    ),
+)
+
+mask = (df_nights["date"] >= pd.to_datetime(start_date)) & (
+    df_nights["date"] <= pd.to_datetime(end_date)
+)
+df_period = df_nights[mask]
+
+# -----------------------------------------------------------------------------
+# Period overview
+# -----------------------------------------------------------------------------
+
+st.markdown("### Overview")
+
+col1, col2, col3, col4 = st.columns(4, gap="large")
+
+with col1:
+    st.metric(
+        label="Average total sleep (in hours)",
+        value=round(df_period["total_sleep"].mean(), 1),
+    )
+
+with col2:
+    st.metric(
+        label="Average in-sleep heart rate",
+        value=round(df_period["hr_mean"].mean(), 1),
+    )
+
+with col3:
+    st.metric(
+        label="Average in-sleep stress",
+        value=round(df_period["stress_mean"].mean(), 1),
+    )
+
+with col4:
+    st.metric(
+        label="Average restlessness (bpm change per minute)",
+        value=round(df_period["restlessness"].mean(), 2),
+    )
+
+# -----------------------------------------------------------------------------
+# Sleep stages
+# -----------------------------------------------------------------------------
+
+st.markdown("### Sleep stages (in hours)")
+
+stages = (
+    df_period[["date", "deep_sleep", "light_sleep", "rem_sleep", "awake"]]
+    .melt(id_vars="date", var_name="stage", value_name="hours")
+    .dropna()
+)
+chart = (
+    alt.Chart(stages)
+    .mark_bar(opacity=0.8)
+    .encode(
+        alt.X("date:T", axis=alt.Axis(title=None)),
+        alt.Y("hours:Q", axis=alt.Axis(title=None), stack=True),
+        alt.Color(
+            "stage:N",
+            scale=alt.Scale(
+                domain=["deep_sleep", "light_sleep", "rem_sleep", "awake"],
+                range=["#0077BE", "#87CEFA", "#6495ED", "#FFA0A0"],
+            ),
+        ),
+    )
+)
+st.altair_chart(chart, use_container_width=True)
+
+# -----------------------------------------------------------------------------
+# In-sleep monitoring metrics
+# -----------------------------------------------------------------------------
+
+st.markdown("### In-sleep metrics")
+
+col1, col2 = st.columns(2, gap="large")
+
+with col1:
+    st.write("Average heart rate")
+    create_line_chart(df_period, y="hr_mean", color="#FF5151")
+    st.write("Average stress")
+    create_line_chart(df_period, y="stress_mean", color="#87CEFA")
+
+with col2:
+    st.write("Minimum heart rate")
+    create_line_chart(df_period, y="hr_min", color="#FF6961")
+    st.write("Average respiration rate")
+    create_line_chart(df_period, y="respiration_rate_mean", color="#6495ED")
+
+st.write("Restlessness (mean absolute heart rate change per minute)")
+create_line_chart(df_period, y="restlessness", color="#0077BE")
@@ -4,8 +4,14 @@ import altair as alt
 import plotly.graph_objects as go
 
 from datetime import date, timedelta
+import os
 import time
 
+from chart_data import project_columns, reduce_chart_data
+from durations import to_seconds
+from range_summary import RangeSummaryIndex
+from warehouse import WAREHOUSE_PATH, Warehouse
+
 # -----------------------------------------------------------------------------
 # Importing Data
 # -----------------------------------------------------------------------------
@@ -14,11 +20,14 @@ df_days = pd.read_pickle("../../src/dashboard/data/garmin_days.pkl")
 df_weeks = pd.read_pickle("../../src/dashboard/data/garmin_weeks.pkl")
 df_months = pd.read_pickle("../../src/dashboard/data/garmin_months.pkl")
 
+# Written by the pipeline (not shipped with the repository)
+day_zones_path = "../../src/dashboard/data/garmin_day_zones.pkl"
+
 # -----------------------------------------------------------------------------
 # Transforming dataframes for the ease of streamlit components
 # -----------------------------------------------------------------------------
 
-# Convert duration columns to float because streamlit doesn't handle durations
+# Duration columns in seconds (timedeltas in older tables)
 cols = [
     "moderate_activity_time",
     "vigorous_activity_time",
@@ -29,12 +38,11 @@ cols = [
     "light_sleep",
     "rem_sleep",
     "awake",
-    "avg_rr_sleep",
 ]
 for col in cols:
-    df_days[col] = df_days[col].apply(lambda x: x.total_seconds())
-    df_weeks[col] = df_weeks[col].apply(lambda x: x.total_seconds())
-    df_months[col] = df_months[col].apply(lambda x: x.total_seconds())
+    df_days[col] = to_seconds(df_days[col])
+    df_weeks[col] = to_seconds(df_weeks[col])
+    df_months[col] = to_seconds(df_months[col])
 
 df_days = df_days.reset_index()
 df_days = df_days.rename(columns={"day": "date"})
@@ -51,7 +59,12 @@ df_months["month_year"] = df_months["date"].dt.strftime("%Y-%m")
 # HR evolution
 # -----------------------------------------------------------------------------
 
-base = alt.Chart(df_weeks).encode(alt.X("date:T", axis=alt.Axis(title=None)))
+# Keep the min/max of each bucket so the hr range isn't flattened by downsampling
+df_hr = reduce_chart_data(
+    df_weeks, x="date", y=["hr_max", "hr_min", "inactive_hr_avg"], method="minmax"
+)
+
+base = alt.Chart(df_hr).encode(alt.X("date:T", axis=alt.Axis(title=None)))
 area = base.mark_area(opacity=0.3, color="#57A44C").encode(
     alt.Y("hr_max", axis=alt.Axis(title="hr", titleColor="#57A44C")), alt.Y2("hr_min")
 )
@@ -64,3 +77,134 @@ line1 = base.mark_line(stroke="#5276A7", interpolate="monotone").encode(
 # alt.layer(area, line1).resolve_scale(y="independent")
 
 st.altair_chart(area + line1, use_container_width=True)
+
+
+# -----------------------------------------------------------------------------
+# Heart rate zones
+# -----------------------------------------------------------------------------
+
+# The section is hidden until the pipeline has computed the zones
+if os.path.exists(day_zones_path):
+    df_day_zones = pd.read_pickle(day_zones_path)
+
+    st.markdown("### Weekly time in heart rate zones")
+
+    # Daily zone times (seconds) summed per week, in hours
+    zone_columns = [col for col in df_day_zones.columns if col.startswith("zone_")]
+    df_week_zones = df_day_zones.resample("W").sum()
+    df_week_zones[zone_columns] = df_week_zones[zone_columns] / 3600
+    df_week_zones = df_week_zones.reset_index().rename(columns={"day": "date"})
+
+    # Every bar is kept (encoded columns only), the TRIMP line is downsampled
+    zones_chart = (
+        alt.Chart(project_columns(df_week_zones, ["date"] + zone_columns))
+        .transform_fold(zone_columns, as_=["zone", "hours"])
+        .mark_bar()
+        .encode(
+            alt.X("date:T", axis=alt.Axis(title=None)),
+            alt.Y("hours:Q", stack=True),
+            alt.Color("zone:N"),
+        )
+    )
+    trimp_line = (
+        alt.Chart(reduce_chart_data(df_week_zones, x="date", y="trimp"))
+        .mark_line(color="black")
+        .encode(alt.X("date:T"), alt.Y("trimp:Q", axis=alt.Axis(title="TRIMP")))
+    )
+    st.altair_chart(
+        alt.layer(zones_chart, trimp_line).resolve_scale(y="independent"),
+        use_container_width=True,
+    )
+
+
+# -----------------------------------------------------------------------------
+# Custom range summary
+# -----------------------------------------------------------------------------
+
+# Built once per version of the days table, each summary is then a constant-time
+# lookup (the modification time rebuilds it once the pipeline has rewritten the table)
+@st.experimental_singleton
+def load_range_index(path, version):
+    return RangeSummaryIndex(pd.read_pickle(path))
+
+
+days_path = "../../src/dashboard/data/garmin_days.pkl"
+range_index = load_range_index(days_path, os.path.getmtime(days_path))
+
+st.markdown("### Custom range summary")
+
+date_range = st.date_input(
+    "Date range",
+    value=(range_index.last_day - timedelta(days=30), range_index.last_day),
+    min_value=range_index.first_day,
+    max_value=range_index.last_day,
+)
+
+# The widget returns a single date while the range is being selected
+if len(date_range) == 2:
+    df_summary = range_index.summary(
+        date_range[0],
+        date_range[1],
+        columns=[
+            "resting_hr",
+            "stress_avg",
+            "steps",
+            "distance",
+            "calories",
+            "intensity_time",
+            "running_distance",
+            "total_sleep",
+        ],
+    )
+    st.dataframe(df_summary.round(1), use_container_width=True)
+
+
+# -----------------------------------------------------------------------------
+# Monitoring of the custom range
+# -----------------------------------------------------------------------------
+
+st.markdown("### Daily monitoring over the range")
+
+
+# The warehouse is only written with HEALTH_TRACKER_WAREHOUSE, it is opened again
+# once the pipeline has replaced it (and looked for on every run until it exists)
+@st.experimental_singleton
+def load_warehouse(path, version):
+    return Warehouse(path)
+
+
+warehouse = (
+    load_warehouse(WAREHOUSE_PATH, os.path.getmtime(WAREHOUSE_PATH))
+    if os.path.exists(WAREHOUSE_PATH)
+    else None
+)
+
+if warehouse is None:
+    st.info(
+        "Run the transform with HEALTH_TRACKER_WAREHOUSE=1 to see the daily "
+        "monitoring aggregates of the range."
+    )
+elif len(date_range) == 2:
+    # Indexed query on the materialized daily aggregates of the minute table
+    df_range = warehouse.time_range(
+        "garmin_monitoring_day",
+        date_range[0],
+        date_range[1],
+        column="day",
+        columns=["stress_mean", "heart_rate_mean", "respiration_rate_mean"],
+    )
+    df_range = df_range.reset_index().rename(columns={"day": "date"})
+    range_chart = (
+        alt.Chart(df_range)
+        .transform_fold(
+            ["stress_mean", "heart_rate_mean", "respiration_rate_mean"],
+            as_=["measure", "value"],
+        )
+        .mark_line()
+        .encode(
+            alt.X("date:T", axis=alt.Axis(title=None)),
+            alt.Y("value:Q", axis=alt.Axis(title=None)),
+            alt.Color("measure:N"),
+        )
+    )
+    st.altair_chart(range_chart, use_container_width=True)
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+
+class RangeSummaryIndex:
+    """Cumulative sums over the daily metrics, answering any date-range summary in O(1).
+
+    For every metric the index stores the running sum, sum of squares and count of
+    non-missing days (with a leading zero row), so the total, mean and standard
+    deviation between two days only need two lookups per array.
+    """
+
+    def __init__(self, df_days: pd.DataFrame, columns: list = None):
+        """Builds the index (a single pass over the daily dataframe).
+
+        Args:
+            df_days (pd.DataFrame): The daily dataframe, indexed by day. Durations are summarized in seconds.
+            columns (list): The metrics to index. Default is every numeric or duration column.
+        """
+        if columns is None:
+            columns = [
+                col
+                for col in df_days.columns
+                if pd.api.types.is_numeric_dtype(df_days[col])
+                or pd.api.types.is_timedelta64_dtype(df_days[col])
+            ]
+        self.columns = list(columns)
+
+        # One row per calendar day (removed days are missing values)
+        days = pd.date_range(df_days.index.min(), df_days.index.max(), freq="D")
+        df = df_days[self.columns].reindex(days)
+        values = np.column_stack(
+            [
+                df[col].dt.total_seconds().to_numpy(dtype="float64")
+                if pd.api.types.is_timedelta64_dtype(df[col])
+                else df[col].to_numpy(dtype="float64")
+                for col in self.columns
+            ]
+        )
+
+        # Shifting by the mean limits cancellation errors in the variance
+        valid = ~np.isnan(values)
+        with np.errstate(invalid="ignore"):
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0))
+        centered = np.where(valid, values - self.shift, 0.0)
+
+        self.first_day = days[0]
+        self.last_day = days[-1]
+        self.sums = np.vstack([np.zeros(len(self.columns)), np.cumsum(centered, 0)])
+        self.squares = np.vstack(
+            [np.zeros(len(self.columns)), np.cumsum(centered**2, 0)]
+        )
+        self.counts = np.vstack(
+            [np.zeros(len(self.columns), dtype="int64"), np.cumsum(valid, 0)]
+        )
+
+    def _position(self, day) -> int:
+        """Returns the number of indexed days before a day (clipped to the index)."""
+        offset = (pd.Timestamp(day).normalize() - self.first_day).days
+        return int(np.clip(offset, 0, len(self.sums) - 1))
+
+    def summary(self, start, end, columns: list = None) -> pd.DataFrame:
+        """Returns the count, total, mean and standard deviation of metrics between two days.
+
+        Args:
+            start: The first day of the range (included).
+            end: The last day of the range (included).
+            columns (list): The metrics to summarize. Default is every indexed metric.
+
+        Returns:
+            pd.DataFrame: One row per metric with "count", "total", "mean" and "std" columns.
+        """
+        columns = self.columns if columns is None else columns
+        positions = [self.columns.index(col) for col in columns]
+        first = self._position(start)
+        last = self._position(pd.Timestamp(end) + pd.Timedelta(days=1))
+
+        count = (self.counts[last] - self.counts[first])[positions]
+        sums = (self.sums[last] - self.sums[first])[positions]
+        squares = (self.squares[last] - self.squares[first])[positions]
+        shift = self.shift[positions]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sums / count
+            # Sample standard deviation (ddof=1), like pandas
+            variance = (squares - sums * mean) / (count - 1)
+        std = np.sqrt(np.clip(variance, 0, None))
+
+        return pd.DataFrame(
+            {
+                "count": count,
+                "total": sums + count * shift,
+                "mean": np.where(count > 0, mean + shift, np.nan),
+                "std": np.where(count > 1, std, np.nan),
+            },
+            index=pd.Index(columns, name="metric"),
+        )
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+import json
+import os
+import sys
+
+# The cell keys are built by the ETL module that writes the store
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "data"))
+from grid import grid_keys
+
+
+class TrackStore:
+    """Reads the GPS tracks written by write_track_store (src/data/tracks.py).
+
+    Arrays are memory-mapped: loading a track decodes its own block only, and the
+    grid index answers which activities passed through an area without reading
+    any point. As in ActivityStore, a map is only held for the time of a read so
+    the pipeline can swap a new store in.
+    """
+
+    def __init__(self, folder: str):
+        """Opens the store without reading any point.
+
+        Args:
+            folder (str): The directory the store was written to.
+        """
+        self.folder = folder
+        self.index = pd.read_pickle(os.path.join(folder, "index.pkl"))
+        with open(os.path.join(folder, "tracks.json")) as f:
+            meta = json.load(f)
+        self.key = meta["key"]
+        self.coordinate_scale = meta["coordinate_scale"]
+        self.tolerances = meta["tolerances"]
+        self.cell_size = meta["cell_size"]
+
+    def _map(self, name: str) -> np.ndarray:
+        """Returns the memory map of an array, to be dropped once read."""
+        return np.load(os.path.join(self.folder, f"{name}.npy"), mmap_mode="r")
+
+    @property
+    def activity_ids(self) -> pd.Index:
+        """The activities with a track, in block order."""
+        return self.index.index
+
+    def _decode(self, start: int, stop: int) -> np.ndarray:
+        """Returns the (points, 2) coordinates of the rows [start, stop), in degrees."""
+        deltas = np.array(self._map("deltas")[start:stop], dtype="int64")
+        keyframe_rows = self._map("keyframe_rows")
+        first = np.searchsorted(keyframe_rows, start)
+        last = np.searchsorted(keyframe_rows, stop)
+        rows = np.array(keyframe_rows[first:last]) - start
+        values = np.array(self._map("keyframe_values")[first:last], dtype="int64")
+
+        # Every point is its keyframe plus the deltas since that keyframe
+        totals = np.cumsum(deltas, axis=0)
+        is_keyframe = np.zeros(len(deltas), dtype=bool)
+        is_keyframe[rows] = True
+        segment = np.cumsum(is_keyframe) - 1
+        quantized = values[segment] + totals - totals[rows][segment]
+        return quantized / self.coordinate_scale
+
+    def load(self, activity_id, tolerance: int = None) -> pd.DataFrame:
+        """Returns the track of a single activity.
+
+        Args:
+            activity_id: The activity to load.
+            tolerance (int): The tolerance (in meters) of a simplified polyline to
+                load instead of the full track. Default is the full track.
+
+        Returns:
+            pd.DataFrame: The "lat" and "lon" of the points (empty if the activity has no track).
+        """
+        if activity_id not in self.index.index:
+            return pd.DataFrame(columns=["lat", "lon"])
+
+        if tolerance is None:
+            start, stop = self.index.loc[activity_id, ["start", "stop"]]
+            coordinates = self._decode(start, stop)
+        else:
+            start, stop = self.index.loc[
+                activity_id, [f"{tolerance}m_start", f"{tolerance}m_stop"]
+            ]
+            coordinates = np.array(self._map(f"simplified_{tolerance}m")[start:stop])
+        return pd.DataFrame(coordinates, columns=["lat", "lon"])
+
+    def load_all(self, tolerance: int, activity_ids: list = None) -> pd.DataFrame:
+        """Returns the simplified polylines of many activities, for the maps.
+
+        Args:
+            tolerance (int): The tolerance of the polylines, in meters.
+            activity_ids (list): The activities to load. Default is all activities.
+
+        Returns:
+            pd.DataFrame: The key, "lat" and "lon" of every point.
+        """
+        index = self.index
+        if activity_ids is not None:
+            index = index[index.index.isin(activity_ids)]
+        starts = index[f"{tolerance}m_start"].to_numpy()
+        stops = index[f"{tolerance}m_stop"].to_numpy()
+        lengths = stops - starts
+        # Positions of the points of every activity, gathered in one read
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions += np.arange(lengths.sum())
+        coordinates = np.array(self._map(f"simplified_{tolerance}m")[positions])
+        df = pd.DataFrame(coordinates, columns=["lat", "lon"])
+        df.insert(0, self.key, np.repeat(index.index.to_numpy(), lengths))
+        return df
+
+    def activities_in_area(
+        self,
+        lat_min: float,
+        lat_max: float,
+        lon_min: float,
+        lon_max: float,
+        exact: bool = True,
+    ) -> pd.Index:
+        """Returns the activities passing through a latitude/longitude rectangle.
+
+        The grid index gives the activities crossing the cells the rectangle
+        overlaps, with one binary search per latitude row of cells. With exact,
+        the points of these candidates are then checked against the rectangle.
+
+        Args:
+            lat_min (float): The southern bound, in degrees.
+            lat_max (float): The northern bound, in degrees.
+            lon_min (float): The western bound, in degrees.
+            lon_max (float): The eastern bound, in degrees.
+            exact (bool): Whether to check the points of the candidates. Default is True.
+
+        Returns:
+            pd.Index: The activities found, in block order.
+        """
+        rows = np.arange(
+            np.floor(lat_min / self.cell_size), np.floor(lat_max / self.cell_size) + 1
+        ).astype("int64")
+        first_column = int(np.floor(lon_min / self.cell_size))
+        last_column = int(np.floor(lon_max / self.cell_size))
+        grid_cells = self._map("grid_cells")
+        lows = np.searchsorted(
+            grid_cells, grid_keys(rows, np.full(len(rows), first_column)), side="left"
+        )
+        highs = np.searchsorted(
+            grid_cells, grid_keys(rows, np.full(len(rows), last_column)), side="right"
+        )
+        grid_activities = self._map("grid_activities")
+        candidates = np.unique(
+            np.concatenate(
+                [np.empty(0, dtype="int64")]
+                + [
+                    np.array(grid_activities[low:high])
+                    for low, high in zip(lows, highs)
+                ]
+            )
+        )
+        # Maps released before the points of the candidates are read
+        del grid_cells, grid_activities
+
+        if exact:
+            found = []
+            for position in candidates:
+                start, stop = self.index.iloc[position][["start", "stop"]]
+                lat, lon = self._decode(start, stop).T
+                if np.any(
+                    (lat >= lat_min)
+                    & (lat <= lat_max)
+                    & (lon >= lon_min)
+                    & (lon <= lon_max)
+                ):
+                    found.append(position)
+            candidates = np.asarray(found, dtype="int64")
+        return self.index.index[candidates]
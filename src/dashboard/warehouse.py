@@ -0,0 +1,104 @@
+import pandas as pd
+
+import os
+import pathlib
+import sqlite3
+
+# Location of the warehouse written by src/data/warehouse.py (same
+# HEALTH_TRACKER_WAREHOUSE_PATH variable as the ETL, relative to the repository root)
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+WAREHOUSE_PATH = os.path.join(
+    ROOT,
+    os.environ.get("HEALTH_TRACKER_WAREHOUSE_PATH", "data/processed/health_tracker.db"),
+)
+
+# Text columns converted back to timestamps when read
+DATE_COLUMNS = ["timestamp", "day", "week", "month", "start_time", "stop_time"]
+
+
+class Warehouse:
+    """Reads the SQLite warehouse written by write_warehouse (src/data/warehouse.py).
+
+    The database is opened read-only, and the helpers select a time range through
+    the timestamp and day indexes, so a page only loads the rows it displays. A
+    connection is only held for the time of a query, so the pipeline can replace
+    the file while the dashboard runs.
+    """
+
+    def __init__(self, path: str = WAREHOUSE_PATH):
+        """Opens the warehouse without reading any row.
+
+        Args:
+            path (str): The path of the database file. Default is WAREHOUSE_PATH.
+        """
+        self.path = path
+        self._uri = pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns a read-only connection to the database."""
+        return sqlite3.connect(self._uri, uri=True)
+
+    @property
+    def tables(self) -> list:
+        """The tables of the warehouse."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [row[0] for row in rows]
+
+    def query(self, sql: str, params=()) -> pd.DataFrame:
+        """Runs a query, timestamp and day columns are returned as datetimes.
+
+        Args:
+            sql (str): The SQL query.
+            params: The parameters of the query. Default is none.
+
+        Returns:
+            pd.DataFrame: The result of the query.
+        """
+        conn = self._connect()
+        try:
+            df = pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+        for column in DATE_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column])
+        return df
+
+    def time_range(
+        self, table: str, start, end, column: str = "timestamp", columns: list = None
+    ) -> pd.DataFrame:
+        """Returns the rows of a table between two dates (included), indexed by the time column.
+
+        Args:
+            table (str): The table to read, e.g. "garmin_monitoring" or "garmin_monitoring_day".
+            start: The first timestamp or day of the range.
+            end: The last timestamp or day of the range.
+            column (str): The time column of the table. Default is "timestamp".
+            columns (list): The columns to read. Default is all columns.
+
+        Returns:
+            pd.DataFrame: The rows of the range, indexed by `column`.
+        """
+        selected = "*" if columns is None else ", ".join([column] + list(columns))
+        # Times are stored as "YYYY-MM-DD HH:MM:SS" text ("YYYY-MM-DD" for days),
+        # which sorts like the times themselves. A bound at midnight is a whole day:
+        # the start is written as a date and the end as the last second of the day
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        start = start.strftime(
+            "%Y-%m-%d" if start == start.normalize() else "%Y-%m-%d %H:%M:%S"
+        )
+        end = end.strftime(
+            "%Y-%m-%d 23:59:59" if end == end.normalize() else "%Y-%m-%d %H:%M:%S"
+        )
+        df = self.query(
+            f'SELECT {selected} FROM "{table}" WHERE "{column}" BETWEEN ? AND ? '
+            f'ORDER BY "{column}"',
+            (start, end),
+        )
+        return df.set_index(column)
@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+
+import json
+import os
+
+from best_efforts import BEST_EFFORT_DISTANCES, best_efforts
+from hr_zones import HR_ZONES, MAX_RECORD_GAP, zone_bounds, zone_times
+from profiling import hash_rows
+
+METRIC_COLUMNS = [
+    "records",
+    "km_splits",
+    "split_time_mean",
+    "split_pace_cv",
+    "hr_drift",
+    "zone_1_time",
+    "zone_2_time",
+    "zone_3_time",
+    "zone_4_time",
+    "zone_5_time",
+    "cadence_avg",
+    "cadence_max",
+    "cadence_cv",
+] + list(BEST_EFFORT_DISTANCES)
+SPLIT_COLUMNS = ["activity_id", "km", "split_time", "avg_hr"]
+
+# Dtypes of the cached tables (counts are integers, the other metrics may be missing),
+# so that concatenating with an empty cache doesn't make object columns
+METRIC_DTYPES = {column: "float64" for column in METRIC_COLUMNS}
+METRIC_DTYPES.update(
+    {"records": "int64", "km_splits": "int64", "content_hash": "uint64"}
+)
+SPLIT_DTYPES = {"km": "int64", "split_time": "float64", "avg_hr": "float64"}
+
+
+def content_hashes(df: pd.DataFrame, key: str = "activity_id") -> pd.Series:
+    """Returns a 64-bit hash of the rows of every activity (indexed by activity).
+
+    The row hashes of an activity are summed (wrapping around), so the hash changes
+    whenever one of its rows is added, removed or modified, whatever the row order.
+    """
+    codes, ids = pd.factorize(df[key])
+    totals = np.zeros(len(ids), dtype="uint64")
+    np.add.at(totals, codes, hash_rows(df))
+    return pd.Series(totals, index=pd.Index(ids, name=key))
+
+
+def _elapsed_seconds(records: pd.DataFrame) -> np.ndarray:
+    """Returns the seconds elapsed since the first record of an activity."""
+    timestamps = records["timestamp"].to_numpy(dtype="datetime64[ns]")
+    return (timestamps - timestamps[0]) / np.timedelta64(1, "s")
+
+
+def _km_splits(elapsed: np.ndarray, distance: np.ndarray, hr: np.ndarray) -> tuple:
+    """Returns the time and average heart rate of every full kilometer."""
+    valid = ~np.isnan(distance)
+    if not valid.any():
+        return np.empty(0), np.empty(0)
+    # Distance is cumulative, small GPS corrections backwards are flattened
+    elapsed, distance = elapsed[valid], np.maximum.accumulate(distance[valid])
+    marks = np.arange(1, int(distance[-1]) + 1)
+    crossings = np.interp(marks, distance, elapsed)
+    split_times = np.diff(np.concatenate([[0.0], crossings]))
+
+    # Kilometer of every record, for the average heart rate of each split
+    km = np.searchsorted(crossings, elapsed, side="left")
+    in_split = (km < len(marks)) & ~np.isnan(hr[valid])
+    counts = np.bincount(km[in_split], minlength=len(marks))
+    sums = np.bincount(km[in_split], weights=hr[valid][in_split], minlength=len(marks))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return split_times, sums / counts
+
+
+def _hr_drift(elapsed: np.ndarray, speed: np.ndarray, hr: np.ndarray) -> float:
+    """Returns the decoupling of speed and heart rate between both halves of a run (in %)."""
+    moving = (speed > 0) & (hr > 0)
+    second_half = elapsed >= elapsed[-1] / 2
+    halves = [moving & ~second_half, moving & second_half]
+    # Both halves need moving samples (e.g. not a run stopped for its second half)
+    if not all(half.any() for half in halves):
+        return np.nan
+    efficiency = [speed[half].mean() / hr[half].mean() for half in halves]
+    return (efficiency[0] - efficiency[1]) / efficiency[0] * 100
+
+
+def _zone_times(elapsed: np.ndarray, hr: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """Returns the seconds spent in each heart rate zone (time to the next record)."""
+    durations = np.diff(elapsed, append=elapsed[-1])
+    durations = np.where(durations <= MAX_RECORD_GAP, durations, 0)
+    return zone_times(hr, durations, bounds)[0]
+
+
+def compute_activity_metrics(
+    records: pd.DataFrame, steps: pd.Series, bounds: np.ndarray
+) -> tuple:
+    """Computes the derived metrics of a single run (best efforts included).
+
+    Args:
+        records (pd.DataFrame): The records of the run, sorted by timestamp.
+        steps (pd.Series): The steps_activities row of the run (or None).
+        bounds (np.ndarray): The lower heart rate bounds of zones 1 to 5.
+
+    Returns:
+        tuple: The metrics (a dict with the METRIC_COLUMNS) and the km splits (a dataframe).
+    """
+    elapsed = _elapsed_seconds(records)
+    distance = records["distance"].to_numpy(dtype="float64")
+    hr = records["hr"].to_numpy(dtype="float64")
+    speed = records["speed"].to_numpy(dtype="float64")
+    cadence = records["cadence"].to_numpy(dtype="float64")
+
+    split_times, split_hr = _km_splits(elapsed, distance, hr)
+    run_zone_times = _zone_times(elapsed, hr, bounds)
+    running_cadence = cadence[cadence > 0]
+
+    metrics = {
+        "records": len(records),
+        "km_splits": len(split_times),
+        "split_time_mean": split_times.mean() if len(split_times) else np.nan,
+        "split_pace_cv": (
+            split_times.std() / split_times.mean() if len(split_times) > 1 else np.nan
+        ),
+        "hr_drift": _hr_drift(elapsed, speed, hr),
+        "cadence_avg": np.nan if steps is None else steps.get("avg_steps_per_min"),
+        "cadence_max": np.nan if steps is None else steps.get("max_steps_per_min"),
+        "cadence_cv": (
+            running_cadence.std() / running_cadence.mean()
+            if len(running_cadence)
+            else np.nan
+        ),
+    }
+    for zone, time in enumerate(run_zone_times, start=1):
+        metrics[f"zone_{zone}_time"] = time
+    # Fastest 1 km, 5 km, 10 km and half marathon within the run
+    efforts = best_efforts(elapsed, distance)
+    for name in BEST_EFFORT_DISTANCES:
+        metrics[name] = efforts[name]
+
+    splits = pd.DataFrame(
+        {
+            "km": np.arange(1, len(split_times) + 1),
+            "split_time": split_times,
+            "avg_hr": split_hr,
+        }
+    )
+    return metrics, splits
+
+
+def _read_cache(folder: str, params: dict) -> tuple:
+    """Returns the cached metrics and splits (empty if not stored or computed with other parameters)."""
+    empty = (
+        pd.DataFrame(columns=METRIC_COLUMNS + ["content_hash"]).astype(METRIC_DTYPES),
+        pd.DataFrame(columns=SPLIT_COLUMNS).astype(SPLIT_DTYPES),
+    )
+    state_path = os.path.join(folder, "state.json")
+    if not os.path.exists(state_path):
+        return empty
+    with open(state_path) as f:
+        if json.load(f)["params"] != params:
+            return empty
+    return (
+        pd.read_pickle(os.path.join(folder, "metrics.pkl")),
+        pd.read_pickle(os.path.join(folder, "splits.pkl")),
+    )
+
+
+def update_activity_metrics(
+    folder: str,
+    activities: pd.DataFrame,
+    records: pd.DataFrame,
+    steps: pd.DataFrame,
+    max_hr: float = None,
+) -> tuple:
+    """Returns the derived metrics of every run, only computing the new or changed ones.
+
+    Each run is identified by its activity_id and a content hash of its activity,
+    steps and records rows: runs whose hash matches the cache (stored in `folder`)
+    are reused, the others are computed and the cache is rewritten. Runs that
+    disappeared are dropped. The whole cache is recomputed when the zone parameters
+    or the metrics change.
+
+    Args:
+        folder (str): The directory of the cache (created if needed).
+        activities (pd.DataFrame): The runs, with an "activity_id" and a "max_hr" column.
+        records (pd.DataFrame): The records of the runs.
+        steps (pd.DataFrame): The steps_activities rows of the runs.
+        max_hr (float): The maximum heart rate the zones are relative to. Default is
+            the highest max_hr of the activities.
+
+    Returns:
+        tuple: The metrics (indexed by activity_id, with the METRIC_COLUMNS and a
+            "content_hash" column) and the km splits (one row per run and km).
+    """
+    if not max_hr:
+        max_hr = float(activities["max_hr"].max())
+    bounds = zone_bounds(max_hr)
+    params = {
+        "max_hr": max_hr,
+        "zones": HR_ZONES,
+        "max_record_gap": MAX_RECORD_GAP,
+        "columns": METRIC_COLUMNS,
+    }
+    cached_metrics, cached_splits = _read_cache(folder, params)
+
+    # One hash per run, from its rows in the three tables
+    hashes = pd.DataFrame(index=pd.Index(activities["activity_id"], name="activity_id"))
+    for name, df in [("activity", activities), ("steps", steps), ("records", records)]:
+        hashes[name] = content_hashes(df).reindex(hashes.index, fill_value=0)
+    hashes = pd.Series(hash_rows(hashes), index=hashes.index)
+
+    cached = set(zip(cached_metrics.index, cached_metrics["content_hash"]))
+    changed = [key for key in hashes.items() if key not in cached]
+    changed = pd.Index([activity_id for activity_id, _ in changed])
+
+    records = records.sort_values(["activity_id", "timestamp"], kind="mergesort")
+    positions = records.groupby("activity_id").indices
+    steps = steps.drop_duplicates("activity_id").set_index("activity_id")
+
+    metrics, splits = {}, []
+    for activity_id in changed:
+        if activity_id not in positions:
+            continue
+        run_steps = steps.loc[activity_id] if activity_id in steps.index else None
+        metrics[activity_id], run_splits = compute_activity_metrics(
+            records.iloc[positions[activity_id]], run_steps, bounds
+        )
+        run_splits.insert(0, "activity_id", activity_id)
+        splits.append(run_splits)
+
+    metrics = pd.DataFrame.from_dict(metrics, orient="index", columns=METRIC_COLUMNS)
+    metrics["content_hash"] = hashes.reindex(metrics.index).to_numpy()
+    kept = hashes.index.difference(changed)
+    metrics = pd.concat([cached_metrics[cached_metrics.index.isin(kept)], metrics])
+    metrics = metrics.astype(METRIC_DTYPES).sort_index()
+    metrics.index.name = "activity_id"
+    splits = pd.concat(
+        [cached_splits[cached_splits["activity_id"].isin(kept)]] + splits,
+        ignore_index=True,
+    )
+    splits = splits.astype(
+        {"activity_id": activities["activity_id"].dtype, **SPLIT_DTYPES}
+    ).sort_values(["activity_id", "km"], ignore_index=True)
+
+    os.makedirs(folder, exist_ok=True)
+    metrics.to_pickle(os.path.join(folder, "metrics.pkl"))
+    splits.to_pickle(os.path.join(folder, "splits.pkl"))
+    # Written last, it commits the tables
+    with open(os.path.join(folder, "state.json"), "w") as f:
+        json.dump({"params": params}, f, indent=2)
+
+    print(f"{len(metrics) - len(kept)} activities computed, {len(kept)} from cache.")
+    return metrics, splits
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+import json
+import os
+import shutil
+import time
+
+
+def _rename(source: str, target: str, attempts: int = 10):
+    """Renames a directory, retrying while a reader copies a block out of it.
+
+    On Windows a directory can't be renamed while one of its files is mapped.
+    The dashboard only maps a file for the time of a read, so the rename is
+    retried for a few seconds before giving up.
+    """
+    for attempt in range(attempts):
+        try:
+            os.rename(source, target)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.5)
+
+
+def replace_folder(building: str, folder: str):
+    """Swaps a fully written directory in place of `folder`.
+
+    Readers memory-map the files of a store, so a store is never rewritten in
+    place: it is written to `building`, the previous directory is renamed aside,
+    the new one is renamed in and the old one removed. A reader never sees a
+    half-written store, and it notices the swap through the modification time of
+    "index.pkl" (see store_version in src/dashboard/activity_store.py).
+
+    Args:
+        building (str): The directory holding the new content.
+        folder (str): The directory to replace (may not exist yet).
+    """
+    old = folder.rstrip("/\\") + ".old"
+    if os.path.exists(old):
+        shutil.rmtree(old)
+    if os.path.exists(folder):
+        _rename(folder, old)
+    _rename(building, folder)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def write_activity_store(
+    df: pd.DataFrame, folder: str, key: str = "activity_id", sort_by: str = None
+) -> pd.DataFrame:
+    """Persists a table as contiguous per-activity blocks of rows with an offset index.
+
+    Rows are sorted by activity so that the rows of one activity form a single block.
+    Each column is saved as its own .npy file (memory-mappable), and "index.pkl" maps
+    every activity to the [start, stop) row range of its block, so a reader only has
+    to touch the rows of the activity it loads. Text columns are saved as fixed-width
+    strings with a "<column>.missing.npy" mask of their missing values. The store is
+    written next to `folder` and swapped in once complete (see replace_folder).
+
+    Args:
+        df (pd.DataFrame): The table to persist, with one or more rows per activity.
+        folder (str): The directory to write the store to (replaced if it exists).
+        key (str): The column identifying the activity. Default is "activity_id".
+        sort_by (str): A column to sort the rows of each activity by. Default is None.
+
+    Returns:
+        pd.DataFrame: The offset index, indexed by activity with "start" and "stop" columns.
+    """
+    building = folder.rstrip("/\\") + ".building"
+    if os.path.exists(building):
+        shutil.rmtree(building)
+    os.makedirs(building)
+
+    # Sorting rows so that each activity forms a contiguous block (stable sort)
+    sort_columns = [key] + ([sort_by] if sort_by else [])
+    df = df.sort_values(sort_columns, kind="mergesort").reset_index(drop=True)
+
+    # Finding the block boundaries
+    keys = df[key].to_numpy()
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate([[0], boundaries]).astype("int64")
+    stops = np.concatenate([boundaries, [len(df)]]).astype("int64")
+    if df.empty:
+        starts, stops = starts[:0], stops[:0]
+    index = pd.DataFrame(
+        {"start": starts, "stop": stops}, index=pd.Index(keys[starts], name=key)
+    )
+
+    # Saving each column as a fixed-width array
+    masked = []
+    for column in df.columns:
+        array = df[column].to_numpy()
+        if array.dtype == "object":
+            # Fixed-width strings can be memory-mapped, Python objects can't, the
+            # missing values are kept in a mask (astype(str) would give "nan"/"None")
+            missing = df[column].isna().to_numpy()
+            array = df[column].where(~missing, "").astype(str).to_numpy(dtype="U")
+            np.save(os.path.join(building, f"{column}.missing.npy"), missing)
+            masked.append(column)
+        np.save(os.path.join(building, f"{column}.npy"), array)
+
+    # Saving the offset index and the column list
+    index.to_pickle(os.path.join(building, "index.pkl"))
+    with open(os.path.join(building, "columns.json"), "w") as f:
+        json.dump({"key": key, "columns": list(df.columns), "masked": masked}, f)
+
+    replace_folder(building, folder)
+    return index
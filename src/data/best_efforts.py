@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# Distances of the best efforts, in km
+BEST_EFFORT_DISTANCES = {"1k": 1.0, "5k": 5.0, "10k": 10.0, "half": 21.0975}
+
+
+def best_efforts(
+    elapsed: np.ndarray, distance: np.ndarray, distances: dict = BEST_EFFORT_DISTANCES
+) -> dict:
+    """Returns the fastest time over each distance within a single activity.
+
+    Every record is tried as the start of the effort: the end is the first point
+    where the cumulative distance has grown by the effort distance, found for all
+    starts at once with a binary search (the vectorized form of the two-pointer
+    sweep, the distance being non-decreasing), and its time is interpolated between
+    the two records around it.
+
+    Args:
+        elapsed (np.ndarray): The seconds elapsed at every record, increasing.
+        distance (np.ndarray): The cumulative distance at every record, in km (NaN if missing).
+        distances (dict): Effort names as keys and distances in km as values. Default is BEST_EFFORT_DISTANCES.
+
+    Returns:
+        dict: The best time of every effort in seconds (NaN if the activity is shorter),
+            and the elapsed seconds at its start ("<name>_start").
+    """
+    valid = ~np.isnan(distance)
+    elapsed = elapsed[valid]
+    # Small GPS corrections backwards are flattened
+    distance = np.maximum.accumulate(distance[valid])
+
+    efforts = {}
+    for name, length in distances.items():
+        efforts[name], efforts[f"{name}_start"] = np.nan, np.nan
+        if not len(distance) or distance[-1] - distance[0] < length:
+            continue
+        targets = distance + length
+        starts = np.flatnonzero(targets <= distance[-1])
+        ends = np.searchsorted(distance, targets[starts], side="left")
+
+        # Interpolating the time the target distance is reached
+        previous = np.maximum(ends - 1, 0)
+        span = distance[ends] - distance[previous]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fraction = np.where(
+                span > 0, (targets[starts] - distance[previous]) / span, 1.0
+            )
+        end_times = elapsed[previous] + fraction * (elapsed[ends] - elapsed[previous])
+        times = end_times - elapsed[starts]
+
+        best = np.argmin(times)
+        efforts[name] = times[best]
+        efforts[f"{name}_start"] = elapsed[starts[best]]
+    return efforts
+
+
+def personal_records(
+    df_running: pd.DataFrame, distances: dict = BEST_EFFORT_DISTANCES
+) -> pd.DataFrame:
+    """Returns the fastest effort over each distance across all runs.
+
+    Args:
+        df_running (pd.DataFrame): The runs, with "activity_id", "start_time" and
+            one column of best effort times (in seconds) per distance.
+        distances (dict): Effort names as keys and distances in km as values. Default is BEST_EFFORT_DISTANCES.
+
+    Returns:
+        pd.DataFrame: One row per distance (indexed by effort name) with the
+            "distance", "time" (seconds), "pace" (seconds per km), "activity_id" and
+            "start_time" of the record, and the number of runs covering the distance.
+    """
+    records = []
+    for name, length in distances.items():
+        times = df_running[name]
+        if times.notna().any():
+            best = df_running.loc[times.idxmin()]
+            record = {
+                "time": best[name],
+                "activity_id": best["activity_id"],
+                "start_time": best["start_time"],
+            }
+        else:
+            record = {"time": np.nan, "activity_id": None, "start_time": pd.NaT}
+        record.update(
+            {
+                "effort": name,
+                "distance": length,
+                "pace": record["time"] / length,
+                "runs": int(times.notna().sum()),
+            }
+        )
+        records.append(record)
+    return pd.DataFrame(
+        records,
+        columns=[
+            "effort",
+            "distance",
+            "time",
+            "pace",
+            "activity_id",
+            "start_time",
+            "runs",
+        ],
+    ).set_index("effort")
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+
+def day_numbers(timestamps) -> np.ndarray:
+    """Returns the day number (days since 1970-01-01) of each timestamp.
+
+    Args:
+        timestamps: A DatetimeIndex, datetime Series or datetime64 array (without NaT).
+
+    Returns:
+        np.ndarray: An int32 array of day numbers.
+    """
+    return (
+        np.asarray(timestamps, dtype="datetime64[ns]")
+        .astype("datetime64[D]")
+        .astype("int32")
+    )
+
+
+def build_calendar(start, end) -> pd.DataFrame:
+    """Returns a calendar dimension table with one row per day between two dates.
+
+    Date attributes only change once per day, so minute tables store none of them:
+    they are looked up (or joined) on demand through the day number of a timestamp.
+
+    Args:
+        start: The first day of the calendar (any timestamp of that day).
+        end: The last day of the calendar (any timestamp of that day).
+
+    Returns:
+        pd.DataFrame: A dataframe indexed by "day_number" with the date, year, month,
+            day, day_of_week and (ISO) week_of_year columns.
+    """
+    dates = pd.date_range(
+        pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq="D"
+    )
+    return pd.DataFrame(
+        {
+            "date": dates,
+            "year": dates.year.to_numpy(dtype="int16"),
+            "month": dates.month.to_numpy(dtype="int8"),
+            "day": dates.day.to_numpy(dtype="int8"),
+            "day_of_week": dates.weekday.to_numpy(dtype="int8"),
+            "week_of_year": dates.isocalendar()["week"].to_numpy(dtype="int8"),
+        },
+        index=pd.Index(day_numbers(dates), name="day_number"),
+    )
@@ -0,0 +1,381 @@
+# -----------------------------------------------------------------------------
+# Cleaning steps of clean_data.py, table by table, shared with run_pipeline.py
+# -----------------------------------------------------------------------------
+import numpy as np
+import pandas as pd
+
+from durations import parse_durations
+from profiling import profile_table
+from row_hashes import check_new_rows
+from timestamps import parse_timestamps
+from timezones import apply_offsets, estimate_offsets
+
+# Pairs of tables holding the same summaries
+SUMMARY_PAIRS = [
+    ("garmin_summary.db_days_summary", "summary.db_days_summary"),
+    ("garmin_summary.db_weeks_summary", "summary.db_weeks_summary"),
+    ("garmin_summary.db_months_summary", "summary.db_months_summary"),
+    ("garmin_summary.db_years_summary", "summary.db_years_summary"),
+]
+
+# Rows before 27th December 2019 are empty (before wearing the watch)
+CUTOFF_DATE = pd.to_datetime("2019-12-27")
+# Date columns converted to datetime, and whether their table is filtered on them
+CUTOFF_COLUMNS = {
+    "garmin.db_daily_summary": ("day", True),
+    "garmin.db_sleep": ("day", True),
+    "garmin_summary.db_days_summary": ("day", False),
+    "garmin.db_stress": ("timestamp", True),
+    "garmin_monitoring.db_monitoring_hr": ("timestamp", True),
+    "garmin_monitoring.db_monitoring_rr": ("timestamp", True),
+    "garmin_summary.db_intensity_hr": ("timestamp", True),
+}
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATETIME_COLUMNS = {
+    "start": ["garmin.db_sleep"],
+    "end": ["garmin.db_sleep"],
+    "start_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "stop_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "timestamp": ["garmin_activities.db_activity_records"],
+}
+
+# Duration columns, stored as numeric seconds from here on
+DURATION_COLUMNS = {
+    "total_sleep": ["garmin.db_sleep"],
+    "deep_sleep": ["garmin.db_sleep"],
+    "light_sleep": ["garmin.db_sleep"],
+    "rem_sleep": ["garmin.db_sleep"],
+    "awake": ["garmin.db_sleep"],
+    "moderate_activity_time": [
+        "garmin.db_daily_summary",
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "vigorous_activity_time": [
+        "garmin.db_daily_summary",
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "intensity_time_goal": [
+        "garmin.db_daily_summary",
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "elapsed_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "moving_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "hrz_1_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "hrz_2_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "hrz_3_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "hrz_4_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "hrz_5_time": [
+        "garmin_activities.db_activities",
+        "garmin_activities.db_activity_laps",
+    ],
+    "avg_pace": ["garmin_activities.db_steps_activities"],
+    "avg_moving_pace": ["garmin_activities.db_steps_activities"],
+    "max_pace": ["garmin_activities.db_steps_activities"],
+    "avg_ground_contact_time": ["garmin_activities.db_steps_activities"],
+    "intensity_time": [
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "sleep_avg": [
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "sleep_min": [
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "sleep_max": [
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "rem_sleep_avg": [
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "rem_sleep_min": [
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+    "rem_sleep_max": [
+        "garmin_summary.db_days_summary",
+        "garmin_summary.db_months_summary",
+        "garmin_summary.db_years_summary",
+        "garmin_summary.db_weeks_summary",
+    ],
+}
+
+# Append-only tables: only the days that changed are checked for duplicates
+INCREMENTAL_KEYS = [
+    "garmin.db_stress",
+    "garmin_monitoring.db_monitoring_hr",
+    "garmin_monitoring.db_monitoring_rr",
+    "garmin_activities.db_activity_records",
+]
+
+# Unnecessary columns, after manual check
+TO_REMOVE = {
+    "garmin.db_daily_summary": ["step_goal"],
+    "garmin_summary.db_days_summary": [
+        "rhr_min",
+        "rhr_max",
+        "steps_goal",
+        "sleep_min",
+        "sleep_max",
+        "rem_sleep_min",
+        "rem_sleep_max",
+        "sweat_loss_avg",
+    ],
+    "garmin_summary.db_weeks_summary": ["steps_goal", "floors_goal", "hydration_goal"],
+    "garmin_summary.db_months_summary": ["steps_goal", "floors_goal", "hydration_goal"],
+    "garmin_summary.db_years_summary": ["steps_goal", "floors_goal", "hydration_goal"],
+}
+
+# Monitoring sources aligned on the heart rate clock, with their value column
+TIMEZONE_SOURCES = {
+    "garmin.db_stress": "stress",
+    "garmin_monitoring.db_monitoring_rr": "rr",
+}
+
+# Tables sorted by day
+SORT_COLUMNS = {"garmin.db_daily_summary": "day", "garmin.db_sleep": "day"}
+
+
+def remove_duplicated_summaries(dataframes) -> bool:
+    """Deletes the summary.db tables if they are equal to their garmin_summary.db counterparts.
+
+    Args:
+        dataframes: The dictionary of dataframes.
+
+    Returns:
+        bool: True if the tables were deleted.
+    """
+    # Initialize the variable to assume that the dataframes are similar
+    summary_dataframes_similar_hypothesis = True
+
+    for key1, key2 in SUMMARY_PAIRS:
+        if not dataframes[key1].equals(dataframes[key2]):
+            print(f"{key1} and {key2} dataframes are not equal.")
+            summary_dataframes_similar_hypothesis = False
+
+    # If the dataframes are similar, delete them from the dictionary
+    if summary_dataframes_similar_hypothesis:
+        for _, key2 in SUMMARY_PAIRS:
+            del dataframes[key2]
+    return summary_dataframes_similar_hypothesis
+
+
+def filter_before_cutoff(key: str, df: pd.DataFrame) -> None:
+    """Converts the date column of a table to datetime and drops its rows before CUTOFF_DATE."""
+    if key not in CUTOFF_COLUMNS:
+        return
+    column, filtered = CUTOFF_COLUMNS[key]
+    df[column] = parse_timestamps(df[column])
+    if filtered:
+        df.drop(df.index[df[column] < CUTOFF_DATE], inplace=True)
+
+
+def fix_dates_and_times(key: str, df: pd.DataFrame) -> None:
+    """Converts the datetime columns of a table, and its duration columns to seconds."""
+    for column, keys in DATETIME_COLUMNS.items():
+        if key in keys:
+            df[column] = parse_timestamps(df[column], formats=[DATETIME_FORMAT])
+            print(f"column {column} from {key} converted to datetime")
+
+    for column, keys in DURATION_COLUMNS.items():
+        if key in keys:
+            df[column] = parse_durations(df[column])
+            print(f"column {column} from {key} converted to seconds")
+
+
+def fix_other_dtypes(key: str, df: pd.DataFrame) -> None:
+    """Converts the remaining object columns of a table to numeric, datetime or str."""
+    for col in df.select_dtypes(["object"]).columns:
+        # Convert the column to the best possible data type
+        df[col] = df[col].apply(pd.to_numeric, errors="ignore")
+        if df[col].dtype != "object":
+            print(f"Column '{col}' in DataFrame '{key}' converted to numeric")
+
+    for col in df.select_dtypes(["object"]).columns:
+        # Only columns entirely in a garmindb timestamp format are converted
+        df[col] = parse_timestamps(df[col], errors="ignore")
+        if df[col].dtype != "object":
+            print(f"Column '{col}' in DataFrame '{key}' converted to datetime")
+
+    for col in df.select_dtypes(["object"]).columns:
+        df[col] = df[col].astype(str)
+
+
+def check_duplicates(
+    key: str, df: pd.DataFrame, row_hashes: np.ndarray, hashes_path: str
+) -> dict:
+    """Checks a table for duplicate rows, printing a warning with the first ones found.
+
+    Append-only tables (INCREMENTAL_KEYS) only check the days whose content changed
+    since the last run (see check_new_rows), the others compare all their row hashes.
+
+    Returns:
+        dict: The number of rows, of rows checked and of duplicates of the table.
+    """
+    if key in INCREMENTAL_KEYS:
+        # Only the days that changed since the last run are checked
+        checked, duplicated = check_new_rows(
+            df, hashes_path, key, row_hashes=row_hashes
+        )
+    else:
+        # Rows are compared through their 64-bit content hash
+        checked = np.ones(len(df), dtype=bool)
+        duplicated = pd.Series(row_hashes).duplicated().to_numpy()
+
+    if duplicated.any():
+        print(
+            f"\n\n !!! WARNING: Duplicate rows found in dataframe {key}:\n{df[duplicated].head()}"
+        )
+    # I'm not performing any blind treatment here but raising a warning if duplicates are found
+    return {
+        "table": key,
+        "rows": len(df),
+        "rows_checked": int(checked.sum()),
+        "duplicates": int(duplicated.sum()),
+    }
+
+
+def drop_profiled_columns(key: str, df: pd.DataFrame, profile: pd.DataFrame) -> None:
+    """Drops the empty and constant columns of a table, as found by profile_table.
+
+    A constant column has a single distinct value, missing values ignored.
+    """
+    for flag, message in [
+        ("is_empty", "empty column {} removed"),
+        ("is_constant", "column {} removed (only one unique value)"),
+    ]:
+        columns = profile.index[profile[flag]]
+        df.drop(columns, axis=1, inplace=True)
+        for column in columns:
+            print(f"  - {message.format(column)}")
+
+
+def clean_table(key: str, df: pd.DataFrame, hashes_path: str) -> tuple:
+    """Runs every cleaning step that only needs the table itself.
+
+    The rows before the cutoff date are dropped and dates and times are fixed,
+    then a single profiling pass drives the duplicates check and the removal of
+    empty and constant columns. It runs before fix_other_dtypes turns the missing
+    values of object columns into "None"/"nan" strings, which would hide them.
+    The columns removed after manual check go last.
+
+    Args:
+        key (str): The name of the table.
+        df (pd.DataFrame): The raw table.
+        hashes_path (str): The directory of the persisted row hashes.
+
+    Returns:
+        tuple: The clean table, its column profile and its duplicates check summary.
+    """
+    print(f"\n{key}:")
+    filter_before_cutoff(key, df)
+    fix_dates_and_times(key, df)
+
+    # One pass per column gives its null count, cardinality, min/max and its
+    # contribution to the row hashes: the checks below only read the profile
+    profile, row_hashes = profile_table(df)
+
+    duplicates = check_duplicates(key, df, row_hashes, hashes_path)
+    drop_profiled_columns(key, df, profile)
+    fix_other_dtypes(key, df)
+
+    if key in TO_REMOVE:
+        # Some may already be gone (empty or constant columns)
+        df.drop(TO_REMOVE[key], axis=1, inplace=True, errors="ignore")
+        print(f"  - columns {TO_REMOVE[key]} removed")
+
+    return df, profile, duplicates
+
+
+def adjust_time_zones(dataframes) -> pd.DataFrame:
+    """Aligns the clock of the stress and respiration rate tables on the heart rate one.
+
+    The offset of each source is estimated day by day by correlating it with heart
+    rate, so DST changes and travel are corrected wherever they happen in the history.
+
+    Args:
+        dataframes: The dictionary of dataframes (modified in place).
+
+    Returns:
+        pd.DataFrame: The offset applied to every source, in hours, indexed by day.
+    """
+    df_hr = dataframes["garmin_monitoring.db_monitoring_hr"]
+    reference = pd.Series(df_hr["heart_rate"].to_numpy(), index=df_hr["timestamp"])
+
+    timezone_offsets = {}
+    for key, column in TIMEZONE_SOURCES.items():
+        df = dataframes[key]
+        # Negative stress values are codes for missing measures
+        values = df[column].where(df[column] >= 0)
+        timezone_offsets[key] = estimate_offsets(
+            reference, pd.Series(values.to_numpy(), index=df["timestamp"])
+        )
+        df["timestamp"] = apply_offsets(df["timestamp"], timezone_offsets[key])
+
+        # Summary of the offsets applied (in hours)
+        days_per_offset = timezone_offsets[key].value_counts().sort_index()
+        print(f"{key}:")
+        for offset, days in days_per_offset.items():
+            print(f"  - {offset:+.0f} h: {days} days")
+
+    return pd.DataFrame(timezone_offsets)
+
+
+def sort_tables(dataframes) -> None:
+    """Sorts the daily tables by day and resets their index."""
+    for key, column in SORT_COLUMNS.items():
+        dataframes[key] = (
+            dataframes[key]
+            .sort_values(by=column, ascending=True)
+            .reset_index(drop=True)
+        )
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# Bit of each injected-value flag in the packed "injected_flags" column
+INJECTED_FLAGS = {
+    "stress_injected": 1,
+    "heart_rate_injected": 2,
+    "respiration_rate_injected": 4,
+}
+
+
+def memory_footprint(df: pd.DataFrame) -> int:
+    """Returns the memory used by a dataframe, index and object values included (in bytes)."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def pack_flags(
+    df: pd.DataFrame, flags: dict = INJECTED_FLAGS, column: str = "injected_flags"
+) -> pd.DataFrame:
+    """Replaces boolean columns with a single uint8 column holding one bit per flag.
+
+    Args:
+        df (pd.DataFrame): The dataframe containing the boolean columns.
+        flags (dict): Boolean column names as keys and their bit as values. Default is INJECTED_FLAGS.
+        column (str): The name of the packed column. Default is "injected_flags".
+
+    Returns:
+        pd.DataFrame: The dataframe with the packed column instead of the boolean columns.
+    """
+    packed = np.zeros(len(df), dtype="uint8")
+    for flag, bit in flags.items():
+        packed |= df[flag].to_numpy(dtype=bool).astype("uint8") * np.uint8(bit)
+    df = df.drop(columns=list(flags))
+    df[column] = packed
+    return df
+
+
+def unpack_flags(
+    df: pd.DataFrame, flags: dict = INJECTED_FLAGS, column: str = "injected_flags"
+) -> pd.DataFrame:
+    """Restores the boolean columns packed by pack_flags.
+
+    Args:
+        df (pd.DataFrame): The dataframe containing the packed column.
+        flags (dict): Boolean column names as keys and their bit as values. Default is INJECTED_FLAGS.
+        column (str): The name of the packed column. Default is "injected_flags".
+
+    Returns:
+        pd.DataFrame: The dataframe with one boolean column per flag instead of the packed column.
+    """
+    packed = df[column].to_numpy()
+    df = df.drop(columns=[column])
+    for flag, bit in flags.items():
+        df[flag] = (packed & bit) != 0
+    return df
+
+
+# Compact dtypes of the monitoring measurements (respiration rate before and after renaming)
+MEASUREMENT_DTYPES = {
+    "stress": "float32",
+    "heart_rate": "float32",
+    "rr": "float32",
+    "respiration_rate": "float32",
+    "in_activity": "int8",
+}
+
+
+def compact_measurements(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the monitoring dataframe with its measurements stored as float32 and in_activity as int8.
+
+    The columns and their meaning don't change (NaN keeps marking missing values),
+    so this is applied as soon as the monitoring table is built, and the rest of the
+    transform works on the smaller table.
+    """
+    return df.astype(
+        {column: dtype for column, dtype in MEASUREMENT_DTYPES.items() if column in df}
+    )
+
+
+def compact_monitoring(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the monitoring dataframe with compact dtypes.
+
+    Measurements become float32 (see compact_measurements), activity_id becomes
+    categorical and the *_injected columns are bit-packed into a single uint8
+    "injected_flags" column (see unpack_flags).
+
+    Args:
+        df (pd.DataFrame): The minute monitoring dataframe.
+
+    Returns:
+        pd.DataFrame: The compacted dataframe.
+    """
+    df = compact_measurements(df)
+    if "activity_id" in df:
+        df = df.astype({"activity_id": "category"})
+    flags = {flag: bit for flag, bit in INJECTED_FLAGS.items() if flag in df}
+    if flags:
+        df = pack_flags(df, flags)
+    return df
+
+
+def compact_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns a daily (or resampled) dataframe with its float64 columns stored as float32.
+
+    Args:
+        df (pd.DataFrame): The daily, weekly or monthly dataframe.
+
+    Returns:
+        pd.DataFrame: The compacted dataframe.
+    """
+    float_columns = df.select_dtypes("float64").columns
+    return df.astype({column: "float32" for column in float_columns})
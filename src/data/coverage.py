@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from calendar_dim import day_numbers
+
+# Monitoring columns as keys and their name in the coverage table as values
+SOURCES = {"stress": "stress", "heart_rate": "heart_rate", "rr": "respiration_rate"}
+
+
+def build_daily_coverage(
+    df_monitoring: pd.DataFrame, sources: dict = SOURCES
+) -> pd.DataFrame:
+    """Returns per-day, per-source coverage counts of the minute monitoring data.
+
+    Minutes are mapped to integer day codes once, then every count is a single
+    np.bincount over those codes (no per-minute Python date objects, no groupby).
+
+    Args:
+        df_monitoring (pd.DataFrame): The minute dataframe, indexed by timestamp, with the
+            source columns, their "<source>_injected" masks and the "in_activity" column.
+        sources (dict): Source columns as keys and their output name as values. Default is SOURCES.
+
+    Returns:
+        pd.DataFrame: A dataframe indexed by day with the number of minutes recorded
+            ("minutes"), observed and injected for each source ("<name>_minutes_observed",
+            "<name>_minutes_injected"), in activity ("minutes_in_activity") and with at
+            least one source missing ("minutes_incomplete").
+    """
+    day = day_numbers(df_monitoring.index)
+    first_day = int(day.min())
+    codes = day - first_day
+    n_days = int(codes.max()) + 1
+
+    def count(mask):
+        return np.bincount(codes[mask], minlength=n_days)
+
+    coverage = {"minutes": np.bincount(codes, minlength=n_days)}
+    incomplete = np.zeros(len(df_monitoring), dtype=bool)
+
+    for column, name in sources.items():
+        missing = df_monitoring[column].isna().to_numpy()
+        injected = df_monitoring[f"{column}_injected"].to_numpy(dtype=bool)
+        coverage[f"{name}_minutes_observed"] = count(~missing & ~injected)
+        coverage[f"{name}_minutes_injected"] = count(injected)
+        incomplete |= missing
+
+    coverage["minutes_in_activity"] = count(df_monitoring["in_activity"].to_numpy() > 0)
+    coverage["minutes_incomplete"] = count(incomplete)
+
+    days = pd.to_datetime(first_day + np.arange(n_days), unit="D")
+    return pd.DataFrame(coverage, index=pd.Index(days, name="day"))
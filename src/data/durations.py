@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# Width of the "HH:MM:SS.ffffff" strings written by garmindb, plus one byte that
+# must be empty (longer strings are left to pd.to_timedelta)
+WIDTH = 16
+COLONS = [2, 5]
+DIGITS = [0, 1, 3, 4, 6, 7]
+DOT = 8
+FRACTION = slice(9, 15)
+
+
+def _parse_fixed(raw: np.ndarray) -> tuple:
+    """Parses "HH:MM:SS[.ffffff]" byte strings, returns the microseconds and the validity mask."""
+    chars = raw.view("uint8").reshape(len(raw), WIDTH)
+    digits = chars.astype("int64") - ord("0")
+    is_digit = (chars >= ord("0")) & (chars <= ord("9"))
+
+    # The fraction is optional and may have fewer than 6 digits (empty bytes at the end)
+    fraction = chars[:, FRACTION]
+    fraction_end = fraction == 0
+    no_fraction = (chars[:, DOT] == 0) & fraction_end.all(axis=1)
+    with_fraction = (
+        (chars[:, DOT] == ord("."))
+        & (is_digit[:, FRACTION] | fraction_end).all(axis=1)
+        & (np.diff(fraction_end.astype("int8"), axis=1) >= 0).all(axis=1)
+    )
+    valid = (
+        is_digit[:, DIGITS].all(axis=1)
+        & (chars[:, COLONS] == ord(":")).all(axis=1)
+        & (chars[:, -1] == 0)
+        & (no_fraction | with_fraction)
+    )
+
+    hours = digits[:, 0] * 10 + digits[:, 1]
+    minutes = digits[:, 3] * 10 + digits[:, 4]
+    seconds = digits[:, 6] * 10 + digits[:, 7]
+    fraction_digits = np.where(fraction_end, 0, digits[:, FRACTION])
+    microseconds = fraction_digits @ (10 ** np.arange(5, -1, -1))
+    total = ((hours * 60 + minutes) * 60 + seconds) * 1000000 + microseconds
+    return total, valid
+
+
+def parse_durations(values) -> np.ndarray:
+    """Converts durations to seconds, parsing garmindb's fixed "HH:MM:SS.ffffff" strings in one pass.
+
+    The strings are laid out as a matrix of bytes, so the digits of every field are
+    read for the whole column with a few array operations instead of one parse per
+    string. Strings in another format go through pd.to_timedelta, missing values
+    become NaN, and values that already are durations (or seconds) are converted
+    directly.
+
+    Args:
+        values: The durations (a Series, array or list).
+
+    Returns:
+        np.ndarray: The durations in seconds (float64).
+    """
+    series = pd.Series(values)
+    if pd.api.types.is_timedelta64_dtype(series):
+        return series.dt.total_seconds().to_numpy(dtype="float64")
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype="float64")
+
+    text = series.to_numpy(dtype=object, copy=True)
+    missing = pd.isna(text)
+    text[missing] = ""
+    seconds = np.full(len(text), np.nan)
+    try:
+        raw = text.astype(f"S{WIDTH}")
+    except (UnicodeEncodeError, TypeError):
+        # Non-ASCII text or other objects (e.g. datetime.time), parsed one by one
+        parsed = pd.to_timedelta(pd.Series(text[~missing]).astype(str))
+        seconds[~missing] = parsed.dt.total_seconds().to_numpy()
+        return seconds
+
+    total, valid = _parse_fixed(raw)
+    seconds[valid] = total[valid] / 1000000
+
+    other = ~valid & ~missing
+    if other.any():
+        parsed = pd.to_timedelta(pd.Series(text[other]).astype(str))
+        seconds[other] = parsed.dt.total_seconds().to_numpy()
+    return seconds
@@ -3,31 +3,19 @@
 # Input: Garmin SQLite Databases paths (after executing cd .\venv\Scripts\ then  py garmindb_cli.py --all --download --import --analyze --latest)
 # Output: Pickle and CSV files of potentially useful tables (data/raw)
 # -----------------------------------------------------------------------------
-import pandas as pd
-
-import sqlite3
 import os
 
+from settings import SPILL_FOLDER
+from sources import database_paths, databases, iter_tables, open_database
+from spilling import SpillingStore
 from utils import print_database_tables
 
 # -----------------------------------------------------------------------------
 # Defining databases paths
 # -----------------------------------------------------------------------------
-# Path variables to databases
-db_garmin = "C:\\Users\\33671\\HealthData\\DBs\\garmin.db"
-db_garmin_activities = "C:\\Users\\33671\\HealthData\\DBs\\garmin_activities.db"
-db_garmin_monitoring = "C:\\Users\\33671\\HealthData\\DBs\\garmin_monitoring.db"
-db_garmin_summary = "C:\\Users\\33671\\HealthData\\DBs\\garmin_summary.db"
-db_summary = "C:\\Users\\33671\\HealthData\\DBs\\summary.db"
-
-# List of database paths
-database_paths = [
-    db_garmin,
-    db_garmin_activities,
-    db_garmin_monitoring,
-    db_garmin_summary,
-    db_summary,
-]
+# The paths to the databases (database_paths) and the tables to retrieve
+# (databases) are defined in sources.py, shared with run_pipeline.py
+
 # -----------------------------------------------------------------------------
 # Inspecting databases to return table names and, optionally, row counts
 # -----------------------------------------------------------------------------
@@ -49,8 +37,8 @@ def get_tables_from_dbs(database_paths: list, row_count: bool = False) -> dict:
         # Extract the file name from the file path
         database_name = os.path.basename(database_path)
 
-        # Connect to the database
-        with sqlite3.connect(database_path) as conn:
+        # Connect to the database (or to its snapshot, see HEALTH_TRACKER_DB_SNAPSHOT)
+        with open_database(database_path) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
             # Extract the table names from the results of the SELECT query
@@ -200,47 +188,14 @@ def get_dataframes(databases):
     databases (dict): A dictionary that specifies which tables to retrieve data from in each database. The keys of the dictionary should be the paths to the databases, and the values should be lists of the names of the tables to include in the dataframe.
 
     Returns:
-    dict: A dictionary of Pandas dataframes, one for each table in each database. The keys of the dictionary will be the names of the tables, and the values will be the corresponding dataframes.
+    SpillingStore: A dictionary of Pandas dataframes, one for each table in each database. The keys of the dictionary will be the names of the tables, and the values will be the corresponding dataframes. Tables are spilled to disk beyond the memory budget.
     """
-    dataframes = {}
-    for db_path, tables in databases.items():
-        database_name = os.path.basename(db_path)
-        # Connect to the database
-        conn = sqlite3.connect(db_path)
-        for table_name in tables:
-            query = f"SELECT * FROM {table_name}"
-            df = pd.read_sql_query(query, conn)
-            dataframes[database_name + "_" + table_name] = df
-        # Close the connection
-        conn.close()
+    dataframes = SpillingStore(folder=os.path.join(SPILL_FOLDER, "extract"))
+    for key, df in iter_tables(databases):
+        dataframes[key] = df
     return dataframes
 
 
-# Specify the databases and tables to retrieve
-databases = {
-    f"{db_garmin}": ["stress", "sleep", "daily_summary"],
-    f"{db_garmin_activities}": [
-        "activities",
-        "activity_laps",
-        "activity_records",
-        "steps_activities",
-    ],
-    f"{db_garmin_monitoring}": ["monitoring_hr", "monitoring_rr"],
-    f"{db_garmin_summary}": [
-        "years_summary",
-        "months_summary",
-        "weeks_summary",
-        "days_summary",
-        "intensity_hr",
-    ],
-    f"{db_summary}": [
-        "years_summary",
-        "months_summary",
-        "weeks_summary",
-        "days_summary",
-    ],
-}
-
 # Get the dataframes
 dataframes = get_dataframes(databases)
 
@@ -249,8 +204,8 @@ total_rows = 0
 total_columns = 0
 
 print("Dataframes final shapes:")
-for df_name in dataframes:
-    shape = dataframes[df_name].shape
+for df_name, df in dataframes.stream():
+    shape = df.shape
     total_rows += shape[0]
     total_columns += shape[1]
     print(f"{df_name}: {shape}")
@@ -261,7 +216,8 @@ for df_name in dataframes:
 # -----------------------------------------------------------------------------
 print("\n_____Exporting the results_____")
 
-for key, df in dataframes.items():
+# Spilled tables are read back one at a time, without spilling the others again
+for key, df in dataframes.stream():
     # Save the dataframe as a pickle file
     df.to_pickle(f"../../data/raw/{key}.pkl")
     # Save the dataframe as a CSV file
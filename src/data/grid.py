@@ -0,0 +1,20 @@
+import numpy as np
+
+
+def grid_keys(rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """Returns the keys of grid cells from their latitude row and longitude column.
+
+    Keys are ordered by row, then column, so the cells of a row between two
+    columns form a single range of keys. The track store writer (tracks.py) and
+    its reader (src/dashboard/tracks.py) both build their keys here.
+
+    Args:
+        rows (np.ndarray): The latitude rows of the cells.
+        columns (np.ndarray): The longitude columns of the cells.
+
+    Returns:
+        np.ndarray: The int64 cell keys.
+    """
+    rows = np.asarray(rows, dtype="int64")
+    columns = np.asarray(columns, dtype="int64")
+    return rows * 2**32 + (columns + 2**31)
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from calendar_dim import day_numbers
+
+# Heart rate zones as fractions of the maximum heart rate (lower bounds of zones 1 to 5)
+HR_ZONES = [0.5, 0.6, 0.7, 0.8, 0.9]
+
+# TRIMP weight of every zone (Edwards: minutes in zone k count k times)
+ZONE_WEIGHTS = [1, 2, 3, 4, 5]
+
+# Longer gaps between two records are pauses, not counted in the zone times
+MAX_RECORD_GAP = 10.0
+
+ZONE_COLUMNS = [f"zone_{zone}_time" for zone in range(1, len(HR_ZONES) + 1)]
+
+
+def zone_bounds(max_hr: float, zones: list = HR_ZONES) -> np.ndarray:
+    """Returns the lower heart rate bound of every zone.
+
+    Args:
+        max_hr (float): The maximum heart rate.
+        zones (list): The lower bounds as fractions of max_hr. Default is HR_ZONES.
+
+    Returns:
+        np.ndarray: The bounds, in beats per minute.
+    """
+    return np.asarray(zones, dtype="float64") * max_hr
+
+
+def zone_times(
+    hr: np.ndarray,
+    durations: np.ndarray,
+    bounds: np.ndarray,
+    groups: np.ndarray = None,
+    n_groups: int = 1,
+) -> np.ndarray:
+    """Returns the time spent in every heart rate zone, for many groups at once.
+
+    Every sample is assigned its zone with np.digitize (0 below zone 1), then a
+    single np.bincount over group * (zones + 1) + zone sums the durations of every
+    (group, zone) pair, whatever the number of groups.
+
+    Args:
+        hr (np.ndarray): The heart rate of every sample (NaN if missing).
+        durations (np.ndarray): The duration of every sample, in seconds.
+        bounds (np.ndarray): The lower bounds of the zones (see zone_bounds).
+        groups (np.ndarray): The group code of every sample, from 0 to n_groups - 1.
+            Default is a single group.
+        n_groups (int): The number of groups. Default is 1.
+
+    Returns:
+        np.ndarray: A (n_groups, zones) array of seconds.
+    """
+    hr = np.asarray(hr, dtype="float64")
+    n_zones = len(bounds) + 1
+    if groups is None:
+        groups = np.zeros(len(hr), dtype="int64")
+    zone = np.digitize(hr, bounds)
+    counted = (zone > 0) & ~np.isnan(hr)
+    times = np.bincount(
+        groups[counted] * n_zones + zone[counted],
+        weights=np.asarray(durations, dtype="float64")[counted],
+        minlength=n_groups * n_zones,
+    )
+    return times.reshape(n_groups, n_zones)[:, 1:]
+
+
+def trimp(times: np.ndarray, weights: list = ZONE_WEIGHTS) -> np.ndarray:
+    """Returns the TRIMP load (zone minutes weighted by zone) of zone times in seconds."""
+    return times @ np.asarray(weights, dtype="float64") / 60
+
+
+def _zone_table(times: np.ndarray, index: pd.Index) -> pd.DataFrame:
+    """Returns the compact table of zone times (whole seconds) and TRIMP."""
+    df = pd.DataFrame(
+        np.round(times).astype("uint32"), columns=ZONE_COLUMNS, index=index
+    )
+    df["trimp"] = trimp(times).astype("float32")
+    return df
+
+
+def activity_zones(
+    records: pd.DataFrame, bounds: np.ndarray, key: str = "activity_id"
+) -> pd.DataFrame:
+    """Returns the time in every zone and the TRIMP of every activity, in one pass over the records.
+
+    A record lasts until the next record of its activity, gaps longer than
+    MAX_RECORD_GAP (pauses) and the last record of an activity count for nothing.
+
+    Args:
+        records (pd.DataFrame): The activity records, with the key, "timestamp" and "hr" columns.
+        bounds (np.ndarray): The lower bounds of the zones (see zone_bounds).
+        key (str): The column identifying the activity. Default is "activity_id".
+
+    Returns:
+        pd.DataFrame: A dataframe indexed by activity with the zone times in seconds
+            (uint32) and the "trimp" (float32).
+    """
+    records = records.sort_values([key, "timestamp"], kind="mergesort")
+    codes, ids = pd.factorize(records[key])
+    timestamps = records["timestamp"].to_numpy(dtype="datetime64[ns]")
+
+    durations = np.zeros(len(records))
+    if len(records):
+        durations[:-1] = np.diff(timestamps) / np.timedelta64(1, "s")
+    same_activity = np.append(codes[1:] == codes[:-1], False)
+    durations = np.where(same_activity & (durations <= MAX_RECORD_GAP), durations, 0.0)
+
+    times = zone_times(records["hr"].to_numpy(), durations, bounds, codes, len(ids))
+    return _zone_table(times, pd.Index(ids, name=key))
+
+
+def daily_zones(df_monitoring: pd.DataFrame, bounds: np.ndarray) -> pd.DataFrame:
+    """Returns the time in every zone and the TRIMP of every day of monitoring.
+
+    Every minute of the monitoring data counts for 60 seconds at its heart rate.
+
+    Args:
+        df_monitoring (pd.DataFrame): The minute dataframe, indexed by timestamp, with a "heart_rate" column.
+        bounds (np.ndarray): The lower bounds of the zones (see zone_bounds).
+
+    Returns:
+        pd.DataFrame: A dataframe indexed by day with the zone times in seconds
+            (uint32) and the "trimp" (float32).
+    """
+    day = day_numbers(df_monitoring.index)
+    first_day = int(day.min())
+    codes = day - first_day
+    n_days = int(codes.max()) + 1
+
+    times = zone_times(
+        df_monitoring["heart_rate"].to_numpy(),
+        np.full(len(df_monitoring), 60.0),
+        bounds,
+        codes,
+        n_days,
+    )
+    days = pd.to_datetime(first_day + np.arange(n_days), unit="D")
+    return _zone_table(times, pd.Index(days, name="day"))
@@ -0,0 +1,294 @@
+import numpy as np
+import pandas as pd
+
+import itertools
+import json
+import os
+
+from calendar_dim import day_numbers
+from profiling import hash_rows
+
+HEADER_FILE = "header.json"
+DAY_HASHES_FILE = "day_hashes.npy"
+STEP = pd.Timedelta(minutes=1)
+
+
+def _read_header(folder: str) -> dict:
+    """Returns the header of a minute store, or None if the folder doesn't contain one."""
+    path = os.path.join(folder, HEADER_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_header(folder: str, header: dict) -> None:
+    """Writes the header of a minute store (written last, it commits the channel files)."""
+    with open(os.path.join(folder, HEADER_FILE), "w") as f:
+        json.dump(header, f, indent=2)
+
+
+def _channel_arrays(df: pd.DataFrame, columns: list) -> dict:
+    """Returns the fixed-width numpy array of each channel, rejecting non-numeric columns."""
+    arrays = {}
+    for column in columns:
+        array = df[column].to_numpy()
+        if array.dtype.kind not in "biuf":
+            raise ValueError(
+                f"Column {column} ({df[column].dtype}) can't be stored as a fixed-stride channel"
+            )
+        arrays[column] = array
+    return arrays
+
+
+def _check_minute_grid(index: pd.DatetimeIndex, previous=None) -> None:
+    """Raises a ValueError if the index isn't a gapless one-minute grid (following `previous`)."""
+    values = index.values
+    if previous is not None:
+        values = np.concatenate([[np.datetime64(previous, "ns")], values])
+    steps = np.diff(values)
+    if len(steps) and not (steps == STEP.to_timedelta64()).all():
+        raise ValueError("The index must be a gapless one-minute grid")
+
+
+def _partitions(data):
+    """Returns an iterator over the consecutive partitions of a dataframe or iterable of dataframes."""
+    return iter([data] if isinstance(data, pd.DataFrame) else data)
+
+
+def _read_day_hashes(folder: str) -> pd.Series:
+    """Returns the stored content hash of every day (empty if not stored)."""
+    path = os.path.join(folder, DAY_HASHES_FILE)
+    if not os.path.exists(path):
+        return pd.Series(dtype="uint64")
+    days, hashes = np.load(path)
+    return pd.Series(hashes, index=days.astype("int64"))
+
+
+def _day_hashes(df: pd.DataFrame, columns: list) -> tuple:
+    """Returns the day of every row, the distinct days and their content hash.
+
+    The rows (timestamp included, so moving a value to another minute counts) are
+    hashed and summed per day, wrapping around.
+    """
+    days = day_numbers(df.index).astype("int64")
+    distinct, first_rows = np.unique(days, return_index=True)
+    row_hashes = hash_rows(df[columns].reset_index())
+    hashes = (
+        np.add.reduceat(row_hashes, first_rows)
+        if len(df)
+        else np.empty(0, dtype="uint64")
+    )
+    return days, distinct, hashes
+
+
+def _write_channels(
+    partitions, first: pd.DataFrame, folder: str, columns: list, stored: pd.Series
+) -> tuple:
+    """Writes the rows of the days whose content changed to the channel files.
+
+    The files are opened once and every partition is written at its offset, so a
+    single partition is held at a time. Only the days whose hash differs from the
+    stored one (all of them when `stored` is None) are written, and the files are
+    truncated after the last row.
+
+    Returns:
+        tuple: The number of rows of the partitions and the hash of every day.
+    """
+    mode = "wb" if stored is None else "r+b"
+    files = {
+        column: open(os.path.join(folder, f"{column}.bin"), mode) for column in columns
+    }
+    day_hashes = {}
+    try:
+        length, previous, channels = 0, None, None
+        for df in itertools.chain([first], partitions):
+            _check_minute_grid(df.index, previous)
+            arrays = _channel_arrays(df, columns)
+            dtypes = {column: array.dtype.str for column, array in arrays.items()}
+            if channels is not None and dtypes != channels:
+                raise ValueError("The partitions must have the same channel dtypes")
+            channels = dtypes
+
+            days, distinct, hashes = _day_hashes(df, columns)
+            if stored is None:
+                changed = np.ones(len(df), dtype=bool)
+            else:
+                known = np.isin(distinct, stored.index)
+                previous_hashes = stored.reindex(distinct, fill_value=0).to_numpy()
+                changed_days = distinct[~known | (previous_hashes != hashes)]
+                changed = np.isin(days, changed_days)
+            for day, value in zip(distinct, hashes):
+                # A day split across two partitions gets the sum of both parts
+                day_hashes[day] = (day_hashes.get(day, 0) + int(value)) % 2**64
+
+            # Writing every run of consecutive changed rows
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], changed, [0]])))
+            for start, stop in zip(edges[::2], edges[1::2]):
+                for column, array in arrays.items():
+                    files[column].seek((length + start) * array.itemsize)
+                    files[column].write(array[start:stop].tobytes())
+            length += len(df)
+            if len(df):
+                previous = df.index[-1]
+
+        for column, f in files.items():
+            f.truncate(length * np.dtype(channels[column]).itemsize)
+    finally:
+        for f in files.values():
+            f.close()
+    return length, pd.Series(day_hashes, dtype="uint64")
+
+
+def _write_day_hashes(folder: str, day_hashes: pd.Series) -> None:
+    """Writes the hash of every day (before the header, which commits them)."""
+    np.save(
+        os.path.join(folder, DAY_HASHES_FILE),
+        np.vstack([day_hashes.index.to_numpy("uint64"), day_hashes.to_numpy()]),
+    )
+
+
+def write_minute_store(data, folder: str, columns: list) -> dict:
+    """Persists one-minute data as one memory-mappable fixed-stride file per channel.
+
+    Row i of every channel holds the minute header["start"] + i minutes, so any time
+    range maps to a [first, last) slice of each file without reading the others.
+
+    Args:
+        data: The monitoring dataframe, or an iterable of its consecutive partitions
+            (written one at a time), indexed by a gapless one-minute grid.
+        folder (str): The directory to write the store to (created if needed).
+        columns (list): The numeric columns (channels) to store.
+
+    Returns:
+        dict: The header of the store.
+    """
+    partitions = _partitions(data)
+    first = next(partitions)
+    os.makedirs(folder, exist_ok=True)
+    length, day_hashes = _write_channels(partitions, first, folder, columns, None)
+
+    header = {
+        "start": first.index[0].isoformat(),
+        "step_seconds": int(STEP.total_seconds()),
+        "length": length,
+        "channels": {
+            column: array.dtype.str
+            for column, array in _channel_arrays(first, columns).items()
+        },
+    }
+    _write_day_hashes(folder, day_hashes)
+    _write_header(folder, header)
+    return header
+
+
+def update_minute_store(data, folder: str, columns: list) -> dict:
+    """Rewrites the days of one-minute data that changed since the store was written.
+
+    A stored minute can change anywhere in the history: a source that lags behind
+    the others gets its values filled in on a later run, and the time zone
+    offsets of a day can change and shift its minutes. The content hash of every
+    day is stored, and only the days whose hash differs (new days included) are
+    written, so a daily refresh costs O(history) hashing but only O(changed days)
+    of writes. The store is rewritten entirely when its start or channels don't
+    match the data, or when its day hashes are missing.
+
+    Args:
+        data: The monitoring dataframe, or an iterable of its consecutive partitions
+            (read one at a time), indexed by a gapless one-minute grid.
+        folder (str): The directory of the store.
+        columns (list): The numeric columns (channels) to store.
+
+    Returns:
+        dict: The header of the store.
+    """
+    header = _read_header(folder)
+    stored = _read_day_hashes(folder)
+    partitions = _partitions(data)
+    first = next(partitions)
+    channels = {
+        column: array.dtype.str
+        for column, array in _channel_arrays(first, columns).items()
+    }
+
+    if (
+        header is None
+        or stored.empty
+        or pd.Timestamp(header["start"]) != first.index[0]
+        or header["channels"] != channels
+    ):
+        return write_minute_store(itertools.chain([first], partitions), folder, columns)
+
+    header["length"], day_hashes = _write_channels(
+        partitions, first, folder, columns, stored
+    )
+    _write_day_hashes(folder, day_hashes)
+    _write_header(folder, header)
+    return header
+
+
+class MinuteStore:
+    """Reads a store written by write_minute_store/update_minute_store.
+
+    Channels are memory-mapped: opening the store reads the header only, and slicing
+    a time range only touches the bytes of that range.
+    """
+
+    def __init__(self, folder: str):
+        """Opens the store and memory-maps its channels.
+
+        Args:
+            folder (str): The directory of the store.
+        """
+        header = _read_header(folder)
+        if header is None:
+            raise FileNotFoundError(f"No minute store found in {folder}")
+        self.folder = folder
+        self.start = pd.Timestamp(header["start"])
+        self.step = pd.Timedelta(seconds=header["step_seconds"])
+        self.length = header["length"]
+        self.channels = {
+            # Empty files can't be memory-mapped
+            column: np.memmap(
+                os.path.join(folder, f"{column}.bin"),
+                dtype=np.dtype(dtype),
+                mode="r",
+                shape=(self.length,),
+            )
+            if self.length
+            else np.empty(0, dtype=np.dtype(dtype))
+            for column, dtype in header["channels"].items()
+        }
+
+    @property
+    def end(self) -> pd.Timestamp:
+        """The last minute stored."""
+        return self.start + (self.length - 1) * self.step
+
+    def position(self, timestamp) -> int:
+        """Returns the row of the first minute at or after a timestamp (clipped to the store)."""
+        offset = (pd.Timestamp(timestamp) - self.start) / self.step
+        return int(np.clip(np.ceil(offset), 0, self.length))
+
+    def slice(self, start, end, columns: list = None) -> pd.DataFrame:
+        """Returns the minutes between two timestamps (both included).
+
+        Args:
+            start: The first timestamp of the range.
+            end: The last timestamp of the range.
+            columns (list): The channels to read. Default is all channels.
+
+        Returns:
+            pd.DataFrame: The minutes of the range, indexed by timestamp.
+        """
+        columns = list(self.channels) if columns is None else columns
+        first = self.position(start)
+        last = self.position(pd.Timestamp(end) + pd.Timedelta(1, "ns"))
+        index = pd.date_range(
+            self.start + first * self.step, periods=last - first, freq=self.step
+        )
+        # np.array copies the range out of the memory map
+        return pd.DataFrame(
+            {column: np.array(self.channels[column][first:last]) for column in columns},
+            index=pd.Index(index, name="timestamp"),
+        )
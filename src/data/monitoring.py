@@ -0,0 +1,248 @@
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+from coverage import build_daily_coverage
+from interpolation import interpolate_block
+from spilling import SpillingStore
+
+# Channels interpolated, and maximum distance (in minutes) to a valid value
+CHANNELS = ["stress", "heart_rate", "rr"]
+LIMIT = 4
+MINUTE = pd.Timedelta(minutes=1)
+
+
+def month_partitions(start, end) -> list:
+    """Returns the first and last minute of every calendar month of the one minute grid between two timestamps."""
+    grid = pd.date_range(start, end, freq="min")
+    starts = grid.searchsorted(pd.period_range(start, end, freq="M").start_time)
+    ends = list(starts[1:]) + [len(grid)]
+    return [(grid[first], grid[end - 1]) for first, end in zip(starts, ends)]
+
+
+def build_partition_tasks(
+    sources: list, activities: pd.DataFrame, channels: list = CHANNELS
+) -> list:
+    """Splits the monitoring sources and activities into one task per calendar month.
+
+    Besides the rows of its month, a task gets for every channel the nearest valid
+    value before and after the month: interpolating a gap that crosses a month
+    boundary needs both ends of the gap, however far they are.
+
+    Args:
+        sources (list): The monitoring dataframes, each with a "timestamp" column.
+        activities (pd.DataFrame): The activities, with "start_time", "stop_time" and "activity_id" columns.
+        channels (list): The columns to interpolate. Default is CHANNELS.
+
+    Returns:
+        list: The tasks to give to transform_partition, in chronological order.
+    """
+    sources = [
+        df.sort_values("timestamp", kind="stable", ignore_index=True) for df in sources
+    ]
+    start = min(df["timestamp"].min() for df in sources)
+    end = max(df["timestamp"].max() for df in sources)
+
+    # Timestamps and values of the valid values of every channel
+    valid = {}
+    for df in sources:
+        for channel in channels:
+            if channel in df.columns:
+                rows = df[channel].notna().to_numpy()
+                valid[channel] = (
+                    df["timestamp"].to_numpy()[rows],
+                    df[channel].to_numpy(dtype="float64")[rows],
+                )
+
+    tasks = []
+    for first, last in month_partitions(start, end):
+        boundaries = {}
+        for channel, (times, values) in valid.items():
+            before = np.searchsorted(times, first.to_datetime64(), side="left") - 1
+            after = np.searchsorted(times, last.to_datetime64(), side="right")
+            boundaries[channel] = (
+                (pd.Timestamp(times[before]), values[before]) if before >= 0 else None,
+                (pd.Timestamp(times[after]), values[after])
+                if after < len(times)
+                else None,
+            )
+
+        overlapping = (activities["stop_time"] >= first) & (
+            activities["start_time"] <= last
+        )
+        tasks.append(
+            {
+                "first": first,
+                "last": last,
+                "sources": [
+                    df.iloc[
+                        df["timestamp"]
+                        .searchsorted(first) : df["timestamp"]
+                        .searchsorted(last, side="right")
+                    ]
+                    for df in sources
+                ],
+                "boundaries": boundaries,
+                "activities": activities.loc[
+                    overlapping, ["start_time", "stop_time", "activity_id"]
+                ],
+                "channels": channels,
+            }
+        )
+    return tasks
+
+
+def _interpolate_partition(df: pd.DataFrame, task: dict) -> tuple:
+    """Interpolates the channels of a partition, with its boundary values as extra rows."""
+    channels = task["channels"]
+    before_rows, after_rows = [], []
+    for i, channel in enumerate(channels):
+        before, after = task["boundaries"].get(channel, (None, None))
+        # Outside rows are placed at their distance in minutes from the partition
+        if before is not None:
+            position = -((task["first"] - before[0]) / MINUTE)
+            before_rows.append((position, i, before[1]))
+        if after is not None:
+            position = len(df) - 1 + (after[0] - task["last"]) / MINUTE
+            after_rows.append((position, i, after[1]))
+    before_rows.sort()
+    after_rows.sort()
+
+    def outside(rows):
+        values = np.full((len(rows), len(channels)), np.nan)
+        for row, (_, i, value) in enumerate(rows):
+            values[row, i] = value
+        return values, np.array([position for position, _, _ in rows])
+
+    before_values, before_positions = outside(before_rows)
+    after_values, after_positions = outside(after_rows)
+    values, injected = interpolate_block(
+        np.vstack(
+            [before_values, df[channels].to_numpy(dtype="float64"), after_values]
+        ),
+        limit=LIMIT,
+        positions=np.concatenate(
+            [before_positions, np.arange(len(df)), after_positions]
+        ),
+    )
+    inside = slice(len(before_rows), len(before_rows) + len(df))
+    return values[inside], injected[inside]
+
+
+def transform_partition(task: dict) -> tuple:
+    """Merges, interpolates and tags with activity ids the monitoring data of one partition.
+
+    Same steps and results as on the whole history: the sources are merged on the
+    one minute grid, "in_activity" is derived from the stress codes, the channels are
+    interpolated (their "<channel>_injected" masks added), negative stress values
+    are removed and the minutes of every activity get its "activity_id".
+
+    Args:
+        task (dict): A task returned by build_partition_tasks.
+
+    Returns:
+        tuple: The monitoring dataframe of the partition (indexed by timestamp) and its daily coverage.
+    """
+    df = pd.DataFrame(
+        {"timestamp": pd.date_range(task["first"], task["last"], freq="min")}
+    )
+    for source in task["sources"]:
+        df = df.merge(source, on="timestamp", how="left")
+    df = df.set_index("timestamp")
+
+    # stress -1 (non recorded) and -2 (recorded) mark activities
+    stress = df["stress"].to_numpy()
+    df["in_activity"] = np.where(stress == -2, 2, np.where(stress == -1, 1, 0))
+
+    values, injected = _interpolate_partition(df, task)
+    for i, col in enumerate(task["channels"]):
+        df[col] = values[:, i]
+        df[f"{col}_injected"] = injected[:, i]
+
+    df["stress"] = df["stress"].mask(df["stress"] < 0)
+    df.loc[df["stress"].isnull(), "stress_injected"] = False
+
+    # Later activities overwrite earlier ones, like row by row assignments would
+    activities = task["activities"]
+    which = np.full(len(df), -1)
+    for k, (start_time, stop_time) in enumerate(
+        zip(activities["start_time"], activities["stop_time"])
+    ):
+        first = df.index.searchsorted(start_time, side="left")
+        last = df.index.searchsorted(stop_time, side="right")
+        which[first:last] = k
+    df["activity_id"] = (
+        pd.Series(activities["activity_id"].to_numpy()).reindex(which).to_numpy()
+    )
+
+    return df, build_daily_coverage(df)
+
+
+def transform_monitoring(
+    sources: list,
+    activities: pd.DataFrame,
+    workers: int = 1,
+    store: SpillingStore = None,
+    finish=None,
+) -> tuple:
+    """Builds the monitoring table month by month, optionally in a process pool.
+
+    Months are independent once they carry their boundary values, so they are
+    transformed by `workers` processes, in chronological order. Processes are forked
+    (the ETL scripts have no main guard a spawned process could import safely):
+    where fork isn't available the months are processed sequentially. The months
+    are never concatenated: the next steps consume them one at a time (see
+    SpillingStore.stream), so the whole minute table is never held in memory.
+
+    Args:
+        sources (list): The monitoring dataframes, each with a "timestamp" column.
+        activities (pd.DataFrame): The activities, with "start_time", "stop_time" and "activity_id" columns.
+        workers (int): The number of processes. Default is 1 (no process pool).
+        store (SpillingStore): The store receiving the transformed months. Default is
+            a store without memory budget.
+        finish: A function applied to every transformed month before it is stored
+            (e.g. compact.compact_measurements). Default is None.
+
+    Returns:
+        tuple: The store of the monthly partitions (indexed by timestamp, keyed by
+            month, in chronological order) and the daily coverage of the minutes.
+    """
+    tasks = build_partition_tasks(sources, activities)
+    partitions = SpillingStore(budget_mb=0) if store is None else store
+    coverage = []
+
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            results = executor.map(transform_partition, tasks)
+            for task, (df, df_coverage) in zip(tasks, results):
+                partitions[str(task["first"].to_period("M"))] = (
+                    df if finish is None else finish(df)
+                )
+                coverage.append(df_coverage)
+    else:
+        for task in tasks:
+            df, df_coverage = transform_partition(task)
+            partitions[str(task["first"].to_period("M"))] = (
+                df if finish is None else finish(df)
+            )
+            coverage.append(df_coverage)
+
+    return partitions, pd.concat(coverage)
+
+
+def read_partitions(folder: str):
+    """Yields the monthly partitions pickled to a folder ("<YYYY-MM>.pkl"), in chronological order.
+
+    Args:
+        folder (str): The directory of the partitions.
+
+    Yields:
+        pd.DataFrame: The partitions, one at a time.
+    """
+    for file in sorted(f for f in os.listdir(folder) if f.endswith(".pkl")):
+        yield pd.read_pickle(os.path.join(folder, file))
@@ -0,0 +1,93 @@
+import queue
+import threading
+
+# Marks the end of the items of a queue
+DONE = object()
+
+
+def start_producer(items, outbox: queue.Queue, errors: list) -> threading.Thread:
+    """Starts a thread putting every item of an iterable in a queue, then DONE.
+
+    The producer stops early once a stage has failed.
+
+    Args:
+        items: The iterable (e.g. a generator extracting tables one by one).
+        outbox (queue.Queue): The queue receiving the items. Bounded, it blocks the
+            producer while the next stage is behind.
+        errors (list): The list receiving the exception of a failed stage.
+
+    Returns:
+        threading.Thread: The started thread.
+    """
+
+    def run():
+        try:
+            for item in items:
+                if errors:
+                    break
+                outbox.put(item)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            outbox.put(DONE)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def start_stage(
+    func, inbox: queue.Queue, outbox: queue.Queue, errors: list
+) -> threading.Thread:
+    """Starts a thread applying a function to every item of a queue as soon as it arrives.
+
+    Once a stage has failed (this one or another), the stage stops applying the
+    function but keeps draining its inbox until DONE, so the threads putting items
+    in it never block on a full queue nobody reads.
+
+    Args:
+        func: The function applied to every item.
+        inbox (queue.Queue): The queue of the items, ended by DONE.
+        outbox (queue.Queue): The queue receiving the results, then DONE (None to discard them).
+        errors (list): The list receiving the exception of a failed stage.
+
+    Returns:
+        threading.Thread: The started thread.
+    """
+
+    def results():
+        while True:
+            item = inbox.get()
+            if item is DONE:
+                return
+            if errors:
+                continue
+            try:
+                result = func(item)
+            except Exception as error:
+                errors.append(error)
+                continue
+            yield result
+
+    return start_producer(
+        results(), queue.Queue() if outbox is None else outbox, errors
+    )
+
+
+def consume(inbox: queue.Queue, errors: list):
+    """Yields the items of a queue until DONE, raising the error of a failed stage as soon as there is one.
+
+    Args:
+        inbox (queue.Queue): The queue of the items, ended by DONE.
+        errors (list): The list receiving the exception of a failed stage.
+
+    Yields:
+        The items of the queue, in order.
+    """
+    while True:
+        item = inbox.get()
+        if errors:
+            raise errors[0]
+        if item is DONE:
+            break
+        yield item
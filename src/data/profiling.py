@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+# Hash given to missing cells, and multiplier used to combine column hashes into row hashes
+NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+ROW_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+def _cell_hashes(codes: np.ndarray, uniques) -> np.ndarray:
+    """Returns the hash of every cell of a factorized column (missing cells get NULL_HASH)."""
+    if not len(uniques):
+        return np.full(len(codes), NULL_HASH, dtype="uint64")
+    # Only the distinct values are hashed, cells gather their hash by code
+    unique_hashes = pd.util.hash_pandas_object(pd.Series(uniques), index=False)
+    return np.where(codes == -1, NULL_HASH, unique_hashes.to_numpy()[codes])
+
+
+def _combine(hashes: np.ndarray, cell_hashes: np.ndarray) -> np.ndarray:
+    """Folds the cell hashes of one more column into the row hashes."""
+    # uint64 arithmetic wraps around, which is what we want here
+    return hashes * ROW_HASH_MULTIPLIER ^ cell_hashes
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """Returns a 64-bit content hash of every row of a dataframe.
+
+    The hashes are the same as the ones returned by profile_table for a dataframe
+    with the same columns, so rows hashed on different runs can be compared.
+
+    Args:
+        df (pd.DataFrame): The dataframe whose rows to hash.
+
+    Returns:
+        np.ndarray: The uint64 hash of every row.
+    """
+    hashes = np.zeros(len(df), dtype="uint64")
+    for column in df.columns:
+        hashes = _combine(hashes, _cell_hashes(*pd.factorize(df[column])))
+    return hashes
+
+
+def profile_table(df: pd.DataFrame, row_hashes: bool = True) -> tuple:
+    """Profiles every column of a dataframe in a single pass, and optionally hashes its rows.
+
+    Each column is read once by pd.factorize: the codes give the null count, the
+    uniques give the cardinality and min/max, and hashing the (few) uniques then
+    gathering them by code gives the contribution of the column to the row hashes.
+
+    Args:
+        df (pd.DataFrame): The dataframe to profile.
+        row_hashes (bool): If True, also returns a content hash of every row. Default is True.
+
+    Returns:
+        tuple: The profile (a dataframe indexed by column with "dtype", "null_count",
+            "n_unique", "is_empty", "is_constant", "min" and "max" columns) and the
+            uint64 row hashes (None if row_hashes is False).
+    """
+    n_rows = len(df)
+    hashes = np.zeros(n_rows, dtype="uint64") if row_hashes else None
+    profile = []
+
+    for column in df.columns:
+        # Missing values get the code -1
+        codes, uniques = pd.factorize(df[column])
+        missing = codes == -1
+        null_count = int(missing.sum())
+
+        # Min and max of the distinct values (None if they can't be ordered)
+        minimum, maximum = None, None
+        if len(uniques):
+            try:
+                minimum, maximum = uniques.min(), uniques.max()
+            except TypeError:
+                pass
+
+        profile.append(
+            {
+                "column": column,
+                "dtype": str(df[column].dtype),
+                "null_count": null_count,
+                "n_unique": len(uniques),
+                "is_empty": null_count == n_rows,
+                # Missing values are ignored, like Series.nunique() does
+                "is_constant": len(uniques) == 1,
+                "min": minimum,
+                "max": maximum,
+            }
+        )
+
+        if row_hashes:
+            hashes = _combine(hashes, _cell_hashes(codes, uniques))
+
+    profile = pd.DataFrame(
+        profile,
+        columns=[
+            "column",
+            "dtype",
+            "null_count",
+            "n_unique",
+            "is_empty",
+            "is_constant",
+            "min",
+            "max",
+        ],
+    ).set_index("column")
+    return profile, hashes
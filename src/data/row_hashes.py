@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+import json
+import os
+
+from profiling import hash_rows
+
+
+def _read_state(folder: str, key: str) -> tuple:
+    """Returns the state and the stored (days, hash sums) array of a table (None, None if not stored)."""
+    state_path = os.path.join(folder, f"{key}.json")
+    sums_path = os.path.join(folder, f"{key}.day_hashes.npy")
+    if not (os.path.exists(state_path) and os.path.exists(sums_path)):
+        return None, None
+    with open(state_path) as f:
+        state = json.load(f)
+    return state, np.load(sums_path)
+
+
+def _day_sums(times: pd.Series, hashes: np.ndarray) -> tuple:
+    """Returns the day of every row (days since 1970-01-01, rows without time share one
+    bucket), the distinct days and the sum of their row hashes (wrapping around)."""
+    days = np.asarray(times, dtype="datetime64[ns]").astype("datetime64[D]")
+    days = days.astype("int64")
+    distinct, codes = np.unique(days, return_inverse=True)
+    sums = np.zeros(len(distinct), dtype="uint64")
+    np.add.at(sums, codes, hashes)
+    return days, distinct, sums
+
+
+def check_new_rows(
+    df: pd.DataFrame,
+    folder: str,
+    key: str,
+    time_column: str = "timestamp",
+    row_hashes: np.ndarray = None,
+) -> tuple:
+    """Checks the rows of the days that changed since the last run for duplicates.
+
+    A duplicate row has the same content, hence the same `time_column` value, as
+    the row it duplicates: duplicates are always found within a single day. The
+    sum of the row hashes of every day is stored (like the content hash of an
+    activity, see activity_metrics.content_hashes), and only the days whose sum
+    differs are checked: new days, rows synced late or backfilled into older days,
+    but also rows edited in place. A run compares the hashes of the changed days
+    instead of a full-history df.duplicated(), and the stored state is one hash
+    per day. Everything is checked when the columns or dtypes of the table change
+    (the row hashes depend on both), or when nothing is stored yet.
+
+    Args:
+        df (pd.DataFrame): The table to check.
+        folder (str): The directory of the persisted day hashes (created if needed).
+        key (str): The name of the table.
+        time_column (str): The column the rows are bucketed by. Default is "timestamp".
+        row_hashes (np.ndarray): The hash_rows of df, if already computed (e.g. by
+            profile_table). Default is None (computed here).
+
+    Returns:
+        tuple: Two boolean arrays over the rows of df, marking the rows checked on
+            this run and the ones among them that are duplicates.
+    """
+    if row_hashes is None:
+        row_hashes = hash_rows(df)
+    dtypes = {str(column): str(dtype) for column, dtype in df.dtypes.items()}
+    state, stored = _read_state(folder, key)
+    days, distinct, sums = _day_sums(df[time_column], row_hashes)
+
+    if state is None or state.get("dtypes") != dtypes:
+        new = np.ones(len(df), dtype=bool)
+    else:
+        # Days whose hash sum changed (stored days missing now have nothing to check)
+        stored_sums = pd.Series(stored[1].view("uint64"), index=stored[0])
+        known = np.isin(distinct, stored[0])
+        previous = stored_sums.reindex(distinct, fill_value=0).to_numpy()
+        new = np.isin(days, distinct[~known | (previous != sums)])
+
+    duplicated = np.zeros(len(df), dtype=bool)
+    duplicated[new] = pd.Series(row_hashes[new]).duplicated().to_numpy()
+
+    # Persisting the day hashes before the state, which commits them
+    os.makedirs(folder, exist_ok=True)
+    np.save(
+        os.path.join(folder, f"{key}.day_hashes.npy"),
+        np.vstack([distinct, sums.view("int64")]),
+    )
+    with open(os.path.join(folder, f"{key}.json"), "w") as f:
+        json.dump({"dtypes": dtypes}, f, indent=2)
+
+    return new, duplicated
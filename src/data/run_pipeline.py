@@ -0,0 +1,123 @@
+# -----------------------------------------------------------------------------
+# SCRIPT RUN_PIPELINE.PY DESCRIPTION
+# Runs extract_data.py, clean_data.py and transform_data.py as one pipeline: each
+# table is cleaned as soon as it is extracted (bounded in-memory queues between
+# the stages), and the clean tables are handed over to the transform in memory.
+# The transform only starts once every table is cleaned: removing the duplicated
+# summaries and adjusting the time zones need all the tables.
+# Input: Garmin SQLite Databases (paths in sources.py)
+# Output: Pickle and CSV files of processed tables (data/processed), and of raw
+#   (data/raw) and cleaned (data/interim) tables if HEALTH_TRACKER_PIPELINE_WRITE_FILES
+# -----------------------------------------------------------------------------
+import pandas as pd
+
+import os
+import queue
+import runpy
+
+from cleaning import (
+    adjust_time_zones,
+    clean_table,
+    remove_duplicated_summaries,
+    sort_tables,
+)
+from pipeline import DONE, consume, start_producer, start_stage
+from settings import PIPELINE_QUEUE_SIZE, PIPELINE_WRITE_FILES, SPILL_FOLDER
+from sources import databases, iter_tables
+from spilling import SpillingStore
+
+# -----------------------------------------------------------------------------
+# Setting up the stages
+# -----------------------------------------------------------------------------
+# Stages run in threads: reading SQLite and writing files release the GIL, so the
+# extraction, the cleaning and the disk hand-off overlap
+errors = []
+extracted = queue.Queue(PIPELINE_QUEUE_SIZE)
+cleaned = queue.Queue(PIPELINE_QUEUE_SIZE)
+to_write = queue.Queue(PIPELINE_QUEUE_SIZE)
+hashes_path = "../../data/interim/row_hashes/"
+
+
+def extract_tables():
+    """Yields the tables one by one, sending a copy of each to the writer."""
+    for key, df in iter_tables(databases):
+        print(f"{key} extracted {df.shape}")
+        if PIPELINE_WRITE_FILES:
+            # The cleaning stage changes the tables in place
+            to_write.put(("../../data/raw/", key, df.copy()))
+        yield key, df
+
+
+def clean(item):
+    key, df = item
+    return (key,) + clean_table(key, df, hashes_path)
+
+
+def write(item):
+    folder, key, df = item
+    df.to_pickle(os.path.join(folder, f"{key}.pkl"))
+    df.to_csv(os.path.join(folder, f"{key}.csv"))
+
+
+writer = start_stage(write, to_write, None, errors)
+start_producer(extract_tables(), extracted, errors)
+start_stage(clean, extracted, cleaned, errors)
+
+# -----------------------------------------------------------------------------
+# Extracting and cleaning the tables
+# -----------------------------------------------------------------------------
+print("\n_____Extracting and cleaning the tables_____")
+dataframes = SpillingStore(folder=os.path.join(SPILL_FOLDER, "pipeline"))
+profiles = {}
+duplicates = []
+for key, df, profile, summary in consume(cleaned, errors):
+    dataframes[key] = df
+    profiles[key] = profile
+    duplicates.append(summary)
+
+# -----------------------------------------------------------------------------
+# Cleaning steps needing several tables
+# -----------------------------------------------------------------------------
+print("\n_____Deleting duplicated dataframes_____")
+if remove_duplicated_summaries(dataframes):
+    print("Duplicated dataframes deleted.")
+
+print("\n_____Checking for duplicates_____")
+print(pd.DataFrame(duplicates).set_index("table").to_string())
+
+print("\n_____Adjusting tables from time zones_____")
+df_timezone_offsets = adjust_time_zones(dataframes)
+sort_tables(dataframes)
+
+if PIPELINE_WRITE_FILES:
+    profiles_path = "../../data/interim/profiles/"
+    os.makedirs(profiles_path, exist_ok=True)
+    df_profiles = pd.concat(profiles, names=["table", "column"])
+    df_profiles.to_pickle(os.path.join(profiles_path, "column_profiles.pkl"))
+    df_profiles.to_csv(os.path.join(profiles_path, "column_profiles.csv"))
+    df_timezone_offsets.to_csv("../../data/interim/timezone_offsets.csv")
+
+    # The transform changes the tables in place (spilled tables are read back one
+    # at a time, without spilling the others again)
+    for key, df in dataframes.stream():
+        to_write.put(("../../data/interim/", key, df.copy()))
+    del df
+to_write.put(DONE)
+
+# Not transforming the tables if a stage (e.g. the writer) has already failed
+if errors:
+    raise errors[0]
+
+# -----------------------------------------------------------------------------
+# Transforming the clean tables
+# -----------------------------------------------------------------------------
+runpy.run_path(
+    "transform_data.py",
+    init_globals={"preloaded_tables": dataframes},
+    run_name="__main__",
+)
+
+# Waiting for the last files to be written
+writer.join()
+if errors:
+    raise errors[0]
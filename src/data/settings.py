@@ -0,0 +1,78 @@
+# -----------------------------------------------------------------------------
+# Pipeline settings, overridable with environment variables
+# -----------------------------------------------------------------------------
+import os
+
+# Root of the repository, the relative paths of the settings that are shared with
+# the dashboard are resolved against it (the scripts run from different folders)
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def env_flag(name: str, default: bool) -> bool:
+    """Returns the boolean value of an environment variable ("1", "true", "yes" or "on" are True).
+
+    Args:
+        name (str): The name of the environment variable.
+        default (bool): The value returned when the variable isn't set.
+
+    Returns:
+        bool: The value of the flag.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_int(name: str, default: int) -> int:
+    """Returns the integer value of an environment variable.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (int): The value returned when the variable isn't set.
+
+    Returns:
+        int: The value of the setting.
+    """
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return int(value)
+
+
+# Opt-in: store processed tables with compact dtypes (float32, int8, categorical,
+# bit-packed flags). This changes the exported schema of the monitoring table.
+COMPACT_DTYPES = env_flag("HEALTH_TRACKER_COMPACT_DTYPES", False)
+
+# Memory budget of the tables held by each script, in MB (0 means no budget):
+# the least recently used tables are spilled to SPILL_FOLDER beyond it
+MEMORY_BUDGET_MB = env_int("HEALTH_TRACKER_MEMORY_BUDGET_MB", 0)
+SPILL_FOLDER = os.environ.get("HEALTH_TRACKER_SPILL_FOLDER", "../../data/spill/")
+
+# Number of processes transforming the monthly partitions of the monitoring data
+# (1 processes them one after the other in the main process)
+WORKERS = env_int("HEALTH_TRACKER_WORKERS", 1)
+
+# run_pipeline.py: number of tables waiting between two stages, and whether the
+# raw and interim tables are also written to disk (they are handed over in memory)
+PIPELINE_QUEUE_SIZE = env_int("HEALTH_TRACKER_PIPELINE_QUEUE_SIZE", 2)
+PIPELINE_WRITE_FILES = env_flag("HEALTH_TRACKER_PIPELINE_WRITE_FILES", True)
+
+# Databases are read from a consistent snapshot taken with the SQLite backup API:
+# "off" (read the live files), "memory" or "disk" (a copy in SNAPSHOT_FOLDER)
+DB_SNAPSHOT = os.environ.get("HEALTH_TRACKER_DB_SNAPSHOT", "off").strip().lower()
+SNAPSHOT_FOLDER = os.environ.get(
+    "HEALTH_TRACKER_SNAPSHOT_FOLDER", "../../data/snapshots/"
+)
+
+# transform_data.py also writes the processed tables to a single-file SQLite
+# warehouse (indexed, with materialized aggregates) when enabled
+WAREHOUSE = env_flag("HEALTH_TRACKER_WAREHOUSE", False)
+WAREHOUSE_PATH = os.path.join(
+    ROOT,
+    os.environ.get("HEALTH_TRACKER_WAREHOUSE_PATH", "data/processed/health_tracker.db"),
+)
+
+# Maximum heart rate the heart rate zones are relative to (0 means the highest
+# max_hr of the activities)
+MAX_HR = env_int("HEALTH_TRACKER_MAX_HR", 0)
@@ -0,0 +1,187 @@
+import numpy as np
+import pandas as pd
+
+
+def _window_sums(values: np.ndarray, first: np.ndarray, last: np.ndarray) -> tuple:
+    """Returns the sum and count of non-NaN values of every [first, last) window using prefix sums.
+
+    Args:
+        values (np.ndarray): The values to aggregate.
+        first (np.ndarray): The first position of each window.
+        last (np.ndarray): The position following the last one of each window.
+
+    Returns:
+        tuple: The sums and the counts of non-NaN values, one per window.
+    """
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    return sums[last] - sums[first], counts[last] - counts[first]
+
+
+def _window_min(values: np.ndarray, first: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """Returns the minimum of the non-NaN values of every [first, last) window (NaN if empty)."""
+    # A trailing NaN makes "last" a valid position for reduceat, even for the last window
+    extended = np.append(values, np.nan)
+    bounds = np.column_stack([first, last]).ravel()
+    # Even positions hold the reduction of [first, last), fmin ignores NaN values
+    minimums = np.fmin.reduceat(extended, bounds)[::2]
+    # reduceat returns the value at "first" for empty windows
+    return np.where(last > first, minimums, np.nan)
+
+
+def build_nightly_windows(
+    df_days: pd.DataFrame,
+    df_monitoring: pd.DataFrame,
+    hr_column: str = "heart_rate",
+    stress_column: str = "stress",
+    rr_column: str = "rr",
+) -> pd.DataFrame:
+    """Returns one row per night with its monitoring minute range and in-sleep aggregates.
+
+    Each night [start_sleep, end_sleep] is resolved to a [first_minute, last_minute)
+    range of monitoring rows with a binary search on the sorted minute index
+    (interval join). Aggregates are then computed for all nights at once from
+    prefix sums, so the cost doesn't depend on the number of nights.
+
+    Restlessness is the mean absolute minute-to-minute heart rate change during
+    the night (in bpm per minute): the monitoring data doesn't include movement,
+    and heart rate jumps are the best available proxy for agitated sleep.
+
+    Args:
+        df_days (pd.DataFrame): The daily dataframe, indexed by day, with "start_sleep" and "end_sleep" columns.
+        df_monitoring (pd.DataFrame): The minute dataframe, indexed by sorted timestamps.
+        hr_column (str): The heart rate column of df_monitoring. Default is "heart_rate".
+        stress_column (str): The stress column of df_monitoring. Default is "stress".
+        rr_column (str): The respiration rate column of df_monitoring. Default is "rr".
+
+    Returns:
+        pd.DataFrame: A dataframe indexed by day with the sleep window and its aggregates.
+    """
+    # Keeping valid nights only
+    nights = df_days[["start_sleep", "end_sleep"]].dropna()
+    nights = nights[nights["end_sleep"] > nights["start_sleep"]].copy()
+
+    # Resolving the monitoring rows of each night (interval join on the sorted index)
+    timestamps = df_monitoring.index.values
+    first = np.searchsorted(timestamps, nights["start_sleep"].values, side="left")
+    last = np.searchsorted(timestamps, nights["end_sleep"].values, side="right")
+    nights["first_minute"] = first
+    nights["last_minute"] = last
+    nights["minutes"] = last - first
+
+    # Heart rate
+    hr = df_monitoring[hr_column].to_numpy(dtype="float64")
+    hr_sum, hr_count = _window_sums(hr, first, last)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        nights["hr_mean"] = hr_sum / hr_count
+    nights["hr_min"] = _window_min(hr, first, last)
+    nights["hr_minutes"] = hr_count
+
+    # Stress and respiration rate
+    for column, name in [
+        (stress_column, "stress_mean"),
+        (rr_column, "respiration_rate_mean"),
+    ]:
+        values_sum, values_count = _window_sums(
+            df_monitoring[column].to_numpy(dtype="float64"), first, last
+        )
+        with np.errstate(invalid="ignore", divide="ignore"):
+            nights[name] = values_sum / values_count
+
+    # Restlessness: the change between minute i and i+1 is stored at position i, so
+    # the changes inside [first, last) are at positions [first, last - 1)
+    hr_changes = np.append(np.abs(np.diff(hr)), np.nan)
+    changes_sum, changes_count = _window_sums(
+        hr_changes, first, np.maximum(last - 1, first)
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        nights["restlessness"] = changes_sum / changes_count
+
+    return nights
+
+
+def _partition_windows(
+    nights: pd.DataFrame,
+    previous: pd.DataFrame,
+    df: pd.DataFrame,
+    position: int,
+    columns: dict,
+) -> pd.DataFrame:
+    """Returns the windows of nights ending in a partition, with positions in the whole minute table."""
+    chunk = df
+    start = nights["start_sleep"].min()
+    if previous is not None and start < df.index[0]:
+        # Nights starting before the partition need the end of the previous one
+        chunk = pd.concat([previous[previous.index >= start], df])
+    windows = build_nightly_windows(nights, chunk, **columns)
+    shift = position - (len(chunk) - len(df))
+    windows["first_minute"] += shift
+    windows["last_minute"] += shift
+    return windows
+
+
+def build_nightly_windows_by_partition(
+    df_days: pd.DataFrame,
+    partitions,
+    hr_column: str = "heart_rate",
+    stress_column: str = "stress",
+    rr_column: str = "rr",
+) -> pd.DataFrame:
+    """Returns the nightly windows (see build_nightly_windows) of minute data split in consecutive partitions.
+
+    Every night is resolved in the partition its end_sleep falls in (the last one
+    for the nights ending after the data), with the end of the previous partition
+    attached when it starts before it: at most two partitions are held at once.
+    first_minute and last_minute are positions in the whole minute table, and the
+    windows are the ones build_nightly_windows gives on the concatenated partitions
+    as long as no night is longer than a partition. Empty partitions are skipped,
+    and without any minute no night has a window.
+
+    Args:
+        df_days (pd.DataFrame): The daily dataframe, indexed by day, with "start_sleep" and "end_sleep" columns.
+        partitions: An iterable of consecutive minute dataframes, each indexed by sorted timestamps.
+        hr_column (str): The heart rate column of the partitions. Default is "heart_rate".
+        stress_column (str): The stress column of the partitions. Default is "stress".
+        rr_column (str): The respiration rate column of the partitions. Default is "rr".
+
+    Returns:
+        pd.DataFrame: A dataframe indexed by day with the sleep window and its aggregates.
+    """
+    columns = {
+        "hr_column": hr_column,
+        "stress_column": stress_column,
+        "rr_column": rr_column,
+    }
+    nights = df_days[["start_sleep", "end_sleep"]].dropna()
+    nights = nights[nights["end_sleep"] > nights["start_sleep"]]
+    ends = nights["end_sleep"].to_numpy()
+
+    windows = []
+    remaining = np.ones(len(nights), dtype=bool)
+    previous, position, last = None, 0, None
+    for df in partitions:
+        if df.empty:
+            continue
+        selected = remaining & (ends <= df.index[-1].to_datetime64())
+        windows.append(
+            _partition_windows(nights[selected], previous, df, position, columns)
+        )
+        remaining &= ~selected
+        last = (previous, df, position)
+        previous, position = df, position + len(df)
+
+    # Without any minute, no night has a window (the columns of build_nightly_windows)
+    if last is None:
+        empty = pd.DataFrame(
+            columns=[hr_column, stress_column, rr_column],
+            index=pd.DatetimeIndex([], name="timestamp"),
+            dtype="float64",
+        )
+        return build_nightly_windows(nights.iloc[:0], empty, **columns)
+
+    # Nights ending after the last minute
+    if remaining.any():
+        windows.append(_partition_windows(nights[remaining], *last, columns))
+
+    return pd.concat(windows).reindex(nights.index)
@@ -0,0 +1,161 @@
+# -----------------------------------------------------------------------------
+# Garmin SQLite databases and tables extracted, shared by extract_data.py and
+# run_pipeline.py
+# -----------------------------------------------------------------------------
+import pandas as pd
+
+from contextlib import contextmanager
+from pathlib import Path
+import atexit
+import sqlite3
+import os
+
+from settings import DB_SNAPSHOT, SNAPSHOT_FOLDER
+from typed_reader import read_table
+
+# Path variables to databases
+db_garmin = "C:\\Users\\33671\\HealthData\\DBs\\garmin.db"
+db_garmin_activities = "C:\\Users\\33671\\HealthData\\DBs\\garmin_activities.db"
+db_garmin_monitoring = "C:\\Users\\33671\\HealthData\\DBs\\garmin_monitoring.db"
+db_garmin_summary = "C:\\Users\\33671\\HealthData\\DBs\\garmin_summary.db"
+db_summary = "C:\\Users\\33671\\HealthData\\DBs\\summary.db"
+
+# List of database paths
+database_paths = [
+    db_garmin,
+    db_garmin_activities,
+    db_garmin_monitoring,
+    db_garmin_summary,
+    db_summary,
+]
+
+# Databases and tables to retrieve
+databases = {
+    f"{db_garmin}": ["stress", "sleep", "daily_summary"],
+    f"{db_garmin_activities}": [
+        "activities",
+        "activity_laps",
+        "activity_records",
+        "steps_activities",
+    ],
+    f"{db_garmin_monitoring}": ["monitoring_hr", "monitoring_rr"],
+    f"{db_garmin_summary}": [
+        "years_summary",
+        "months_summary",
+        "weeks_summary",
+        "days_summary",
+        "intensity_hr",
+    ],
+    f"{db_summary}": [
+        "years_summary",
+        "months_summary",
+        "weeks_summary",
+        "days_summary",
+    ],
+}
+
+# Large tables read by typed_reader.read_table: their timestamps arrive as datetimes
+# instead of strings, the other tables are read with pd.read_sql_query
+TYPED_TABLES = ["stress", "monitoring_hr", "monitoring_rr", "activity_records"]
+
+
+# Pages copied per backup step: the source is only locked during a step
+SNAPSHOT_PAGES = 4096
+
+# Snapshots taken during this run, by database path
+_snapshots = {}
+
+
+def take_snapshot(db_path: str, mode: str = DB_SNAPSHOT) -> sqlite3.Connection:
+    """Copies a database with the SQLite online backup API and returns a connection to the copy.
+
+    The source is opened read-only and copied SNAPSHOT_PAGES pages at a time, so a
+    concurrent writer (garmindb_cli.py --latest) is never blocked for long. If it
+    writes during the copy, the backup restarts: the copy is always consistent.
+
+    Args:
+        db_path (str): The path to the database.
+        mode (str): "memory" for an in-memory copy, "disk" for a copy in SNAPSHOT_FOLDER. Default is DB_SNAPSHOT.
+
+    Returns:
+        sqlite3.Connection: A connection to the copy.
+    """
+    if mode == "memory":
+        target = sqlite3.connect(":memory:")
+    elif mode == "disk":
+        os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+        snapshot_path = os.path.join(SNAPSHOT_FOLDER, os.path.basename(db_path))
+        if os.path.exists(snapshot_path):
+            os.remove(snapshot_path)
+        target = sqlite3.connect(snapshot_path)
+    else:
+        raise ValueError(f"Unknown snapshot mode: {mode}")
+
+    source = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        source.backup(target, pages=SNAPSHOT_PAGES)
+    finally:
+        source.close()
+    return target
+
+
+def close_snapshots():
+    """Closes the snapshots still open (an in-memory snapshot frees its copy)."""
+    while _snapshots:
+        _, conn = _snapshots.popitem()
+        conn.close()
+
+
+# Snapshots kept for a later read are closed when the script ends
+atexit.register(close_snapshots)
+
+
+@contextmanager
+def open_database(db_path: str, keep_snapshot: bool = True):
+    """Opens a database, or the snapshot of it taken once per run (see DB_SNAPSHOT).
+
+    Args:
+        db_path (str): The path to the database.
+        keep_snapshot (bool): Whether the snapshot stays open for a later read of the
+            database during the run. The last read passes False, so the snapshot is
+            closed on exit. Default is True.
+
+    Yields:
+        sqlite3.Connection: The connection (closed on exit, unless it is a kept snapshot).
+    """
+    if DB_SNAPSHOT == "off":
+        conn = sqlite3.connect(db_path)
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+
+    if db_path not in _snapshots:
+        _snapshots[db_path] = take_snapshot(db_path)
+    try:
+        yield _snapshots[db_path]
+    finally:
+        if not keep_snapshot:
+            _snapshots.pop(db_path).close()
+
+
+def iter_tables(databases: dict):
+    """Yields the name and dataframe of every table to retrieve, one table at a time.
+
+    Args:
+        databases (dict): The paths to the databases as keys and the lists of tables to retrieve as values.
+
+    Yields:
+        tuple: The name of the table ("<database name>_<table name>") and its dataframe.
+    """
+    for db_path, tables in databases.items():
+        database_name = os.path.basename(db_path)
+        # Connect to the database (or to its snapshot, closed once its tables are read)
+        with open_database(db_path, keep_snapshot=False) as conn:
+            for table_name in tables:
+                if table_name in TYPED_TABLES:
+                    df = read_table(conn, table_name)
+                else:
+                    df = pd.read_sql_query(f"SELECT * FROM {table_name}", conn)
+                yield database_name + "_" + table_name, df
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import os
+
+from settings import MEMORY_BUDGET_MB, SPILL_FOLDER
+
+
+def memory_size(df) -> int:
+    """Returns the memory used by a dataframe or series, in bytes (object values included)."""
+    return int(np.sum(df.memory_usage(deep=True)))
+
+
+class SpillingStore(MutableMapping):
+    """A dictionary of dataframes holding at most a memory budget of them in memory.
+
+    Beyond the budget, the least recently used dataframes are pickled to the spill
+    folder and transparently read back when accessed again. Tables are only spilled
+    when another one is stored or accessed, with their current content, so in-place
+    changes are kept. Don't keep a reference to a table across accesses to other
+    tables when a budget is set: the store may have spilled and reloaded it since.
+    With a budget of 0 the store behaves like a plain dict.
+    """
+
+    def __init__(self, budget_mb: int = MEMORY_BUDGET_MB, folder: str = SPILL_FOLDER):
+        """Creates an empty store.
+
+        Args:
+            budget_mb (int): The memory budget, in MB (0 means no budget). Default is MEMORY_BUDGET_MB.
+            folder (str): The directory of the spilled tables. Default is SPILL_FOLDER.
+        """
+        self.budget = budget_mb * 2**20
+        self.folder = folder
+        self._keys = {}  # Every key, in insertion order
+        self._memory = OrderedDict()  # Tables in memory, least recently used first
+        self._sizes = {}
+        self._spilled = {}  # Paths of the spilled tables
+
+    def _path(self, key) -> str:
+        return os.path.join(self.folder, f"{key}.pkl".replace(os.sep, "_"))
+
+    def _keep(self, key, df) -> None:
+        """Puts a table in memory, then spills the least recently used ones over the budget."""
+        self._memory[key] = df
+        self._memory.move_to_end(key)
+        if not self.budget:
+            return
+        self._sizes[key] = memory_size(df)
+        while sum(self._sizes.values()) > self.budget and len(self._memory) > 1:
+            oldest, table = self._memory.popitem(last=False)
+            os.makedirs(self.folder, exist_ok=True)
+            table.to_pickle(self._path(oldest))
+            self._spilled[oldest] = self._path(oldest)
+            del self._sizes[oldest]
+
+    def _discard(self, key) -> None:
+        """Forgets a table, in memory or spilled."""
+        self._memory.pop(key, None)
+        self._sizes.pop(key, None)
+        path = self._spilled.pop(key, None)
+        if path is not None:
+            os.remove(path)
+
+    def __getitem__(self, key):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if key in self._spilled:
+            df = pd.read_pickle(self._spilled[key])
+            self._discard(key)
+            self._keep(key, df)
+            return df
+        raise KeyError(key)
+
+    def __setitem__(self, key, df) -> None:
+        self._discard(key)
+        self._keys[key] = None
+        self._keep(key, df)
+
+    def __delitem__(self, key) -> None:
+        if key not in self._keys:
+            raise KeyError(key)
+        self._discard(key)
+        del self._keys[key]
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def pop(self, key, *default):
+        """Removes a table and returns it.
+
+        A spilled table is read back without being kept in the store, so popping
+        never spills another table. Pop tables at their point of use and drop the
+        reference once done: the store can't free a table something else refers to.
+        """
+        if key not in self._keys:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        df = self._memory.get(key)
+        if df is None:
+            df = pd.read_pickle(self._spilled[key])
+        del self[key]
+        return df
+
+    def stream(self, pop: bool = False):
+        """Yields the (key, table) pairs in insertion order, reading spilled tables one at a time.
+
+        Spilled tables are read without being kept in the store, so a pass over the
+        tables writes nothing to disk and holds at most the in-memory tables plus
+        the one yielded.
+
+        Args:
+            pop (bool): Whether to remove every table from the store once yielded.
+                Default is False.
+
+        Yields:
+            tuple: The key and the table.
+        """
+        for key in list(self._keys):
+            if pop:
+                yield key, self.pop(key)
+            elif key in self._memory:
+                yield key, self._memory[key]
+            else:
+                yield key, pd.read_pickle(self._spilled[key])
+
+    def clear(self) -> None:
+        """Forgets every table, without reading the spilled ones back."""
+        for key in list(self._keys):
+            self._discard(key)
+        self._keys.clear()
+
+    @property
+    def spilled(self) -> list:
+        """The keys of the tables currently spilled to disk."""
+        return list(self._spilled)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+import re
+
+# Formats of the timestamps written by garmindb, tried in this order
+GARMINDB_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d"]
+
+# Values that can't be a garmindb timestamp are rejected on a small sample first
+TIMESTAMP_PREFIX = re.compile(r"\d{4}-\d{2}-\d{2}")
+SAMPLE_SIZE = 100
+
+
+def _looks_like_timestamps(values: pd.Series) -> bool:
+    """Returns True if the first non-missing values all start like a garmindb timestamp."""
+    sample = values.dropna().head(SAMPLE_SIZE)
+    return len(sample) > 0 and all(
+        isinstance(value, str) and TIMESTAMP_PREFIX.match(value) for value in sample
+    )
+
+
+def parse_timestamps(values, formats: list = GARMINDB_FORMATS, errors: str = "raise"):
+    """Converts a column of timestamp strings to datetimes, parsing each distinct string once.
+
+    Day and timestamp strings repeat heavily (every row of a day, every table of a
+    source), so the column is factorized and only its distinct strings are parsed,
+    with the fixed garmindb formats: each format is one vectorized pd.to_datetime
+    call over the strings the previous formats didn't parse, instead of a format
+    inference per string. The parsed values are then gathered back by code.
+
+    Args:
+        values (pd.Series): The column to convert.
+        formats (list): The formats tried, in order. Default is GARMINDB_FORMATS.
+        errors (str): "raise" parses the strings in no format with pd.to_datetime (which
+            raises if it can't), "ignore" returns the column unchanged if any string is
+            in no format. Default is "raise".
+
+    Returns:
+        pd.Series: The datetime column (or the input column, see errors).
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    if errors == "ignore" and not _looks_like_timestamps(values):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    uniques = np.asarray(uniques, dtype=object)
+    if not len(uniques):
+        return pd.Series(pd.NaT, index=values.index, name=values.name)
+
+    parsed = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[ns]")
+    remaining = np.ones(len(uniques), dtype=bool)
+    for fmt in formats:
+        if not remaining.any():
+            break
+        attempt = pd.to_datetime(
+            pd.Series(uniques[remaining]), format=fmt, errors="coerce", cache=False
+        ).to_numpy(dtype="datetime64[ns]")
+        done = ~np.isnat(attempt)
+        indices = np.flatnonzero(remaining)[done]
+        parsed[indices] = attempt[done]
+        remaining[indices] = False
+
+    if remaining.any():
+        if errors == "ignore":
+            return values
+        parsed[remaining] = pd.to_datetime(pd.Series(uniques[remaining])).to_numpy(
+            dtype="datetime64[ns]"
+        )
+
+    result = np.where(codes == -1, np.datetime64("NaT"), parsed[np.maximum(codes, 0)])
+    return pd.Series(result, index=values.index, name=values.name)
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+# Offsets tried for every window, in hours (DST changes and most travel)
+CANDIDATE_OFFSETS = [-2, -1, 0, 1, 2]
+MINUTE = np.timedelta64(1, "m")
+
+
+def _minute_grid(series: pd.Series, first: np.datetime64, length: int) -> np.ndarray:
+    """Returns the values of a timestamp-indexed series on a dense minute grid (NaN if missing)."""
+    grid = np.full(length, np.nan)
+    minutes = (series.index.values - first) // MINUTE
+    grid[minutes.astype("int64")] = series.to_numpy(dtype="float64")
+    return grid
+
+
+def estimate_offsets(
+    reference: pd.Series,
+    source: pd.Series,
+    candidates: list = CANDIDATE_OFFSETS,
+    window_days: int = 1,
+    min_overlap: int = 360,
+    min_margin: float = 0.05,
+) -> pd.Series:
+    """Estimates, for every time window, the offset to add to a source to align it on a reference.
+
+    Both series are laid on a dense minute grid. For each candidate offset the
+    reference is shifted by a slice, and the Pearson correlation with the source is
+    computed for all windows at once from per-window sums (np.bincount). A window
+    takes the best candidate when it has enough overlapping minutes and beats the
+    runner-up by `min_margin`; the other windows inherit the offset of their
+    neighbours (forward, then backward filled, 0 if no window is conclusive).
+
+    Args:
+        reference (pd.Series): The reference values (e.g. heart rate), indexed by timestamp.
+        source (pd.Series): The values to align (e.g. stress), indexed by timestamp.
+        candidates (list): The offsets to try, in hours. Default is CANDIDATE_OFFSETS.
+        window_days (int): The length of a window, in days. Default is 1.
+        min_overlap (int): The minimum number of overlapping minutes in a window. Default is 360.
+        min_margin (float): The minimum correlation gap with the runner-up candidate. Default is 0.05.
+
+    Returns:
+        pd.Series: The offset of every window in hours, indexed by the window start.
+    """
+    reference = reference.dropna()
+    source = source.dropna()
+    first = min(reference.index.min(), source.index.min()).floor("D")
+    last = max(reference.index.max(), source.index.max())
+    length = int((last - first) // pd.Timedelta(minutes=1)) + 1
+    first = first.to_datetime64()
+
+    # Centering limits cancellation errors in the sums of squares
+    source_grid = _minute_grid(source - source.mean(), first, length)
+    reference_grid = _minute_grid(reference - reference.mean(), first, length)
+
+    # Padding lets every shift be a plain slice of the reference
+    pad = int(max(abs(offset) for offset in candidates) * 60)
+    reference_grid = np.concatenate(
+        [np.full(pad, np.nan), reference_grid, np.full(pad, np.nan)]
+    )
+    window = np.arange(length) // (window_days * 1440)
+    n_windows = int(window[-1]) + 1
+    source_valid = ~np.isnan(source_grid)
+
+    scores = np.full((n_windows, len(candidates)), np.nan)
+    overlaps = np.zeros((n_windows, len(candidates)))
+    for j, offset in enumerate(candidates):
+        # The source minute t is compared with the reference minute t + offset
+        shift = pad + int(round(offset * 60))
+        shifted = reference_grid[shift : shift + length]
+        valid = source_valid & ~np.isnan(shifted)
+        codes, x, y = window[valid], source_grid[valid], shifted[valid]
+
+        def total(weights=None):
+            return np.bincount(codes, weights=weights, minlength=n_windows)
+
+        n = total()
+        sx, sy = total(x), total(y)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            covariance = total(x * y) - sx * sy / n
+            variance_x = total(x * x) - sx * sx / n
+            variance_y = total(y * y) - sy * sy / n
+            scores[:, j] = covariance / np.sqrt(variance_x * variance_y)
+        overlaps[:, j] = n
+
+    # Best and runner-up candidates of every window
+    ranked = np.sort(np.nan_to_num(scores, nan=-np.inf), axis=1)
+    best = np.argmax(np.nan_to_num(scores, nan=-np.inf), axis=1)
+    # Windows without any score give -inf - -inf (NaN), they aren't conclusive anyway
+    with np.errstate(invalid="ignore"):
+        margins = ranked[:, -1] - ranked[:, -2]
+    conclusive = (
+        (overlaps[np.arange(n_windows), best] >= min_overlap)
+        & np.isfinite(ranked[:, -1])
+        & (margins >= min_margin)
+    )
+
+    offsets = np.where(
+        conclusive, np.asarray(candidates, dtype="float64")[best], np.nan
+    )
+    starts = pd.to_datetime(first) + pd.to_timedelta(
+        np.arange(n_windows) * window_days, unit="D"
+    )
+    return pd.Series(offsets, index=starts, name="offset").ffill().bfill().fillna(0)
+
+
+def apply_offsets(timestamps: pd.Series, offsets: pd.Series) -> pd.Series:
+    """Adds to every timestamp the offset (in hours) of the window it belongs to.
+
+    Args:
+        timestamps (pd.Series): The timestamps to shift.
+        offsets (pd.Series): The offsets returned by estimate_offsets.
+
+    Returns:
+        pd.Series: The shifted timestamps.
+    """
+    position = np.searchsorted(offsets.index.values, timestamps.to_numpy(), "right")
+    position = np.clip(position - 1, 0, len(offsets) - 1)
+    hours = offsets.to_numpy()[position]
+    return timestamps + pd.to_timedelta(hours, unit="h").to_numpy()
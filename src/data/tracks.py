@@ -0,0 +1,230 @@
+import numpy as np
+import pandas as pd
+
+import json
+import os
+import shutil
+
+from activity_store import replace_folder
+from grid import grid_keys
+
+# Coordinate columns of the activity records (degrees)
+LAT, LON = "position_lat", "position_long"
+
+# Coordinates are stored as integer micro-degrees (about 0.1 m)
+COORDINATE_SCALE = 1e6
+
+# Deltas between consecutive points must fit in an int16, larger jumps start a keyframe
+MAX_DELTA = np.iinfo("int16").max
+
+# Tolerances (in meters) of the simplified polylines, finest first
+TRACK_TOLERANCES = [5, 20, 100]
+
+# Side of the cells of the spatial index, in degrees (about 500 m of latitude)
+GRID_CELL_SIZE = 0.005
+
+# Approximate meters per degree, for the local projection of a track
+METERS_PER_DEGREE = 111320.0
+
+
+def cell_keys(lat: np.ndarray, lon: np.ndarray, cell_size: float = GRID_CELL_SIZE):
+    """Returns the grid cell key of every point.
+
+    Keys are ordered by latitude row, then longitude column (see grid.grid_keys).
+
+    Args:
+        lat (np.ndarray): The latitudes, in degrees.
+        lon (np.ndarray): The longitudes, in degrees.
+        cell_size (float): The side of a cell, in degrees. Default is GRID_CELL_SIZE.
+
+    Returns:
+        np.ndarray: The int64 cell keys.
+    """
+    rows = np.floor(np.asarray(lat) / cell_size)
+    columns = np.floor(np.asarray(lon) / cell_size)
+    return grid_keys(rows, columns)
+
+
+def encode_deltas(coordinates: np.ndarray, starts: np.ndarray) -> tuple:
+    """Delta-encodes the quantized coordinates of consecutive tracks.
+
+    Every point is stored as its int16 difference with the previous point. The
+    first point of a track, and any point too far from the previous one to fit
+    in an int16 (GPS jumps), is a keyframe: its delta is 0 and its absolute value
+    is stored apart.
+
+    Args:
+        coordinates (np.ndarray): A (points, 2) array of latitudes and longitudes, in degrees.
+        starts (np.ndarray): The first row of every track.
+
+    Returns:
+        tuple: The (points, 2) int16 deltas, the rows of the keyframes (int64) and
+            their (keyframes, 2) int32 values in micro-degrees.
+    """
+    quantized = np.round(coordinates * COORDINATE_SCALE).astype("int64")
+    deltas = np.diff(quantized, axis=0, prepend=quantized[:1])
+    keyframe = np.abs(deltas).max(axis=1) > MAX_DELTA
+    keyframe[starts] = True
+    deltas[keyframe] = 0
+    keyframe_rows = np.flatnonzero(keyframe)
+    return (
+        deltas.astype("int16"),
+        keyframe_rows.astype("int64"),
+        quantized[keyframe_rows].astype("int32"),
+    )
+
+
+def simplify(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """Returns the points kept by the Ramer-Douglas-Peucker simplification of a polyline.
+
+    Args:
+        x (np.ndarray): The x coordinates, in meters.
+        y (np.ndarray): The y coordinates, in meters.
+        tolerance (float): The largest distance between the polyline and its
+            simplification, in meters.
+
+    Returns:
+        np.ndarray: A boolean mask of the points kept (the first and last ones always are).
+    """
+    keep = np.zeros(len(x), dtype=bool)
+    if not len(x):
+        return keep
+    keep[[0, -1]] = True
+
+    # Segments are split on an explicit stack (no recursion limit on long runs)
+    stack = [(0, len(x) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        px, py = x[first + 1 : last] - x[first], y[first + 1 : last] - y[first]
+        length = np.hypot(dx, dy)
+        if length > 0:
+            distances = np.abs(px * dy - py * dx) / length
+        else:
+            distances = np.hypot(px, py)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack += [(first, middle), (middle, last)]
+    return keep
+
+
+def _project(coordinates: np.ndarray) -> tuple:
+    """Returns the local x and y coordinates (in meters) of a track."""
+    lat, lon = coordinates[:, 0], coordinates[:, 1]
+    x = lon * METERS_PER_DEGREE * np.cos(np.radians(lat.mean()))
+    return x, lat * METERS_PER_DEGREE
+
+
+def write_track_store(
+    records: pd.DataFrame,
+    folder: str,
+    key: str = "activity_id",
+    tolerances: list = TRACK_TOLERANCES,
+    cell_size: float = GRID_CELL_SIZE,
+) -> pd.DataFrame:
+    """Persists the GPS tracks of the activities, with simplified polylines and a grid index.
+
+    The points of every activity form a contiguous block of delta-encoded int16
+    pairs (see encode_deltas), 4 bytes per point instead of 16 for the float64
+    columns. Each tolerance gets its own float32 array of simplified polylines,
+    also in contiguous blocks, for the maps. The grid index lists the distinct
+    (cell, activity) pairs sorted by cell, so the activities passing through an
+    area are found with a binary search per latitude row of the area.
+    "index.pkl" maps every activity to the [start, stop) range of its blocks.
+    The store is written next to `folder` and swapped in once complete (see
+    activity_store.replace_folder), so the dashboard never maps a partial store.
+
+    Args:
+        records (pd.DataFrame): The activity records, with the key, "timestamp",
+            "position_lat" and "position_long" columns. Records without position are skipped.
+        folder (str): The directory to write the store to (created if needed).
+        key (str): The column identifying the activity. Default is "activity_id".
+        tolerances (list): The tolerances of the simplified polylines, in meters. Default is TRACK_TOLERANCES.
+        cell_size (float): The side of the grid cells, in degrees. Default is GRID_CELL_SIZE.
+
+    Returns:
+        pd.DataFrame: The offset index, indexed by activity with "start" and "stop"
+            columns and a "<tolerance>m_start" and "<tolerance>m_stop" column per tolerance.
+    """
+    building = folder.rstrip("/\\") + ".building"
+    if os.path.exists(building):
+        shutil.rmtree(building)
+    os.makedirs(building)
+
+    records = records[[key, "timestamp", LAT, LON]].dropna(subset=[LAT, LON])
+    records = records.sort_values([key, "timestamp"], kind="mergesort")
+    coordinates = records[[LAT, LON]].to_numpy(dtype="float64")
+
+    # Finding the block boundaries
+    keys = records[key].to_numpy()
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.concatenate([[0], boundaries]).astype("int64")
+    stops = np.concatenate([boundaries, [len(records)]]).astype("int64")
+    if records.empty:
+        starts, stops = starts[:0], stops[:0]
+    index = pd.DataFrame(
+        {"start": starts, "stop": stops}, index=pd.Index(keys[starts], name=key)
+    )
+
+    # Full resolution points
+    if records.empty:
+        deltas = np.empty((0, 2), dtype="int16")
+        keyframe_rows = np.empty(0, dtype="int64")
+        keyframe_values = np.empty((0, 2), dtype="int32")
+    else:
+        deltas, keyframe_rows, keyframe_values = encode_deltas(coordinates, starts)
+    np.save(os.path.join(building, "deltas.npy"), deltas)
+    np.save(os.path.join(building, "keyframe_rows.npy"), keyframe_rows)
+    np.save(os.path.join(building, "keyframe_values.npy"), keyframe_values)
+
+    # Simplified polylines, one array per tolerance
+    for tolerance in tolerances:
+        polylines = []
+        for start, stop in zip(starts, stops):
+            track = coordinates[start:stop]
+            polylines.append(track[simplify(*_project(track), tolerance)])
+        lengths = np.array([len(polyline) for polyline in polylines], dtype="int64")
+        index[f"{tolerance}m_stop"] = np.cumsum(lengths)
+        index[f"{tolerance}m_start"] = index[f"{tolerance}m_stop"] - lengths
+        np.save(
+            os.path.join(building, f"simplified_{tolerance}m.npy"),
+            (
+                np.concatenate(polylines).astype("float32")
+                if polylines
+                else np.empty((0, 2), dtype="float32")
+            ),
+        )
+
+    # Grid index: distinct (cell, activity) pairs, sorted by cell
+    grid = pd.DataFrame(
+        {
+            "cell": cell_keys(coordinates[:, 0], coordinates[:, 1], cell_size),
+            "activity": np.repeat(np.arange(len(index)), stops - starts),
+        }
+    )
+    grid = grid.drop_duplicates().sort_values(["cell", "activity"])
+    np.save(os.path.join(building, "grid_cells.npy"), grid["cell"].to_numpy("int64"))
+    np.save(
+        os.path.join(building, "grid_activities.npy"),
+        grid["activity"].to_numpy("int32"),
+    )
+
+    # Saving the offset index and the parameters
+    index.to_pickle(os.path.join(building, "index.pkl"))
+    with open(os.path.join(building, "tracks.json"), "w") as f:
+        json.dump(
+            {
+                "key": key,
+                "coordinate_scale": COORDINATE_SCALE,
+                "tolerances": list(tolerances),
+                "cell_size": cell_size,
+            },
+            f,
+        )
+
+    replace_folder(building, folder)
+    return index
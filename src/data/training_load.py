@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from cleaning import DURATION_COLUMNS
+
+# Daily metrics followed by default
+METRICS = ["running_distance", "intensity_time", "resting_hr", "stress_avg"]
+
+# Names of the metrics in the daily table before transform_data.py renames its columns
+SOURCE_COLUMNS = {"resting_hr": "rhr"}
+
+
+def _metric_columns(df_days: pd.DataFrame, metrics: list) -> list:
+    """Returns the column of every metric, under its name or its name before renaming."""
+    return [
+        SOURCE_COLUMNS.get(col, col)
+        if col not in df_days.columns and SOURCE_COLUMNS.get(col) in df_days.columns
+        else col
+        for col in metrics
+    ]
+
+
+def _daily_values(df_days: pd.DataFrame, metrics: list) -> pd.DataFrame:
+    """Returns the metrics as floats on a gapless daily index (durations in minutes)."""
+    days = pd.date_range(df_days.index.min(), df_days.index.max(), freq="D", name="day")
+    df = df_days[_metric_columns(df_days, metrics)].reindex(days)
+    df.columns = metrics
+    for col in metrics:
+        # Durations are stored in seconds (timedeltas in tables processed before)
+        if pd.api.types.is_timedelta64_dtype(df[col]):
+            df[col] = df[col].dt.total_seconds() / 60
+        elif col in DURATION_COLUMNS:
+            df[col] = df[col] / 60
+    return df.astype("float64")
+
+
+def training_load_columns(metrics: list, acute: int = 7, chronic: int = 28) -> list:
+    """Returns the columns produced by compute_training_load."""
+    return [
+        f"{col}_{suffix}"
+        for col in metrics
+        for suffix in [f"{acute}d", f"{chronic}d", "acwr"]
+    ]
+
+
+def compute_training_load(
+    df_days: pd.DataFrame, metrics: list = METRICS, acute: int = 7, chronic: int = 28
+) -> pd.DataFrame:
+    """Returns the rolling acute/chronic averages and their ratio for every metric.
+
+    All metrics and windows are computed in one vectorized pass: a window mean is the
+    difference of two prefix sums divided by the difference of two prefix counts, so
+    missing days are skipped rather than counted as zeros.
+
+    Args:
+        df_days (pd.DataFrame): The daily dataframe, indexed by day, with the metrics
+            under their name or their name before renaming (see SOURCE_COLUMNS).
+        metrics (list): The metrics to follow. Default is METRICS.
+        acute (int): The acute window, in days. Default is 7.
+        chronic (int): The chronic window, in days. Default is 28.
+
+    Returns:
+        pd.DataFrame: A dataframe indexed by day with, for each metric, its "<metric>_7d"
+            and "<metric>_28d" rolling means and its "<metric>_acwr" acute:chronic ratio.
+    """
+    df = _daily_values(df_days, metrics)
+    values = df.to_numpy()
+    valid = ~np.isnan(values)
+
+    # Prefix sums with a leading zero row: window [i - w + 1, i] is rows [i - w + 1, i + 1)
+    sums = np.vstack([np.zeros(len(metrics)), np.cumsum(np.where(valid, values, 0), 0)])
+    counts = np.vstack([np.zeros(len(metrics)), np.cumsum(valid, 0)])
+    ends = np.arange(1, len(df) + 1)
+
+    means = {}
+    for window in [acute, chronic]:
+        starts = np.maximum(ends - window, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[window] = (sums[ends] - sums[starts]) / (
+                counts[ends] - counts[starts]
+            )
+
+    result = {}
+    for i, col in enumerate(metrics):
+        result[f"{col}_{acute}d"] = means[acute][:, i]
+        result[f"{col}_{chronic}d"] = means[chronic][:, i]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[f"{col}_acwr"] = means[acute][:, i] / means[chronic][:, i]
+
+    result = pd.DataFrame(result, index=df.index)
+    # Ratios over a zero chronic load are undefined
+    return result.replace([np.inf, -np.inf], np.nan)
+
+
+def update_training_load(
+    previous: pd.DataFrame,
+    df_days: pd.DataFrame,
+    metrics: list = METRICS,
+    acute: int = 7,
+    chronic: int = 28,
+) -> pd.DataFrame:
+    """Extends a previously computed training load table with the new days only.
+
+    The last stored day and the new days are recomputed from the `chronic - 1` days
+    preceding them, so a refresh costs O(new days) instead of O(history). Earlier rows
+    are kept as they are: delete the persisted table to force a full recomputation.
+
+    Args:
+        previous (pd.DataFrame): The table returned by a previous run (or None).
+        df_days (pd.DataFrame): The daily dataframe, indexed by day.
+        metrics (list): The metrics to follow. Default is METRICS.
+        acute (int): The acute window, in days. Default is 7.
+        chronic (int): The chronic window, in days. Default is 28.
+
+    Returns:
+        pd.DataFrame: The training load table for the whole history.
+    """
+    if (
+        previous is None
+        or previous.empty
+        or list(previous.columns) != training_load_columns(metrics, acute, chronic)
+        or previous.index.min() != df_days.index.min()
+    ):
+        return compute_training_load(df_days, metrics, acute, chronic)
+
+    # Recomputing from the last stored day, with enough history for the chronic window
+    first_day = previous.index.max()
+    context = df_days[df_days.index >= first_day - pd.Timedelta(days=chronic - 1)]
+    recent = compute_training_load(context, metrics, acute, chronic)
+    recent = recent[recent.index >= first_day]
+
+    return pd.concat([previous[previous.index < first_day], recent])
@@ -11,6 +11,34 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 import os
+import shutil
+
+from activity_metrics import METRIC_COLUMNS, update_activity_metrics
+from activity_store import replace_folder, write_activity_store
+from best_efforts import BEST_EFFORT_DISTANCES, personal_records
+from calendar_dim import build_calendar
+from compact import (
+    compact_daily,
+    compact_measurements,
+    compact_monitoring,
+    memory_footprint,
+)
+from hr_zones import activity_zones, daily_zones, zone_bounds
+from minute_store import update_minute_store
+from monitoring import read_partitions, transform_monitoring
+from settings import (
+    COMPACT_DTYPES,
+    MAX_HR,
+    SPILL_FOLDER,
+    WAREHOUSE,
+    WAREHOUSE_PATH,
+    WORKERS,
+)
+from sleep_windows import build_nightly_windows_by_partition
+from spilling import SpillingStore
+from tracks import write_track_store
+from training_load import update_training_load
+from warehouse import write_warehouse
 
 # -----------------------------------------------------------------------------
 # Importing Data
@@ -20,84 +48,82 @@ print("\n_____Importing the data_____")
 # Set the directory containing the clean table files
 folder_path = "../../data/interim/"
 
-# Get the file paths of all pickle files in the directory
-pickle_files = [f for f in os.listdir(folder_path) if f.endswith(".pkl")]
+# run_pipeline.py hands the clean tables over in memory instead of the pickle files
+dataframes = globals().get("preloaded_tables")
 
-# Create a dictionary to store the dataframes
-dataframes = {}
+if dataframes is None:
+    # Get the file paths of all pickle files in the directory
+    pickle_files = [f for f in os.listdir(folder_path) if f.endswith(".pkl")]
 
-# Iterate over the file paths
-for file in pickle_files:
-    # Construct the full file path
-    file_path = os.path.join(folder_path, file)
+    # Create a dictionary to store the dataframes (tables beyond the memory budget
+    # set by HEALTH_TRACKER_MEMORY_BUDGET_MB are spilled to disk)
+    dataframes = SpillingStore(folder=os.path.join(SPILL_FOLDER, "transform"))
 
-    # Load the dataframe from the file
-    df = pd.read_pickle(file_path)
+    # Iterate over the file paths
+    for file in pickle_files:
+        # Construct the full file path
+        file_path = os.path.join(folder_path, file)
 
-    # Add the dataframe to the dictionary using the file name as the key
-    dataframes[os.path.splitext(file)[0]] = df
-    print(f"{file} imported")
+        # Load the dataframe from the file
+        df = pd.read_pickle(file_path)
+
+        # Add the dataframe to the dictionary using the file name as the key
+        dataframes[os.path.splitext(file)[0]] = df
+        print(f"{file} imported")
+
+    # The store only frees or spills the tables nothing else refers to
+    del df
 
 
 # -----------------------------------------------------------------------------
 # Renaming dataframes
 # -----------------------------------------------------------------------------
 
-# Monitoring data recorded every few minutes (stress, heart rate and respiratory rate)
-df_garmin_monitoring_stress = dataframes["garmin.db_stress"]
-df_garmin_monitoring_hr = dataframes["garmin_monitoring.db_monitoring_hr"]
-df_garmin_monitoring_rr = dataframes["garmin_monitoring.db_monitoring_rr"]
-df_garmin_monitoring_intensity = dataframes["garmin_summary.db_intensity_hr"]
-
-# Daily data
-df_garmin_daily_summary = dataframes["garmin.db_daily_summary"]
-df_garmin_daily_sleep = dataframes["garmin.db_sleep"]
+# Tables are popped from the store where they are used and deleted after their last
+# use: a table still referenced by a variable can't be freed or spilled. The
+# intensity ("garmin_summary.db_intensity_hr") and the weekly, monthly and yearly
+# summaries ("garmin_summary.db_<period>_summary") aren't used.
 
-# Summary data
-df_garmin_days_summary = dataframes["garmin_summary.db_days_summary"]
-df_garmin_weeks_summary = dataframes["garmin_summary.db_weeks_summary"]
-df_garmin_months_summary = dataframes["garmin_summary.db_months_summary"]
-df_garmin_years_summary = dataframes["garmin_summary.db_years_summary"]
+# Monitoring data recorded every few minutes (stress, heart rate and respiratory rate)
+df_garmin_monitoring_stress = dataframes.pop("garmin.db_stress")
+df_garmin_monitoring_hr = dataframes.pop("garmin_monitoring.db_monitoring_hr")
+df_garmin_monitoring_rr = dataframes.pop("garmin_monitoring.db_monitoring_rr")
 
 # Activity data (based on a recorded activity)
-df_garmin_activities = dataframes["garmin_activities.db_activities"]
-df_garmin_activity_laps = dataframes["garmin_activities.db_activity_laps"]
-df_garmin_activity_records = dataframes["garmin_activities.db_activity_records"]
-df_garmin_activity_steps = dataframes["garmin_activities.db_steps_activities"]
+df_garmin_activities = dataframes.pop("garmin_activities.db_activities")
 
 
 # -----------------------------------------------------------------------------
-# Merging monitoring dataframes into a single dataframe
+# Merging monitoring dataframes month by month
 # -----------------------------------------------------------------------------
-print("\n_____Merging monitoring data into a single table_____")
+print("\n_____Merging monitoring data month by month_____")
 
-# Find the start and end timestamps
-start_timestamp = min(
-    df_garmin_monitoring_stress["timestamp"].min(),
-    df_garmin_monitoring_hr["timestamp"].min(),
-    df_garmin_monitoring_rr["timestamp"].min(),
-)
-end_timestamp = max(
-    df_garmin_monitoring_stress["timestamp"].max(),
-    df_garmin_monitoring_hr["timestamp"].max(),
-    df_garmin_monitoring_rr["timestamp"].max(),
-)
-
-# Create a new dataframe with a timestamp column ranging from the start to the end timestamp, with one minute intervals
-df_garmin_monitoring = pd.DataFrame(
-    {"timestamp": pd.date_range(start_timestamp, end_timestamp, freq="min")}
+# The monitoring table is built month by month: the sources are merged on a one
+# minute grid, values are injected via linear interpolation (stress -1/-2 codes
+# giving the 'in_activity' column), activity ids are added and the daily coverage
+# is computed. Months carry the values they need from their neighbours, so they
+# are processed by HEALTH_TRACKER_WORKERS processes. The months are never
+# concatenated: the steps below go through them one at a time, and they are
+# spilled to disk beyond the memory budget. With HEALTH_TRACKER_COMPACT_DTYPES,
+# the measurements are float32 from the start (the schema changes are only
+# applied before the export).
+monitoring_partitions, df_garmin_coverage = transform_monitoring(
+    [df_garmin_monitoring_stress, df_garmin_monitoring_hr, df_garmin_monitoring_rr],
+    df_garmin_activities,
+    workers=WORKERS,
+    store=SpillingStore(folder=os.path.join(SPILL_FOLDER, "monitoring")),
+    finish=compact_measurements if COMPACT_DTYPES else None,
 )
+del df_garmin_monitoring_stress, df_garmin_monitoring_hr, df_garmin_monitoring_rr
 
-# Merge the dataframes
-df_garmin_monitoring = df_garmin_monitoring.merge(
-    df_garmin_monitoring_stress, on="timestamp", how="left"
-)
-df_garmin_monitoring = df_garmin_monitoring.merge(
-    df_garmin_monitoring_hr, on="timestamp", how="left"
-)
-df_garmin_monitoring = df_garmin_monitoring.merge(
-    df_garmin_monitoring_rr, on="timestamp", how="left"
-)
+# print number of injected values (from the daily coverage)
+for col, name in [
+    ("stress", "stress"),
+    ("heart_rate", "heart_rate"),
+    ("rr", "respiration_rate"),
+]:
+    injected_count = df_garmin_coverage[f"{name}_minutes_injected"].sum()
+    print(f'Number of injected values in "{col}": {injected_count}')
 
 # Printing info
 print("monitoring data merged.")
@@ -107,6 +133,13 @@ print("monitoring data merged.")
 # -----------------------------------------------------------------------------
 print("\n_____Merging daily data into a single table_____")
 
+# Daily data
+df_garmin_daily_summary = dataframes.pop("garmin.db_daily_summary")
+df_garmin_daily_sleep = dataframes.pop("garmin.db_sleep")
+
+# Summary data
+df_garmin_days_summary = dataframes.pop("garmin_summary.db_days_summary")
+
 # Removing columns (done after performing some explorations)
 df_garmin_daily_summary.drop(
     ["intensity_time_goal", "calories_bmr", "calories_active"], axis=1, inplace=True
@@ -173,6 +206,7 @@ df_garmin_days = df_garmin_days.merge(
     how="left",
     suffixes=("_duplicate_left", "_duplicate_right"),
 )
+del df_garmin_daily_summary, df_garmin_days_summary, df_garmin_daily_sleep
 
 
 # Get list of all column names
@@ -205,6 +239,13 @@ print("\n_____Filter activities dataframe to running only_____")
 df_garmin_running = df_garmin_activities[df_garmin_activities["sport"] == "running"]
 df_garmin_running.drop(["avg_rr", "max_rr"], axis=1, inplace=True)
 
+df_garmin_activity_laps = dataframes.pop("garmin_activities.db_activity_laps")
+df_garmin_activity_records = dataframes.pop("garmin_activities.db_activity_records")
+df_garmin_activity_steps = dataframes.pop("garmin_activities.db_steps_activities")
+
+# The unused tables are dropped from the store (and their spill files deleted)
+dataframes.clear()
+
 m = df_garmin_activity_laps["activity_id"].isin(df_garmin_running["activity_id"])
 df_garmin_running_laps = df_garmin_activity_laps[m]
 
@@ -213,9 +254,57 @@ df_garmin_running_records = df_garmin_activity_records[m]
 
 m = df_garmin_activity_steps["activity_id"].isin(df_garmin_running["activity_id"])
 df_garmin_running_steps = df_garmin_activity_steps[m]
+del df_garmin_activity_laps, df_garmin_activity_steps
 
 print("filters applied.")
 
+# -----------------------------------------------------------------------------
+# Computing the activity metrics
+# -----------------------------------------------------------------------------
+print("\n_____Computing the activity metrics_____")
+
+# Maximum heart rate the zones are relative to, the same for the runs below and the
+# zone tables of every activity and day (HEALTH_TRACKER_MAX_HR, or the highest
+# heart rate recorded in an activity)
+max_hr = float(MAX_HR or df_garmin_activities["max_hr"].max())
+
+# Km splits, pace variability, heart rate drift, time in heart rate zones and
+# cadence of every run. Runs are cached by activity_id and content hash, so only
+# the new or changed runs are computed.
+df_garmin_running_metrics, df_garmin_running_splits = update_activity_metrics(
+    "../../data/processed/activity_metrics/",
+    df_garmin_running,
+    df_garmin_running_records,
+    df_garmin_running_steps,
+    max_hr=max_hr,
+)
+df_garmin_running = df_garmin_running.join(
+    df_garmin_running_metrics[METRIC_COLUMNS], on="activity_id"
+)
+
+# Fastest 1 km, 5 km, 10 km and half marathon across all runs (from the cached
+# best efforts of every run)
+df_garmin_personal_records = personal_records(df_garmin_running)
+
+print("activity metrics computed.")
+
+# -----------------------------------------------------------------------------
+# Computing the heart rate zones
+# -----------------------------------------------------------------------------
+print("\n_____Computing the heart rate zones_____")
+
+# Time in zone and TRIMP load of every activity (from its records, in a single
+# batch) and of every day (from the monitoring minutes, month by month: months
+# hold whole days)
+hr_bounds = zone_bounds(max_hr)
+df_garmin_activity_zones = activity_zones(df_garmin_activity_records, hr_bounds)
+df_garmin_day_zones = pd.concat(
+    [daily_zones(df, hr_bounds) for _, df in monitoring_partitions.stream()]
+)
+del df_garmin_activity_records
+
+print("heart rate zones computed.")
+
 # -----------------------------------------------------------------------------
 # Shifting night data to the previous day
 # -----------------------------------------------------------------------------
@@ -238,57 +327,26 @@ print("night data shifted.")
 
 
 # -----------------------------------------------------------------------------
-# Using HH:MM:SS format for sleeping and waking times
+# Using seconds from midnight for sleeping and waking times
 # -----------------------------------------------------------------------------
 print("\n_____Converting start and end sleeping time_____")
 
-from datetime import datetime
-
-default_time = datetime.strptime("00:00:00", "%H:%M:%S").time()
-df_garmin_days["sleep_start_time"] = df_garmin_days["start"].dt.time.where(
-    df_garmin_days["start"].notna(), default_time
-)
-df_garmin_days["sleep_end_time"] = df_garmin_days["end"].dt.time.where(
-    df_garmin_days["end"].notna(), default_time
-)
-
-
-df_garmin_days["sleep_start_timedelta"] = df_garmin_days["sleep_start_time"].apply(
-    lambda x: pd.to_timedelta(x.strftime("%H:%M:%S"))
-)
-df_garmin_days["sleep_end_timedelta"] = df_garmin_days["sleep_end_time"].apply(
-    lambda x: pd.to_timedelta(x.strftime("%H:%M:%S"))
-)
-
-df_garmin_days["sleep_start_timedelta_seconds"] = df_garmin_days[
-    "sleep_start_timedelta"
-].dt.total_seconds()
-df_garmin_days["sleep_start_timedelta_seconds"] = df_garmin_days.apply(
-    lambda row: row["sleep_start_timedelta_seconds"] - 86400
-    if row["sleep_start_timedelta_seconds"] > 43200
-    else row["sleep_start_timedelta_seconds"],
-    axis=1,
-)
-
-df_garmin_days["sleep_end_timedelta_seconds"] = df_garmin_days[
-    "sleep_end_timedelta"
-].dt.total_seconds()
-df_garmin_days["sleep_end_timedelta_seconds"] = df_garmin_days.apply(
-    lambda row: row["sleep_end_timedelta_seconds"] - 86400
-    if row["sleep_end_timedelta_seconds"] > 43200
-    else row["sleep_end_timedelta_seconds"],
-    axis=1,
-)
+# Whole seconds since midnight (0 when missing), the times after noon are counted
+# negatively from the next midnight so that averages around midnight make sense
+for column, seconds_column in [
+    ("start", "sleep_start_timedelta_seconds"),
+    ("end", "sleep_end_timedelta_seconds"),
+]:
+    times = df_garmin_days[column]
+    seconds = (times.dt.floor("s") - times.dt.normalize()).dt.total_seconds()
+    seconds = seconds.fillna(0)
+    df_garmin_days[seconds_column] = seconds.where(seconds <= 43200, seconds - 86400)
 
 df_garmin_days["start_sleep"] = df_garmin_days["start"]
 df_garmin_days["end_sleep"] = df_garmin_days["end"]
 
 del df_garmin_days["start"]
 del df_garmin_days["end"]
-del df_garmin_days["sleep_start_time"]
-del df_garmin_days["sleep_end_time"]
-del df_garmin_days["sleep_start_timedelta"]
-del df_garmin_days["sleep_end_timedelta"]
 
 print("data converted.")
 
@@ -296,92 +354,26 @@ df_garmin_days.info()
 
 
 # -----------------------------------------------------------------------------
-# Adding datetime columns to monitoring dataframe
+# Building the calendar dimension for the monitoring dataframe
 # -----------------------------------------------------------------------------
-print("\n_____Adding datetime columns_____")
+print("\n_____Building the calendar table_____")
 
-# Add new columns for the year, month, day of the week, and week of the year
-df_garmin_monitoring["year"] = df_garmin_monitoring["timestamp"].dt.year
-df_garmin_monitoring["month"] = df_garmin_monitoring["timestamp"].dt.month
-df_garmin_monitoring["day"] = df_garmin_monitoring["timestamp"].dt.day
-df_garmin_monitoring["day_of_week"] = df_garmin_monitoring["timestamp"].dt.weekday
-df_garmin_monitoring["week_of_year"] = (
-    df_garmin_monitoring["timestamp"].dt.isocalendar().week
+# Year, month, day, day of the week and week of the year only change once per day:
+# they live in a calendar table keyed by day number (days since 1970-01-01) instead
+# of being repeated on every minute of the monitoring table
+df_garmin_calendar = build_calendar(
+    df_garmin_coverage.index.min(), df_garmin_coverage.index.max()
 )
 
 # Printing info
-print("Datetime Columns added to monitoring table.")
+print(f"Calendar table built ({len(df_garmin_calendar)} days).")
 
 # -----------------------------------------------------------------------------
 # Re-indexing dataframes
 # -----------------------------------------------------------------------------
 
-df_garmin_monitoring = df_garmin_monitoring.set_index("timestamp")
 df_garmin_days = df_garmin_days.set_index("day")
 
-# -----------------------------------------------------------------------------
-# Inject values to monitoring dataframe using linear interpolation
-# -----------------------------------------------------------------------------
-print("\n_____Injecting values via linear interpolation_____")
-
-# create the 'in_activity' column based on stress -1 (non recorded) and -2 (recorded) data
-df_garmin_monitoring["in_activity"] = df_garmin_monitoring["stress"].apply(
-    lambda x: 2 if x == -2 else (1 if x == -1 else 0)
-)
-
-# list of columns you want to interpolate
-columns = ["stress", "heart_rate", "rr"]
-
-# iterate over columns
-for col in columns:
-    # get boolean mask for original null values
-    null_mask = df_garmin_monitoring[col].isnull()
-
-    # interpolate values using limit parameter
-    interpolated_values = df_garmin_monitoring[col].interpolate(
-        method="linear", limit=4, limit_direction="both"
-    )
-
-    # update original column with interpolated values
-    df_garmin_monitoring[col] = interpolated_values
-
-    # create new column with injected values mask
-    df_garmin_monitoring[f"{col}_injected"] = null_mask & ~interpolated_values.isnull()
-
-    # print number of injected values
-    injected_count = (null_mask & ~interpolated_values.isnull()).sum()
-    print(f'Number of injected values in "{col}": {injected_count}')
-
-
-# replace all negative values in stress column with NaN
-df_garmin_monitoring["stress"] = df_garmin_monitoring["stress"].apply(
-    lambda x: np.nan if x < 0 else x
-)
-
-# State injected = false if values in stress column is NaN
-df_garmin_monitoring.loc[
-    df_garmin_monitoring["stress"].isnull(), "stress_injected"
-] = False
-
-
-# -----------------------------------------------------------------------------
-# Adding activity ids info to monitoring dataframe
-# -----------------------------------------------------------------------------
-print("\n_____Adding activity ids info to monitoring tables_____")
-
-for _, activity in df_garmin_activities.iterrows():
-    start_time = activity["start_time"]
-    stop_time = activity["stop_time"]
-    activity_id = activity["activity_id"]
-
-    # Select rows in df_garmin_monitoring that fall within start and stop times for activity
-    mask = (df_garmin_monitoring.index >= start_time) & (
-        df_garmin_monitoring.index <= stop_time
-    )
-    df_garmin_monitoring.loc[mask, "activity_id"] = activity_id
-
-print("Activity ids added.")
-
 # -----------------------------------------------------------------------------
 # Adding running activities main infos to daily dataframe
 # -----------------------------------------------------------------------------
@@ -438,28 +430,19 @@ print("Running info added to daily.")
 # -----------------------------------------------------------------------------
 print("\n_____Removing data from daily for days with not enough data_____")
 print("Days removed because of less than 50% data available from monitoring table:")
-# Create a new column that indicates whether the row has NaN values
-df_garmin_monitoring["has_nan"] = (
-    df_garmin_monitoring[["stress", "heart_rate", "rr"]].isna().any(axis=1)
-)
-
-
-df_garmin_monitoring[df_garmin_monitoring["has_nan"] == True]
-
-# Group the data by day and count the number of rows that have NaN values
-nan_count_by_day = df_garmin_monitoring.groupby(df_garmin_monitoring.index.date)[
-    "has_nan"
-].sum()
+# Per-day, per-source coverage of the monitoring data (minutes observed, injected,
+# in activity and with at least one source missing) was computed with the monitoring
+# table, month by month
 
 # Identify the days where more than a certain threshold of data is missing
 threshold = 0.5
-days_with_insufficient_data = nan_count_by_day[
-    nan_count_by_day > threshold * 1440
+days_with_insufficient_data = df_garmin_coverage[
+    df_garmin_coverage["minutes_incomplete"] > threshold * 1440
 ].index  # 1440 is total minute in a day
 
 
 for date in days_with_insufficient_data:
-    print(date)
+    print(date.date())
 
 # Remove the values for the days identified
 # Keep the days but with NaN values
@@ -501,6 +484,36 @@ print(
 )
 
 
+# -----------------------------------------------------------------------------
+# Precomputing nightly sleep windows over monitoring data
+# -----------------------------------------------------------------------------
+print("\n_____Precomputing nightly sleep windows_____")
+
+# One row per night with the monitoring minute range and in-sleep aggregates,
+# so the Sleep page never has to scan the minute data (nights are resolved in the
+# month they end in, with the end of the previous month attached)
+df_garmin_nights = build_nightly_windows_by_partition(
+    df_garmin_days, (df for _, df in monitoring_partitions.stream())
+)
+
+# Adding the sleep stages reported by Garmin for the same nights
+sleep_columns = ["total_sleep", "deep_sleep", "light_sleep", "rem_sleep", "awake"]
+df_garmin_nights = df_garmin_nights.join(df_garmin_days[sleep_columns])
+df_garmin_nights["avg_rr_sleep"] = df_garmin_days["avg_rr"]
+
+for column in [
+    "hr_mean",
+    "hr_min",
+    "stress_mean",
+    "respiration_rate_mean",
+    "restlessness",
+    "avg_rr_sleep",
+]:
+    df_garmin_nights[column] = df_garmin_nights[column].round(1)
+
+print(f"{len(df_garmin_nights)} nights precomputed.")
+
+
 # -----------------------------------------------------------------------------
 # Resampling the data
 # -----------------------------------------------------------------------------
@@ -529,6 +542,25 @@ df_garmin_months["days_resampled"] = df_garmin_days.resample("M").size()
 print("data resampled.")
 
 
+# -----------------------------------------------------------------------------
+# Computing rolling training load and trends
+# -----------------------------------------------------------------------------
+print("\n_____Computing rolling training load_____")
+
+# 7-day (acute) and 28-day (chronic) rolling means and acute:chronic ratios.
+# Only the days after the previously persisted table are computed. The daily
+# columns aren't renamed yet: "rhr" is followed as "resting_hr".
+training_load_path = "../../data/processed/garmin_training_load.pkl"
+if os.path.exists(training_load_path):
+    df_garmin_training_load = pd.read_pickle(training_load_path)
+else:
+    df_garmin_training_load = None
+
+df_garmin_training_load = update_training_load(df_garmin_training_load, df_garmin_days)
+
+print("training load computed.")
+
+
 df_garmin_days.info()
 
 # -----------------------------------------------------------------------------
@@ -536,10 +568,8 @@ df_garmin_days.info()
 # -----------------------------------------------------------------------------
 print("\n_____Rounding values_____")
 
-# Rounding to one decimal
-for column in ["stress", "heart_rate"]:
-    df_garmin_monitoring[column] = df_garmin_monitoring[column].round(1)
-
+# Rounding to one decimal (the monitoring table is rounded month by month before
+# its export)
 for column in [
     "hr_min",
     "hr_max",
@@ -578,19 +608,21 @@ for column in [
     df_garmin_months[column] = df_garmin_months[column].round()
 
 
-# Rounding to sec
+# Rounding to sec (durations are stored in seconds)
 for column in [
     "moderate_activity_time",
     "vigorous_activity_time",
     "intensity_time",
-    "start_sleep",
-    "end_sleep",
     "total_sleep",
     "deep_sleep",
     "light_sleep",
     "rem_sleep",
     "awake",
 ]:
+    df_garmin_months[column] = df_garmin_months[column].round()
+    df_garmin_weeks[column] = df_garmin_weeks[column].round()
+
+for column in ["start_sleep", "end_sleep"]:
     df_garmin_months[column] = df_garmin_months[column].dt.round(freq="s")
     df_garmin_weeks[column] = df_garmin_weeks[column].dt.round(freq="s")
 
@@ -604,33 +636,30 @@ for column in [
     "hrz_4_time",
     "hrz_5_time",
 ]:
-    df_garmin_running[column] = df_garmin_running[column].dt.round(freq="s")
-    df_garmin_running_laps[column] = df_garmin_running_laps[column].dt.round(freq="s")
+    df_garmin_running[column] = df_garmin_running[column].round()
+    df_garmin_running_laps[column] = df_garmin_running_laps[column].round()
+
+for column in (
+    ["split_time_mean"]
+    + [f"zone_{zone}_time" for zone in range(1, 6)]
+    + list(BEST_EFFORT_DISTANCES)
+):
+    df_garmin_running[column] = df_garmin_running[column].round()
+for column in ["split_pace_cv", "hr_drift", "cadence_cv"]:
+    df_garmin_running[column] = df_garmin_running[column].round(3)
 
 print("Values rounded.")
 
 
 # -----------------------------------------------------------------------------
-# Convert the average seconds back to time
+# Keeping the (average) sleeping time in seconds from midnight
 # -----------------------------------------------------------------------------
 
-df_garmin_days["start_sleep_time"] = pd.to_timedelta(
-    df_garmin_days["sleep_start_timedelta_seconds"], unit="s"
-)
-del df_garmin_days["sleep_start_timedelta_seconds"]
+for df_table in [df_garmin_days, df_garmin_weeks, df_garmin_months]:
+    df_table["start_sleep_time"] = df_table.pop("sleep_start_timedelta_seconds")
 
-df_garmin_weeks["start_sleep_time"] = pd.to_timedelta(
-    df_garmin_weeks["sleep_start_timedelta_seconds"], unit="s"
-)
-del df_garmin_weeks["sleep_start_timedelta_seconds"]
 del df_garmin_weeks["start_sleep"]
 del df_garmin_weeks["end_sleep"]
-
-
-df_garmin_months["start_sleep_time"] = pd.to_timedelta(
-    df_garmin_months["sleep_start_timedelta_seconds"], unit="s"
-)
-del df_garmin_months["sleep_start_timedelta_seconds"]
 del df_garmin_months["start_sleep"]
 del df_garmin_months["end_sleep"]
 
@@ -639,12 +668,6 @@ del df_garmin_months["end_sleep"]
 # Reordering columns
 # -----------------------------------------------------------------------------
 
-#
-col = df_garmin_monitoring.pop("activity_id")
-df_garmin_monitoring.insert(9, "activity_id", col)
-del df_garmin_monitoring["has_nan"]
-
-
 #
 columns_daily = [
     "hr_min",
@@ -727,9 +750,6 @@ df_garmin_months = df_garmin_months[columns_weekly_monthly]
 # -----------------------------------------------------------------------------
 print("\n_____Renaming columns_____")
 
-column_mapping = {"rr": "respiration_rate", "rr_injected": "respiration_rate_injected"}
-df_garmin_monitoring.rename(columns=column_mapping, inplace=True)
-
 column_mapping = {
     "rhr": "resting_hr",
     "rr_injected": "respiration_rate_injected",
@@ -756,17 +776,127 @@ df_garmin_months.rename(columns=column_mapping, inplace=True)
 print("Columns renamed.")
 
 
+# -----------------------------------------------------------------------------
+# Compacting data types
+# -----------------------------------------------------------------------------
+print("\n_____Compacting data types_____")
+
+if COMPACT_DTYPES:
+    memory_before = {
+        "days": memory_footprint(df_garmin_days),
+        "weeks": memory_footprint(df_garmin_weeks),
+        "months": memory_footprint(df_garmin_months),
+    }
+
+    df_garmin_days = compact_daily(df_garmin_days)
+    df_garmin_weeks = compact_daily(df_garmin_weeks)
+    df_garmin_months = compact_daily(df_garmin_months)
+
+    memory_after = {
+        "days": memory_footprint(df_garmin_days),
+        "weeks": memory_footprint(df_garmin_weeks),
+        "months": memory_footprint(df_garmin_months),
+    }
+
+    # Printing the memory footprint before and after
+    for table in memory_before:
+        before = memory_before[table] / 1024**2
+        after = memory_after[table] / 1024**2
+        print(
+            f"{table}: {before:.1f} MB -> {after:.1f} MB ({round((1 - after / before) * 100, 1)}% saved)"
+        )
+else:
+    print("Compact data types disabled (HEALTH_TRACKER_COMPACT_DTYPES).")
+
+
+# -----------------------------------------------------------------------------
+# Finishing and exporting the monitoring table month by month
+# -----------------------------------------------------------------------------
+print("\n_____Exporting the monitoring table_____")
+
+# Every month is rounded, reordered, renamed, compacted and written on its own, to
+# one pickle per month ("garmin_monitoring/<YYYY-MM>.pkl", swapped in once all are
+# written) and to a single CSV file
+monitoring_path = "../../data/processed/garmin_monitoring"
+monitoring_building = monitoring_path + ".building"
+if os.path.exists(monitoring_building):
+    shutil.rmtree(monitoring_building)
+os.makedirs(monitoring_building)
+
+monitoring_memory_before, monitoring_memory_after = 0, 0
+for i, (month, df) in enumerate(monitoring_partitions.stream(pop=True)):
+    # Rounding to one decimal
+    for column in ["stress", "heart_rate"]:
+        df[column] = df[column].round(1)
+
+    # Reordering columns
+    col = df.pop("activity_id")
+    df.insert(df.columns.get_loc("in_activity") + 1, "activity_id", col)
+
+    # Renaming columns
+    column_mapping = {
+        "rr": "respiration_rate",
+        "rr_injected": "respiration_rate_injected",
+    }
+    df.rename(columns=column_mapping, inplace=True)
+
+    # Compacting data types
+    if COMPACT_DTYPES:
+        monitoring_memory_before += memory_footprint(df)
+        df = compact_monitoring(df)
+        monitoring_memory_after += memory_footprint(df)
+
+    df.to_pickle(os.path.join(monitoring_building, f"{month}.pkl"))
+    df.to_csv(
+        "../../data/processed/garmin_monitoring.csv",
+        mode="w" if i == 0 else "a",
+        header=i == 0,
+    )
+    monitoring_columns = list(df.columns)
+    del df
+
+replace_folder(monitoring_building, monitoring_path)
+
+# The single pickle written by earlier versions would be stale
+if os.path.exists(monitoring_path + ".pkl"):
+    os.remove(monitoring_path + ".pkl")
+
+if COMPACT_DTYPES:
+    before = monitoring_memory_before / 1024**2
+    after = monitoring_memory_after / 1024**2
+    print(
+        f"monitoring: {before:.1f} MB -> {after:.1f} MB ({round((1 - after / before) * 100, 1)}% saved)"
+    )
+print("Monitoring table exported.")
+
 # -----------------------------------------------------------------------------
 # Exporting the results
 # -----------------------------------------------------------------------------
 
-df_garmin_monitoring.to_pickle("../../data/processed/garmin_monitoring.pkl")
-df_garmin_monitoring.to_csv("../../data/processed/garmin_monitoring.csv")
+# Minute channels are also kept as memory-mapped fixed-stride arrays (O(1) time
+# range slicing with minute_store.MinuteStore, used by visualize.py). Only the days
+# whose content changed are rewritten in place, reading the months one at a time
+update_minute_store(
+    read_partitions(monitoring_path),
+    "../../data/processed/garmin_monitoring_store",
+    columns=[col for col in monitoring_columns if col != "activity_id"],
+)
+
+df_garmin_calendar.to_pickle("../../data/processed/garmin_calendar.pkl")
+df_garmin_calendar.to_csv("../../data/processed/garmin_calendar.csv")
+
+df_garmin_coverage.to_pickle("../../data/processed/garmin_coverage.pkl")
+df_garmin_coverage.to_csv("../../data/processed/garmin_coverage.csv")
+df_garmin_coverage.to_pickle("../../src/dashboard/data/garmin_coverage.pkl")
 
 df_garmin_days.to_pickle("../../data/processed/garmin_days.pkl")
 df_garmin_days.to_csv("../../data/processed/garmin_days.csv")
 df_garmin_days.to_pickle("../../src/dashboard/data/garmin_days.pkl")
 
+df_garmin_training_load.to_pickle(training_load_path)
+df_garmin_training_load.to_csv("../../data/processed/garmin_training_load.csv")
+df_garmin_training_load.to_pickle("../../src/dashboard/data/garmin_training_load.pkl")
+
 df_garmin_weeks.to_pickle("../../data/processed/garmin_weeks.pkl")
 df_garmin_weeks.to_csv("../../data/processed/garmin_weeks.csv")
 df_garmin_weeks.to_pickle("../../src/dashboard/data/garmin_weeks.pkl")
@@ -775,25 +905,82 @@ df_garmin_months.to_pickle("../../data/processed/garmin_months.pkl")
 df_garmin_months.to_csv("../../data/processed/garmin_months.csv")
 df_garmin_months.to_pickle("../../src/dashboard/data/garmin_months.pkl")
 
+df_garmin_nights.to_pickle("../../data/processed/garmin_nights.pkl")
+df_garmin_nights.to_csv("../../data/processed/garmin_nights.csv")
+df_garmin_nights.to_pickle("../../src/dashboard/data/garmin_nights.pkl")
 
-df_garmin_running
-df_garmin_running
+df_garmin_running.to_pickle("../../data/processed/garmin_running.pkl")
+df_garmin_running.to_csv("../../data/processed/garmin_running.csv")
+df_garmin_running.to_pickle("../../src/dashboard/data/garmin_running.pkl")
 
-df_garmin_running_laps
-df_garmin_running_laps
+df_garmin_running_steps.to_pickle("../../data/processed/garmin_running_steps.pkl")
+df_garmin_running_steps.to_csv("../../data/processed/garmin_running_steps.csv")
 
-df_garmin_running_records
-df_garmin_running_records
+df_garmin_running_splits.to_pickle("../../data/processed/garmin_running_splits.pkl")
+df_garmin_running_splits.to_csv("../../data/processed/garmin_running_splits.csv")
+df_garmin_running_splits.to_pickle("../../src/dashboard/data/garmin_running_splits.pkl")
 
-df_garmin_running_steps
-df_garmin_running_steps
+df_garmin_personal_records.to_pickle("../../data/processed/garmin_personal_records.pkl")
+df_garmin_personal_records.to_csv("../../data/processed/garmin_personal_records.csv")
+df_garmin_personal_records.to_pickle(
+    "../../src/dashboard/data/garmin_personal_records.pkl"
+)
+
+df_garmin_activity_zones.to_pickle("../../data/processed/garmin_activity_zones.pkl")
+df_garmin_activity_zones.to_csv("../../data/processed/garmin_activity_zones.csv")
+df_garmin_activity_zones.to_pickle("../../src/dashboard/data/garmin_activity_zones.pkl")
+
+df_garmin_day_zones.to_pickle("../../data/processed/garmin_day_zones.pkl")
+df_garmin_day_zones.to_csv("../../data/processed/garmin_day_zones.csv")
+df_garmin_day_zones.to_pickle("../../src/dashboard/data/garmin_day_zones.pkl")
+
+# Laps and records are stored as contiguous per-activity blocks with an offset index,
+# so that the dashboard can load a single run without reading every record
+for folder in ["../../data/processed/", "../../src/dashboard/data/"]:
+    write_activity_store(
+        df_garmin_running_laps,
+        os.path.join(folder, "garmin_running_laps"),
+        sort_by="start_time",
+    )
+    write_activity_store(
+        df_garmin_running_records,
+        os.path.join(folder, "garmin_running_records"),
+        sort_by="timestamp",
+    )
+    # GPS tracks, delta-encoded with simplified polylines and a grid index of the runs
+    write_track_store(
+        df_garmin_running_records, os.path.join(folder, "garmin_running_tracks")
+    )
+
+# Optional single-file SQLite warehouse, for indexed queries on the processed tables
+if WAREHOUSE:
+    tables = write_warehouse(
+        WAREHOUSE_PATH,
+        {
+            "garmin_monitoring": read_partitions(monitoring_path),
+            "garmin_calendar": df_garmin_calendar,
+            "garmin_coverage": df_garmin_coverage,
+            "garmin_days": df_garmin_days,
+            "garmin_training_load": df_garmin_training_load,
+            "garmin_weeks": df_garmin_weeks,
+            "garmin_months": df_garmin_months,
+            "garmin_nights": df_garmin_nights,
+            "garmin_running": df_garmin_running,
+            "garmin_running_steps": df_garmin_running_steps,
+            "garmin_running_splits": df_garmin_running_splits,
+            "garmin_running_laps": df_garmin_running_laps,
+            "garmin_running_records": df_garmin_running_records,
+            "garmin_activity_zones": df_garmin_activity_zones,
+            "garmin_day_zones": df_garmin_day_zones,
+        },
+    )
+    print(f"Warehouse written to {WAREHOUSE_PATH} ({len(tables)} tables).")
 
 print("Data exported.")
 
 
 # -----------------------------------------------------------------------------
 # To Do
-# - Transform df_garmin_running df
 # - Remove months with less than 10 days
 # - Remove weeks with less than 3 days
 # -----------------------------------------------------------------------------
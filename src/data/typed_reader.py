@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+import sqlite3
+
+# Rows read per batch
+BATCH_ROWS = 100000
+
+# Julian day of 1970-01-01 and milliseconds per day, to convert SQLite dates to epochs
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+MS_PER_DAY = 86400000
+
+# Missing integers (and times) are read as the smallest int64, then masked
+MISSING_INTEGER = np.iinfo("int64").min
+
+
+def column_kind(declared_type: str) -> str:
+    """Returns how a column is read from its declared SQLite type.
+
+    Args:
+        declared_type (str): The type given by PRAGMA table_info (e.g. "DATETIME", "VARCHAR(32)").
+
+    Returns:
+        str: "datetime", "duration", "integer", "float" or "text".
+    """
+    declared_type = declared_type.upper()
+    # DATETIME contains both DATE and TIME, TIME alone is a duration in garmindb
+    if "DATE" in declared_type or "TIMESTAMP" in declared_type:
+        return "datetime"
+    if "TIME" in declared_type:
+        return "duration"
+    if "INT" in declared_type or "BOOL" in declared_type:
+        return "integer"
+    if any(name in declared_type for name in ["REAL", "FLOA", "DOUB", "NUM", "DEC"]):
+        return "float"
+    return "text"
+
+
+def _select_expression(column: str, kind: str) -> str:
+    """Returns the SQL expression reading a column as a number (epoch milliseconds for times)."""
+    if kind == "datetime":
+        julian_day = f'julianday("{column}")'
+    elif kind == "duration":
+        # "HH:MM:SS.ffffff" is read as a time of 1970-01-01
+        julian_day = f"julianday('1970-01-01 ' || \"{column}\")"
+    elif kind == "integer":
+        return f'CAST("{column}" AS INTEGER)'
+    else:
+        return f'"{column}"'
+    return f"CAST(ROUND(({julian_day} - {UNIX_EPOCH_JULIAN_DAY}) * {MS_PER_DAY}) AS INTEGER)"
+
+
+def _text_expression(kind: str) -> str:
+    """Returns the SQL expression writing the value "v" of a numeric column as text.
+
+    Floats are written with 17 significant digits (they read back exactly) and
+    missing ones as "nan", missing integers as MISSING_INTEGER.
+    """
+    if kind == "float":
+        return "CASE WHEN v IS NULL THEN 'nan' ELSE printf('%!.17g', v) END"
+    return f"ifnull(v, {MISSING_INTEGER})"
+
+
+def _read_joined(
+    conn: sqlite3.Connection,
+    rows: str,
+    bounds: tuple,
+    expression: str,
+    dtype,
+    size: int,
+) -> np.ndarray:
+    """Returns an expression of the values "v" of a query, joined into a single string
+    by SQLite and parsed by NumPy."""
+    joined = conn.execute(
+        f"SELECT group_concat({expression}, ',') FROM ({rows})", bounds
+    ).fetchone()[0]
+    values = np.fromstring(joined or "", dtype=dtype, sep=",")
+    if len(values) != size:
+        raise ValueError(f"Read {len(values)} values instead of {size}: {rows}")
+    return values
+
+
+def read_table(
+    conn: sqlite3.Connection, table: str, batch_rows: int = BATCH_ROWS
+) -> pd.DataFrame:
+    """Reads a table into typed columns, without a Python object per number.
+
+    The schema (PRAGMA table_info) decides how every column is read: SQLite converts
+    dates and times to epoch milliseconds in the query, so timestamps and durations
+    arrive as integers instead of strings to parse. The table is read `batch_rows`
+    rows at a time (ranges of rowid). For a numeric column, SQLite joins the values
+    of the batch into a single comma-separated string, which NumPy parses into the
+    preallocated int64 or float64 array of the column, so no Python object is built
+    per value. Integer columns are read as int64 (float64 when they have missing
+    values), dates as datetime64[ns] and times as timedelta64[ns], like
+    pd.read_sql_query followed by pd.to_datetime and pd.to_timedelta, at
+    millisecond precision. Text columns are fetched as Python strings, the object
+    values pandas holds them as anyway.
+
+    Args:
+        conn (sqlite3.Connection): The connection to the database (of a rowid table).
+        table (str): The table to read.
+        batch_rows (int): The number of rows read per batch. Default is BATCH_ROWS.
+
+    Returns:
+        pd.DataFrame: The table, with its columns in the database order.
+    """
+    schema = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+    kinds = {row[1]: column_kind(row[2]) for row in schema}
+    numeric = [column for column, kind in kinds.items() if kind != "text"]
+    text = [column for column, kind in kinds.items() if kind == "text"]
+    expressions = {
+        column: _select_expression(column, kinds[column]) for column in numeric
+    }
+
+    # The counts and the rows are read in the same transaction
+    in_transaction = conn.in_transaction
+    if not in_transaction:
+        conn.execute("BEGIN")
+    try:
+        n_rows = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        arrays = {
+            column: np.empty(
+                n_rows, dtype="float64" if kinds[column] == "float" else "int64"
+            )
+            for column in numeric
+        }
+        strings = {column: np.empty(n_rows, dtype=object) for column in text}
+
+        # Rows are read in ranges (last_rowid, stop_rowid], found by seeking the rowid
+        last_rowid = conn.execute(f'SELECT min(rowid) - 1 FROM "{table}"').fetchone()[0]
+        rows = f'FROM "{table}" WHERE rowid > ? AND rowid <= ? ORDER BY rowid'
+        for start in range(0, n_rows, batch_rows):
+            stop = min(start + batch_rows, n_rows)
+            stop_rowid = conn.execute(
+                f'SELECT rowid FROM "{table}" WHERE rowid > ? ORDER BY rowid '
+                "LIMIT 1 OFFSET ?",
+                (last_rowid, stop - start - 1),
+            ).fetchone()[0]
+            bounds = (last_rowid, stop_rowid)
+
+            for column in numeric:
+                arrays[column][start:stop] = _read_joined(
+                    conn,
+                    f"SELECT {expressions[column]} AS v {rows}",
+                    bounds,
+                    _text_expression(kinds[column]),
+                    arrays[column].dtype,
+                    stop - start,
+                )
+            for column in text:
+                values = conn.execute(f'SELECT "{column}" {rows}', bounds).fetchall()
+                strings[column][start:stop] = [value for value, in values]
+            last_rowid = stop_rowid
+    finally:
+        if not in_transaction:
+            conn.rollback()
+
+    columns = {}
+    for column in numeric:
+        values = arrays[column]
+        if kinds[column] == "datetime":
+            values = pd.DatetimeIndex(values.astype("M8[ms]").astype("M8[ns]"))
+        elif kinds[column] == "duration":
+            values = pd.TimedeltaIndex(values.astype("m8[ms]").astype("m8[ns]"))
+        # Missing integers become NaN (float64) and missing times NaT
+        missing = arrays[column] == MISSING_INTEGER
+        if kinds[column] == "integer" and missing.any():
+            values = values.astype("float64")
+            values[missing] = np.nan
+        elif kinds[column] in ["datetime", "duration"] and missing.any():
+            values = values.where(~missing)
+        columns[column] = values
+    columns.update(strings)
+
+    return pd.DataFrame(columns)[list(kinds)]
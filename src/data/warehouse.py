@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+import os
+import sqlite3
+
+# Columns indexed in every table that has them
+INDEXED_COLUMNS = ["timestamp", "day", "activity_id"]
+
+# Monitoring aggregates materialized by write_warehouse, with the SQLite expression
+# of the period each minute belongs to. Weeks and months are labelled by their last
+# day, like the resample("W") and resample("M") of df_garmin_weeks and df_garmin_months
+AGGREGATE_PERIODS = {
+    "day": "date(timestamp)",
+    "week": "date(timestamp, 'weekday 0')",
+    "month": "date(timestamp, 'start of month', '+1 month', '-1 day')",
+}
+
+
+def _sql_column(series: pd.Series) -> pd.Series:
+    """Returns a column with a type SQLite stores natively.
+
+    Timestamps become "YYYY-MM-DD HH:MM:SS" text (dates only when every value is at
+    midnight), the format of the SQLite date functions, so that they sort and
+    compare as text. Durations
+    become seconds, categories their values and compact numbers 64-bit ones.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(series.cat.categories.dtype)
+    kind = series.dtype.kind
+    if kind == "M":
+        values = series.to_numpy(dtype="datetime64[ns]")
+        missing = np.isnat(values)
+        unit = (
+            "D"
+            if (values[~missing] == values[~missing].astype("datetime64[D]")).all()
+            else "s"
+        )
+        text = np.char.replace(np.datetime_as_string(values, unit=unit), "T", " ")
+        text = text.astype(object)
+        text[missing] = None
+        return pd.Series(text, index=series.index, name=series.name)
+    if kind == "m":
+        return series.dt.total_seconds()
+    if kind == "f":
+        return series.astype("float64")
+    if kind in "biu":
+        return series.astype("int64")
+    return series
+
+
+def _write_table(conn: sqlite3.Connection, name: str, data) -> None:
+    """Writes a dataframe, or the dataframes of an iterable one after another (their
+    named index included), as a table, and indexes it."""
+    columns = None
+    for df in [data] if isinstance(data, pd.DataFrame) else data:
+        if df.index.name is not None:
+            df = df.reset_index()
+        df = pd.DataFrame({column: _sql_column(df[column]) for column in df.columns})
+        df.to_sql(
+            name,
+            conn,
+            index=False,
+            if_exists="fail" if columns is None else "append",
+            chunksize=50000,
+        )
+        columns = df.columns
+
+    for column in INDEXED_COLUMNS:
+        if columns is not None and column in columns:
+            conn.execute(f'CREATE INDEX "idx_{name}_{column}" ON "{name}" ("{column}")')
+
+
+def _materialize_aggregates(conn: sqlite3.Connection, table: str) -> list:
+    """Creates the day, week and month aggregates of the minute monitoring table."""
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+    measures = [
+        column
+        for column in ["stress", "heart_rate", "respiration_rate"]
+        if column in columns
+    ]
+    selected = ["COUNT(*) AS minutes"]
+    for column in measures:
+        selected += [
+            f'COUNT("{column}") AS {column}_minutes',
+            f'AVG("{column}") AS {column}_mean',
+            f'MIN("{column}") AS {column}_min',
+            f'MAX("{column}") AS {column}_max',
+        ]
+    if "in_activity" in columns:
+        selected.append("SUM(in_activity) AS activity_minutes")
+
+    created = []
+    for period, expression in AGGREGATE_PERIODS.items():
+        name = f"{table}_{period}"
+        conn.execute(
+            f'CREATE TABLE "{name}" AS SELECT {expression} AS {period}, '
+            f'{", ".join(selected)} FROM "{table}" GROUP BY 1 ORDER BY 1'
+        )
+        conn.execute(
+            f'CREATE UNIQUE INDEX "idx_{name}_{period}" ON "{name}" ({period})'
+        )
+        created.append(name)
+    return created
+
+
+def write_warehouse(
+    path: str, tables: dict, monitoring_table: str = "garmin_monitoring"
+) -> list:
+    """Writes the processed tables to a single-file SQLite database.
+
+    Every table is written with its named index as a column, the timestamp, day and
+    activity_id columns are indexed, and the day, week and month aggregates of the
+    minute monitoring table are materialized, so that dashboards and ad-hoc analyses
+    can run indexed queries (see src/dashboard/warehouse.py) instead of loading whole
+    pickles. The database is built next to `path` and moved in place once complete,
+    so readers never see a partial warehouse.
+
+    Args:
+        path (str): The path of the database file (its directory is created if needed).
+        tables (dict): Table names as keys and dataframes as values. A value may also
+            be an iterable of dataframes (e.g. the monthly partitions of the minute
+            table), written one at a time.
+        monitoring_table (str): The name of the minute monitoring table whose aggregates
+            are materialized. Default is "garmin_monitoring".
+
+    Returns:
+        list: The names of the tables written.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    building = path + ".building"
+    if os.path.exists(building):
+        os.remove(building)
+
+    conn = sqlite3.connect(building)
+    try:
+        with conn:
+            for name, df in tables.items():
+                _write_table(conn, name, df)
+            written = list(tables)
+            if monitoring_table in tables:
+                written += _materialize_aggregates(conn, monitoring_table)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    os.replace(building, path)
+    return written
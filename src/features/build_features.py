@@ -4,6 +4,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from datetime import datetime
+import os
+import sys
+
+# The minute store reader lives with the ETL scripts
+sys.path.append(os.path.join("..", "data"))
+from minute_store import MinuteStore
 
 # -----------------------------------------------------------------------------
 # Importing Data
@@ -37,8 +43,15 @@ print("\n")
 # Renaming dataframes
 # -----------------------------------------------------------------------------
 
-# Monitoring data recorded every few minutes (stress, heart rate and respiratory rate)
-df_garmin_monitoring = dataframes["garmin_monitoring"]
+# Monitoring data recorded every few minutes (stress, heart rate and respiratory rate),
+# read from the memory-mapped minute store (the table is exported month by month)
+store_monitoring = MinuteStore("../../data/processed/garmin_monitoring_store")
+df_garmin_monitoring = pd.DataFrame(
+    {
+        column: store_monitoring.channels[column]
+        for column in ["stress", "heart_rate", "respiration_rate"]
+    }
+)
 
 df_garmin_monitoring_resampled = dataframes["garmin_monitoring_resampled"]
 
@@ -47,7 +60,7 @@ df_garmin_days = dataframes["garmin_days"]
 #
 # -----------------------------------------------------------------------------
 
-correlations = df_garmin_monitoring[["stress", "heart_rate", "rr"]].corr()
+correlations = df_garmin_monitoring[["stress", "heart_rate", "respiration_rate"]].corr()
 sns.heatmap(correlations, annot=True)
 
 df_garmin_days.info()
@@ -58,8 +71,8 @@ df_garmin_days.info()
 # -----------------------------------------------------------------------------
 
 
-# select the timedelta columns
-timedelta_columns = [
+# the duration columns are stored in seconds, only older tables hold timedeltas
+duration_columns = [
     "intensity_time",
     "total_sleep",
     "deep_sleep",
@@ -68,10 +81,10 @@ timedelta_columns = [
     "awake",
 ]
 
-# convert to numeric columns with total seconds
-df_garmin_days[timedelta_columns] = df_garmin_days[timedelta_columns].apply(
-    lambda x: x.dt.total_seconds()
-)
+# convert timedeltas to numeric columns with total seconds
+for col in duration_columns:
+    if pd.api.types.is_timedelta64_dtype(df_garmin_days[col]):
+        df_garmin_days[col] = df_garmin_days[col].dt.total_seconds()
 
 # Compute the correlation matrix
 corr = df_garmin_days.corr()
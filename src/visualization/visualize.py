@@ -1,9 +1,15 @@
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 
 import os
 import random
+import sys
+
+# The minute store reader lives with the ETL scripts
+sys.path.append(os.path.join("..", "data"))
+from minute_store import MinuteStore
 
 # -----------------------------------------------------------------------------
 # Importing Data
@@ -37,11 +43,15 @@ print("\n")
 # Renaming dataframes
 # -----------------------------------------------------------------------------
 
-# Monitoring data recorded every few minutes (stress, heart rate and respiratory rate)
-df_garmin_monitoring = dataframes["garmin_monitoring"]
+# Monitoring data recorded every few minutes (stress, heart rate and respiratory rate),
+# memory-mapped: only the plotted time ranges are read
+store_monitoring = MinuteStore("../../data/processed/garmin_monitoring_store")
 
 df_garmin_monitoring_resampled = dataframes["garmin_monitoring_resampled"]
 
+# Calendar attributes (year, month, day, week...) keyed by day number
+df_garmin_calendar = dataframes["garmin_calendar"]
+
 # -----------------------------------------------------------------------------
 # Adjust plot settings
 # -----------------------------------------------------------------------------
@@ -56,28 +66,67 @@ mpl.rcParams["figure.dpi"] = 100
 # -----------------------------------------------------------------------------
 
 
-def plot_random_column(df, column, period):
-    # Select the column(s) to use for filtering based on the selected period
+def period_columns(period):
+    # Calendar columns identifying a period
     if period == "day":
-        columns = ["year", "month", "day"]
+        return ["year", "month", "day"]
     elif period == "week":
-        columns = ["year", "week_of_year"]
+        return ["year", "week_of_year"]
     elif period == "month":
-        columns = ["year", "month"]
+        return ["year", "month"]
     elif period == "year":
-        columns = ["year"]
+        return ["year"]
     else:
         raise ValueError("Invalid period")
 
+
+def plot_random_range(store, column, period, calendar):
+    # Select the column(s) to use for filtering based on the selected period
+    columns = period_columns(period)
+
+    # Select a random period among the days covered by the store
+    days = calendar[
+        (calendar["date"] >= store.start.normalize()) & (calendar["date"] <= store.end)
+    ]
+    combination = random.choice(list(days[columns].drop_duplicates().values))
+    dates = days.loc[(days[columns].values == combination).all(axis=1), "date"]
+
+    # Read the minutes of the period only
+    df = store.slice(
+        dates.min(), dates.max() + pd.Timedelta(days=1) - store.step, columns=[column]
+    )
+
+    # Get the start and end dates for the selected time period
+    start_date = df.index[0].strftime("%Y-%m-%d")
+    end_date = df.index[-1].strftime("%Y-%m-%d")
+
+    # Plot the specified column using the index as the x-axis
+    df[column].plot(kind="line")
+
+    # Set the plot title to include the start and end dates
+    plt.title(f"{column} from {start_date} to {end_date}")
+
+    plt.show()
+
+
+def plot_random_column(df, column, period, calendar):
+    # Select the column(s) to use for filtering based on the selected period
+    columns = period_columns(period)
+
+    # Look up the calendar attributes of each distinct day (days since 1970-01-01)
+    day_number = df.index.values.astype("datetime64[D]").astype("int64")
+    days, row_day = np.unique(day_number, return_inverse=True)
+    day_attributes = calendar.loc[days, columns]
+
     # Create a list of tuples containing all unique combinations of the selected columns
-    combinations = list(df[columns].drop_duplicates().values)
+    combinations = list(day_attributes.drop_duplicates().values)
 
     # Select a random combination from the list
     combination = random.choice(combinations)
 
     # Filter the dataframe by the selected combination
-    for i, col in enumerate(columns):
-        df = df[df[col] == combination[i]]
+    selected_days = (day_attributes.values == combination).all(axis=1)
+    df = df[selected_days[row_day]]
 
     # Get the start and end dates for the selected time period
     start_date = df.index[0].strftime("%Y-%m-%d")
@@ -92,11 +141,11 @@ def plot_random_column(df, column, period):
     plt.show()
 
 
-plot_random_column(df_garmin_monitoring, "stress", "day")
+plot_random_range(store_monitoring, "stress", "day", df_garmin_calendar)
 
-plot_random_column(df_garmin_monitoring_resampled, "stress", "day")
+plot_random_column(df_garmin_monitoring_resampled, "stress", "day", df_garmin_calendar)
 
 
 # Calculate the proportion of NaN values in each column
-nan_proportion1 = df_garmin_monitoring["rr"].isnull().mean()
+nan_proportion1 = np.isnan(store_monitoring.channels["respiration_rate"]).mean()
 nan_proportion2 = df_garmin_monitoring_resampled["rr"].isnull().mean()
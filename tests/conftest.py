@@ -0,0 +1,29 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# The ETL modules are imported as top-level modules, like the scripts in src/data do
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "data"))
+
+DASHBOARD = os.path.join(os.path.dirname(__file__), "..", "src", "dashboard")
+
+
+@pytest.fixture
+def dashboard_module():
+    """Returns a loader of the src/dashboard modules.
+
+    Some of them share their name with an ETL module (e.g. tracks), so they are
+    loaded from their file instead of through sys.path.
+    """
+
+    def load(name):
+        spec = importlib.util.spec_from_file_location(
+            f"dashboard_{name}", os.path.join(DASHBOARD, f"{name}.py")
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    return load
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from activity_metrics import METRIC_COLUMNS, _hr_drift, update_activity_metrics
+
+
+def make_runs() -> tuple:
+    """Returns two runs of ten minutes, the second one without steps row."""
+    rng = np.random.default_rng(0)
+    records = []
+    for activity_id in [1, 2]:
+        n_records = 600
+        records.append(
+            pd.DataFrame(
+                {
+                    "activity_id": activity_id,
+                    "timestamp": pd.date_range(
+                        f"2022-01-0{activity_id}", periods=n_records, freq="s"
+                    ),
+                    "distance": np.arange(n_records) * 3.0,
+                    "hr": rng.normal(150, 5, n_records),
+                    "speed": 3.0,
+                    "cadence": 85.0,
+                }
+            )
+        )
+    activities = pd.DataFrame({"activity_id": [1, 2], "max_hr": [190.0, 185.0]})
+    steps = pd.DataFrame(
+        {"activity_id": [1], "avg_steps_per_min": [170.0], "max_steps_per_min": [180.0]}
+    )
+    return activities, pd.concat(records, ignore_index=True), steps
+
+
+def test_metrics_are_numeric_with_and_without_cache(tmp_path):
+    activities, records, steps = make_runs()
+
+    for _ in range(2):  # computed, then read from the cache
+        metrics, splits = update_activity_metrics(
+            str(tmp_path), activities, records, steps
+        )
+        assert not (metrics[METRIC_COLUMNS].dtypes == object).any()
+        assert metrics["cadence_avg"].isna().tolist() == [False, True]
+        assert splits.dtypes.to_dict() == {
+            "activity_id": np.dtype("int64"),
+            "km": np.dtype("int64"),
+            "split_time": np.dtype("float64"),
+            "avg_hr": np.dtype("float64"),
+        }
+
+
+def test_hr_drift_without_moving_samples_in_a_half():
+    elapsed = np.arange(600, dtype="float64")
+    speed = np.where(elapsed < 300, 3.0, 0.0)
+    hr = np.full(600, 150.0)
+
+    assert np.isnan(_hr_drift(elapsed, speed, hr))
+    assert _hr_drift(elapsed, np.full(600, 3.0), hr) == 0
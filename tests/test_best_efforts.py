@@ -0,0 +1,29 @@
+import numpy as np
+
+from best_efforts import best_efforts
+
+
+def test_constant_pace():
+    # 12 km at 5 min/km, one record per second, with a missing distance
+    elapsed = np.arange(3601, dtype="float64")
+    distance = elapsed / 300
+    distance[1000] = np.nan
+
+    efforts = best_efforts(elapsed, distance)
+
+    assert np.isclose(efforts["1k"], 300)
+    assert np.isclose(efforts["5k"], 1500)
+    assert np.isclose(efforts["10k"], 3000)
+    assert np.isnan(efforts["half"]) and np.isnan(efforts["half_start"])
+
+
+def test_fastest_segment_is_found():
+    # 5 min/km, then a kilometer at 4 min/km starting at 3 km
+    speeds = np.r_[np.full(900, 1 / 300), np.full(240, 1 / 240), np.full(900, 1 / 300)]
+    distance = np.r_[0.0, np.cumsum(speeds)]
+    elapsed = np.arange(len(distance), dtype="float64")
+
+    efforts = best_efforts(elapsed, distance, {"1k": 1.0})
+
+    assert np.isclose(efforts["1k"], 240)
+    assert efforts["1k_start"] == 900
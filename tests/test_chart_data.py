@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+
+def make_series(n_points: int = 10000) -> pd.DataFrame:
+    """Returns a noisy series with a single spike."""
+    rng = np.random.default_rng(0)
+    y = np.sin(np.linspace(0, 20, n_points)) + rng.normal(0, 0.1, n_points)
+    y[4321] = 10.0
+    return pd.DataFrame(
+        {
+            "date": pd.date_range("2020-01-01", periods=n_points, freq="h"),
+            "y": y,
+            "other": 0,
+        }
+    )
+
+
+def test_lttb_keeps_the_ends_and_the_spike(dashboard_module):
+    chart_data = dashboard_module("chart_data")
+    df = make_series()
+
+    reduced = chart_data.reduce_chart_data(df, x="date", y="y:Q", max_points=500)
+
+    assert len(reduced) == 500
+    assert reduced.columns.tolist() == ["date", "y"]
+    assert reduced.index[0] == 0 and reduced.index[-1] == len(df) - 1
+    assert reduced.index.is_monotonic_increasing
+    assert 4321 in reduced.index
+
+
+def test_minmax_keeps_the_extremes(dashboard_module):
+    chart_data = dashboard_module("chart_data")
+    df = make_series()
+    df["z"] = -df["y"]
+
+    reduced = chart_data.reduce_chart_data(df, x="date", y=["y", "z"], max_points=500)
+
+    assert len(reduced) <= 500
+    assert reduced["y"].max() == df["y"].max() and reduced["z"].min() == df["z"].min()
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from coverage import build_daily_coverage
+
+
+def test_daily_coverage_counts():
+    index = pd.date_range("2022-01-01 12:00", "2022-01-03 11:59", freq="min")
+    df = pd.DataFrame(
+        {
+            column: np.ones(len(index))
+            for column in ["stress", "heart_rate", "rr", "in_activity"]
+        },
+        index=pd.Index(index, name="timestamp"),
+    )
+    for column in ["stress", "heart_rate", "rr"]:
+        df[f"{column}_injected"] = False
+    df["in_activity"] = 0
+    # First day: 10 missing stress minutes, 5 injected heart rates, a 30-minute run
+    df.iloc[:10, df.columns.get_loc("stress")] = np.nan
+    df.iloc[20:25, df.columns.get_loc("heart_rate_injected")] = True
+    df.iloc[100:130, df.columns.get_loc("in_activity")] = 1
+    # Second day: no data from 20:00 (the day is still counted, partially)
+    df = df.drop(df.index[(df.index >= "2022-01-02 20:00")])
+
+    coverage = build_daily_coverage(df)
+
+    assert coverage.index.tolist() == list(pd.date_range("2022-01-01", periods=2))
+    assert coverage["minutes"].tolist() == [720, 1200]
+    assert coverage["stress_minutes_observed"].tolist() == [710, 1200]
+    assert coverage["heart_rate_minutes_observed"].tolist() == [715, 1200]
+    assert coverage["heart_rate_minutes_injected"].tolist() == [5, 0]
+    assert coverage["minutes_in_activity"].tolist() == [30, 0]
+    assert coverage["minutes_incomplete"].tolist() == [10, 0]
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from durations import parse_durations
+
+
+def test_durations_round_trip():
+    rng = np.random.default_rng(0)
+    microseconds = rng.integers(0, 86400 * 10**6, 1000)
+    seconds, fraction = np.divmod(microseconds, 10**6)
+    text = pd.Series(
+        [
+            f"{s // 3600:02}:{s // 60 % 60:02}:{s % 60:02}.{f:06}"
+            for s, f in zip(seconds, fraction)
+        ],
+        dtype=object,
+    )
+    # Missing values, no fraction, a short fraction and another format
+    text[[0, 1, 2, 3]] = [None, "01:02:03", "01:02:03.5", "1 days 00:00:01"]
+
+    result = parse_durations(text)
+
+    expected = pd.to_timedelta(text).dt.total_seconds().to_numpy()
+    np.testing.assert_array_equal(result, expected)
+    assert np.isnan(result[0])
+    assert result[1:4].tolist() == [3723.0, 3723.5, 86401.0]
+    assert (result[4:] == microseconds[4:] / 10**6).all()
+
+
+def test_durations_already_converted():
+    timedeltas = pd.Series(pd.to_timedelta([90, None], unit="s"))
+    assert parse_durations(timedeltas)[0] == 90.0
+    assert parse_durations([1.5, 2.0]).tolist() == [1.5, 2.0]
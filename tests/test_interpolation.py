@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from interpolation import interpolate_block
+
+
+def test_interpolate_block_matches_pandas():
+    rng = np.random.default_rng(0)
+    values = rng.normal(60, 5, (500, 3))
+    # Isolated missing values, gaps longer than the limit and missing edges
+    values[rng.random(values.shape) < 0.3] = np.nan
+    values[100:120, 0] = np.nan
+    values[:7, 1] = np.nan
+    values[-9:, 2] = np.nan
+
+    result, injected = interpolate_block(values, limit=4)
+
+    expected = pd.DataFrame(values).interpolate(
+        method="linear", limit=4, limit_direction="both"
+    )
+    np.testing.assert_allclose(result, expected.to_numpy())
+    assert (injected == (np.isnan(values) & expected.notna().to_numpy())).all()
@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from minute_store import MinuteStore, update_minute_store
+
+
+def make_minutes(end: str = "2022-03-03") -> pd.DataFrame:
+    """Returns two channels on a one-minute grid spanning several months."""
+    index = pd.date_range("2022-01-30", end, freq="min", name="timestamp")
+    return pd.DataFrame(
+        {
+            "heart_rate": np.arange(len(index), dtype="float32"),
+            "in_activity": (np.arange(len(index)) % 3 == 0).astype("int8"),
+        },
+        index=index,
+    )
+
+
+def months(df: pd.DataFrame):
+    return (month for _, month in df.groupby(df.index.to_period("M")))
+
+
+def test_update_rewrites_changed_days_anywhere(tmp_path):
+    folder = str(tmp_path)
+    columns = ["heart_rate", "in_activity"]
+    update_minute_store(months(make_minutes()), folder, columns)
+
+    # A lagging source filled a gap weeks ago, and new minutes arrived
+    df = make_minutes("2022-03-05")
+    df.iloc[100:200, 0] = np.nan
+    header = update_minute_store(months(df), folder, columns)
+
+    store = MinuteStore(folder)
+    assert header["length"] == len(df) == store.length
+    for column in columns:
+        np.testing.assert_array_equal(store.channels[column], df[column].to_numpy())
+
+
+def test_slice_returns_the_minutes_of_a_range(tmp_path):
+    df = make_minutes()
+    update_minute_store(df, str(tmp_path), ["heart_rate"])
+
+    result = MinuteStore(str(tmp_path)).slice("2022-02-01 10:00", "2022-02-01 10:09")
+
+    pd.testing.assert_frame_equal(
+        result, df.loc["2022-02-01 10:00":"2022-02-01 10:09", ["heart_rate"]]
+    )
+
+
+def test_update_only_writes_the_changed_days(tmp_path):
+    folder = str(tmp_path)
+    df = make_minutes()
+    update_minute_store(months(df), folder, ["heart_rate"])
+
+    # Marking the stored minutes: the ones of unchanged days keep the marks
+    path = os.path.join(folder, "heart_rate.bin")
+    np.full(len(df), -1, dtype="float32").tofile(path)
+    df.iloc[2000, 0] = np.nan
+    update_minute_store(months(df), folder, ["heart_rate"])
+
+    stored = MinuteStore(folder).channels["heart_rate"]
+    day = df.index.normalize() == df.index[2000].normalize()
+    np.testing.assert_array_equal(stored[day], df.loc[day, "heart_rate"].to_numpy())
+    assert (stored[~day] == -1).all()
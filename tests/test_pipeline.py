@@ -0,0 +1,49 @@
+import queue
+import threading
+
+import pytest
+
+from pipeline import DONE, consume, start_producer, start_stage
+
+
+def run_with_failing_writer(n_items: int = 20) -> list:
+    """Runs the stages of run_pipeline.py with a writer failing on its first item."""
+    errors = []
+    extracted = queue.Queue(1)
+    cleaned = queue.Queue(1)
+    to_write = queue.Queue(1)
+
+    def extract():
+        for i in range(n_items):
+            to_write.put(("raw", i))
+            yield i
+
+    def write(item):
+        raise OSError("disk full")
+
+    writer = start_stage(write, to_write, None, errors)
+    start_producer(extract(), extracted, errors)
+    start_stage(lambda i: i * 2, extracted, cleaned, errors)
+
+    results = []
+    try:
+        for item in consume(cleaned, errors):
+            results.append(item)
+            to_write.put(("interim", item))
+    finally:
+        to_write.put(DONE)
+        writer.join()
+    return results
+
+
+def test_failing_writer_doesnt_deadlock():
+    outcome = []
+    thread = threading.Thread(
+        target=lambda: outcome.append(pytest.raises(OSError, run_with_failing_writer)),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive(), "the pipeline is deadlocked"
+    assert outcome and "disk full" in str(outcome[0].value)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from cleaning import drop_profiled_columns
+from profiling import hash_rows, profile_table
+
+
+def make_table() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "value": [1.0, 2.0, 3.0, 2.0],
+            "constant_with_nan": [5.0, np.nan, 5.0, 5.0],
+            "constant_text": ["a", None, "a", "a"],
+            "empty_text": [None, None, None, None],
+            "empty": [np.nan] * 4,
+        }
+    )
+
+
+def test_profile_drives_the_column_drops():
+    df = make_table()
+    profile, _ = profile_table(df)
+
+    assert profile["is_empty"].tolist() == [False, False, False, True, True]
+    # Missing values are ignored, like Series.nunique() does
+    assert profile["is_constant"].tolist() == [
+        df[column].nunique() == 1 for column in df.columns
+    ]
+
+    drop_profiled_columns("table", df, profile)
+    assert df.columns.tolist() == ["value"]
+
+
+def test_row_hashes_match_hash_rows():
+    df = make_table()
+    _, hashes = profile_table(df)
+
+    np.testing.assert_array_equal(hashes, hash_rows(df))
+    assert hashes[1] != hashes[3]
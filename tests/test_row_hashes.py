@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from row_hashes import check_new_rows
+
+
+def make_minutes() -> pd.DataFrame:
+    """Returns three days of minute heart rates."""
+    timestamps = pd.date_range("2022-01-01", periods=3 * 1440, freq="min")
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {"timestamp": timestamps, "heart_rate": rng.integers(40, 180, len(timestamps))}
+    )
+
+
+def test_only_changed_days_are_checked(tmp_path):
+    df = make_minutes()
+    folder = str(tmp_path)
+
+    checked, duplicated = check_new_rows(df, folder, "hr")
+    assert checked.all() and not duplicated.any()
+
+    checked, _ = check_new_rows(df, folder, "hr")
+    assert not checked.any()
+
+    # An edit keeping the number of rows of the day, and a duplicate on the next one
+    df.loc[100, "heart_rate"] += 1
+    df = pd.concat([df, df.iloc[[2000]]], ignore_index=True)
+    checked, duplicated = check_new_rows(df, folder, "hr")
+
+    days = df["timestamp"].dt.day
+    assert (checked == days.isin([1, 2])).all()
+    assert duplicated.sum() == 1 and duplicated[-1]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from sleep_windows import build_nightly_windows, build_nightly_windows_by_partition
+
+
+def make_monitoring() -> pd.DataFrame:
+    """Returns minute data over several calendar months, with missing heart rates."""
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2022-01-03 05:00", "2022-04-10 10:00", freq="min")
+    df = pd.DataFrame(
+        {
+            "heart_rate": rng.normal(60, 5, len(index)),
+            "stress": rng.normal(30, 5, len(index)),
+            "rr": rng.normal(14, 1, len(index)),
+        },
+        index=pd.Index(index, name="timestamp"),
+    )
+    df.loc[rng.random(len(df)) < 0.2, "heart_rate"] = np.nan
+    return df
+
+
+def make_days() -> pd.DataFrame:
+    """Returns nights starting before and ending after the minute data, and across months."""
+    rng = np.random.default_rng(1)
+    days = pd.date_range("2021-12-30", "2022-04-15", freq="D", name="day")
+    start = days + pd.to_timedelta(22 * 60 + rng.integers(0, 120, len(days)), "min")
+    end = start + pd.to_timedelta(rng.integers(300, 600, len(days)), "min")
+    df_days = pd.DataFrame({"start_sleep": start, "end_sleep": end}, index=days)
+    df_days.iloc[5, 0] = pd.NaT
+    return df_days
+
+
+def test_partitions_match_the_whole_table():
+    df_monitoring = make_monitoring()
+    df_days = make_days()
+    months = df_monitoring.groupby(df_monitoring.index.to_period("M"))
+
+    result = build_nightly_windows_by_partition(df_days, (df for _, df in months))
+
+    expected = build_nightly_windows(df_days, df_monitoring)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_without_minutes_no_night_has_a_window():
+    df_monitoring = make_monitoring()
+    df_days = make_days()
+
+    result = build_nightly_windows_by_partition(df_days, [df_monitoring.iloc[:0]])
+
+    expected = build_nightly_windows(df_days, df_monitoring)
+    assert result.empty
+    assert result.columns.tolist() == expected.columns.tolist()
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from timestamps import parse_timestamps
+
+
+def test_timestamps_match_pd_to_datetime():
+    values = pd.Series(
+        ["2022-01-01 10:00:00", "2022-01-01 10:00:00.250000", "2022-01-02", None]
+        + ["2022-01-01 10:00:00"] * 10
+        + ["2022-03-04T05:06:07"],
+        name="timestamp",
+    )
+
+    result = parse_timestamps(values)
+
+    expected = pd.Series(
+        [pd.to_datetime(value) for value in values], name="timestamp"
+    ).astype("datetime64[ns]")
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_other_columns_are_left_unchanged():
+    for values in [
+        pd.Series(["running", "cycling", None]),
+        pd.Series(["2022-01-01", "not a date"]),
+        pd.Series(pd.to_datetime(["2022-01-01"])),
+    ]:
+        pd.testing.assert_series_equal(
+            parse_timestamps(values, errors="ignore"), values
+        )
+    assert np.isnat(parse_timestamps(pd.Series([None], dtype=object)).to_numpy()).all()
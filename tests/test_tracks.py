@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from tracks import LAT, LON, write_track_store
+
+
+def make_records() -> pd.DataFrame:
+    """Returns two runs in different areas, the second one with a jump of about 50 km."""
+    rng = np.random.default_rng(0)
+    records = []
+    for activity_id, lat, lon in [(1, 48.85, 2.35), (2, 45.76, 4.83)]:
+        n_points = 500
+        steps = rng.normal(0, 2e-5, (n_points, 2))
+        if activity_id == 2:
+            steps[250] = [0.5, 0.0]
+        coordinates = np.array([lat, lon]) + np.cumsum(steps, axis=0)
+        records.append(
+            pd.DataFrame(
+                {
+                    "activity_id": activity_id,
+                    "timestamp": pd.date_range(
+                        "2022-01-01", periods=n_points, freq="s"
+                    ),
+                    LAT: coordinates[:, 0],
+                    LON: coordinates[:, 1],
+                }
+            )
+        )
+    return pd.concat(records, ignore_index=True)
+
+
+def test_tracks_decode_to_the_records(tmp_path, dashboard_module):
+    records = make_records()
+    folder = str(tmp_path / "tracks")
+    write_track_store(records, folder)
+    store = dashboard_module("tracks").TrackStore(folder)
+
+    for activity_id, expected in records.groupby("activity_id"):
+        track = store.load(activity_id)
+        assert np.abs(track.to_numpy() - expected[[LAT, LON]].to_numpy()).max() < 1e-6
+        assert len(store.load(activity_id, tolerance=20)) < len(track)
+
+
+def test_grid_finds_the_runs_of_an_area(tmp_path, dashboard_module):
+    folder = str(tmp_path / "tracks")
+    write_track_store(make_records(), folder)
+    store = dashboard_module("tracks").TrackStore(folder)
+
+    assert store.activities_in_area(48.84, 48.86, 2.34, 2.36).tolist() == [1]
+    assert store.activities_in_area(46.2, 46.3, 4.8, 4.9).tolist() == [2]
+    assert store.activities_in_area(47.0, 47.1, 3.0, 3.1).empty
+    both = store.load_all(20)
+    assert sorted(both["activity_id"].unique()) == [1, 2]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from training_load import METRICS, compute_training_load, update_training_load
+
+
+def make_days(n_days: int = 60) -> pd.DataFrame:
+    """Returns a daily table with the columns transform_data.py has before renaming them."""
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "running_distance": rng.uniform(0, 15, n_days),
+            "intensity_time": rng.uniform(0, 3600, n_days),
+            "rhr": rng.uniform(45, 60, n_days),
+            "stress_avg": rng.uniform(20, 40, n_days),
+        },
+        index=pd.date_range("2022-01-01", periods=n_days, freq="D", name="day"),
+    )
+
+
+def test_pre_rename_columns():
+    df_days = make_days()
+    result = update_training_load(None, df_days)
+
+    renamed = compute_training_load(df_days.rename(columns={"rhr": "resting_hr"}))
+    pd.testing.assert_frame_equal(result, renamed)
+    assert "resting_hr_7d" in result.columns
+    assert np.isclose(result["resting_hr_7d"].iloc[-1], df_days["rhr"].iloc[-7:].mean())
+
+
+def test_incremental_update_matches_full_computation():
+    df_days = make_days()
+    previous = update_training_load(None, df_days.iloc[:40])
+    result = update_training_load(previous, df_days)
+
+    pd.testing.assert_frame_equal(result, compute_training_load(df_days, METRICS))
@@ -0,0 +1,51 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from typed_reader import read_table
+
+
+def make_database() -> sqlite3.Connection:
+    """Returns a garmindb-like table with missing values and gaps in its rowids."""
+    rng = np.random.default_rng(0)
+    n_rows = 1000
+    timestamps = pd.date_range("2022-01-01", periods=n_rows, freq="min")
+    df = pd.DataFrame(
+        {
+            "timestamp": timestamps.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "heart_rate": rng.integers(40, 180, n_rows),
+            "counter": 2**60 + np.arange(n_rows),
+            "rr": rng.normal(14, 1, n_rows),
+            "duration": "00:01:30.250000",
+            "label": rng.choice(["a", "b"], n_rows),
+        }
+    )
+    df = df.astype(object)
+    df.loc[::7, "heart_rate"] = None
+    df.loc[::11, "rr"] = None
+    df.loc[::13, "label"] = None
+    df.loc[::17, "duration"] = None
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE monitoring (timestamp DATETIME, heart_rate INTEGER, "
+        "counter INTEGER, rr FLOAT, duration TIME, label VARCHAR(8))"
+    )
+    conn.executemany("INSERT INTO monitoring VALUES (?, ?, ?, ?, ?, ?)", df.values)
+    conn.execute("DELETE FROM monitoring WHERE rowid % 10 = 3")
+    conn.commit()
+    return conn
+
+
+def test_typed_reader_matches_read_sql_query():
+    conn = make_database()
+
+    df = read_table(conn, "monitoring", batch_rows=128)
+
+    expected = pd.read_sql_query("SELECT * FROM monitoring", conn)
+    expected["timestamp"] = pd.to_datetime(expected["timestamp"]).astype("M8[ns]")
+    expected["duration"] = pd.to_timedelta(expected["duration"]).astype("m8[ns]")
+    pd.testing.assert_frame_equal(df, expected)
+    assert df["counter"].dtype == "int64"
+    assert df["heart_rate"].isna().any() and df["rr"].isna().any()
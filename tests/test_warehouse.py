@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from warehouse import write_warehouse
+
+
+def make_monitoring() -> pd.DataFrame:
+    """Returns three days of minute data."""
+    index = pd.date_range(
+        "2022-01-01", "2022-01-03 23:59", freq="min", name="timestamp"
+    )
+    return pd.DataFrame(
+        {"heart_rate": np.arange(len(index), dtype="float64")}, index=index
+    )
+
+
+def test_time_range_includes_the_bound_days(tmp_path, dashboard_module):
+    path = str(tmp_path / "warehouse.db")
+    write_warehouse(path, {"garmin_monitoring": make_monitoring()})
+    warehouse = dashboard_module("warehouse").Warehouse(path)
+
+    df = warehouse.time_range("garmin_monitoring", "2022-01-02", "2022-01-02")
+    assert df.index[0] == pd.Timestamp("2022-01-02 00:00")
+    assert df.index[-1] == pd.Timestamp("2022-01-02 23:59")
+
+    df = warehouse.time_range(
+        "garmin_monitoring", "2022-01-02 10:00", "2022-01-02 10:30"
+    )
+    assert len(df) == 31
+
+    df_days = warehouse.time_range(
+        "garmin_monitoring_day", "2022-01-01", "2022-01-02", column="day"
+    )
+    assert df_days.index.tolist() == list(pd.date_range("2022-01-01", periods=2))
+    assert df_days["minutes"].tolist() == [1440, 1440]